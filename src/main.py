@@ -14,10 +14,18 @@
  * along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import time
+from utils import clock
+bootStart = clock.ticks_ms()
+
 from machine import ADC, Pin, I2C
-from utils.keyesadkey import KeyesADKey
+from utils.keypad import Keypad
 from utils.i2c_lcd import I2cLcd
+from utils.view import AllocationCounter
+from utils.controller import Controller
+from utils.acquisition import Acquisition
+from utils.jitter import Jitter
+from utils.zones import HardwareMap
+from utils.protocol import Protocol
 from mode.preheater import Preheater
 from mode.reballing import Reballing
 from mode.tuning import Tuning
@@ -27,74 +35,175 @@ I2C_ADDR = 0x27
 I2C_NUM_ROWS = 2
 I2C_NUM_COLS = 16
 
+# Print the time to the first screen, and the heap allocations of the
+# rendering and the jitter of both cores every PROFILE_FRAMES frames. The
+# lines start with "#", so a client of the protocol on the same serial port
+# skips them.
+PROFILE = False
+PROFILE_FRAMES = 600
+FRAME_PERIOD_US = 16667
+
+# The control loop resets the FCR, dropping the relays, if it stalls for
+# WATCHDOG_MS. Use 0 to disable the watchdog, for example while debugging.
+WATCHDOG_MS = 2000
+
+# The zones (probes and heater relays) of hardware.json are created once,
+# with every heater off, and shared by the modes. Unlike the settings and
+# menus of the modes, which wait for their first lock(), they are created at
+# boot on purpose: a soft reset keeps the pins as they were, so a relay left
+# on by the previous run stays on until its pin is driven low, and the
+# Acquisition starts the conversions of every probe from here. It only
+# parses hardware.json and probes.json and sets up a few pins.
+hardware = HardwareMap.shared("/config/hardware.json")
+
 i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
 lcd = I2cLcd(i2c, I2C_ADDR, I2C_NUM_ROWS, I2C_NUM_COLS)
 lcd.clear()
 
-# Connect to channel 0 (GP26)
+# Connect to channel 0 (GP26). The keypad is sampled on a timer and its
+# events wait in a queue until the loop below takes them.
 adc = ADC(0)
-keyboard = KeyesADKey(adc)
-
-models = [
-  Preheater("Preheater", "/config/preheater.json"),
-  Reballing("Reballing", "/config/reballing.json"),
-  Tuning("Auto Tuning", "/config/tuning.json")
-]
+keypad = Keypad(adc)
+
+# Modes load their configuration on the first lock().
+MODES = {
+  "Preheater": Preheater,
+  "Reballing": Reballing,
+  "Tuning": Tuning
+}
+models = []
+for info in hardware.modes():
+  models.append(MODES[info["type"]](info["name"], info["config"], info["sensor"], info["heaters"]))
+
+# The running mode is controlled on the second core. This core only asks it
+# to start or stop a mode and shows the state it publishes. The probes are
+# read there too, one per pass, their conversions staggered.
+controller = Controller(watchdog=WATCHDOG_MS, acquisition=Acquisition(hardware.zones()))
+controller.start()
+
+# A computer on the USB serial port can read and change the settings and run
+# the modes with JSON requests, one per line (see utils/protocol.py).
+protocol = Protocol(models, controller)
+
+def idle():
+  for model in models:
+    model.idle()
 
 currentModel = 0
 modelsCount = len(models)
-lastKey = -1.0
 lcd.clear()
 i = 0
+firstScreen = True
+shown = [None, None]
+repeats = 0
+allocations = AllocationCounter()
+frameJitter = Jitter(FRAME_PERIOD_US)
 while True:
-  key = keyboard.read()
-
-  if models[currentModel].isLocked():
-    if key == keyboard.LEFT:
-      models[currentModel].previousMenu()
-
-    if key == keyboard.RIGHT:
-      models[currentModel].nextMenu()
-
-    if key == keyboard.UP:
-      models[currentModel].increaseParameter()
-      
-    if key == keyboard.DOWN:
-      models[currentModel].decreaseParameter()
-
-    if key == keyboard.SELECT and lastKey != keyboard.SELECT:
-      label = models[currentModel].menuLabel()
-      if label == "Home":
-        models[currentModel].stop()
-        models[currentModel].unlock()
-
-      if label == "Run":
-        if models[currentModel].isRunning():
-          models[currentModel].stop()
-        else:
-          models[currentModel].run()
-
-      if label != "Home" and label != "Run":
-        models[currentModel].stop()
-    else:
-      if models[currentModel].isRunning():
-        models[currentModel].run()
-  else:
-    if key == keyboard.LEFT:
-        currentModel = (currentModel - 1)%modelsCount
-
-    if key == keyboard.RIGHT:
-        currentModel = (currentModel + 1)%modelsCount
-
-    if key == keyboard.SELECT and lastKey != keyboard.LONG_SELECT:
-      models[currentModel].lock()
+  if PROFILE:
+    frameJitter.sample(clock.ticks_us())
+
+  # The watchdog is fed only while this loop keeps checking in.
+  controller.checkIn()
+
+  event = keypad.get()
+  while event >= 0:
+    key = event & Keypad.KEY
+    kind = event & Keypad.KIND
+
+    # Values change faster the longer a key is held.
+    if kind == Keypad.PRESS:
+      repeats = 0
+
+    if kind == Keypad.REPEAT:
+      repeats += 1
+
+    if kind == Keypad.LONG and key == Keypad.SELECT:
+      if models[currentModel].isLocked() and not models[currentModel].isRunning():
+        models[currentModel].nextDecade()
+
+    if kind == Keypad.PRESS or kind == Keypad.REPEAT:
+      if models[currentModel].isLocked():
+        if key == Keypad.LEFT:
+          models[currentModel].previousMenu()
+
+        if key == Keypad.RIGHT:
+          models[currentModel].nextMenu()
+
+        if key == Keypad.UP:
+          models[currentModel].increaseParameter(repeats)
+          
+        if key == Keypad.DOWN:
+          models[currentModel].decreaseParameter(repeats)
+
+        if key == Keypad.SELECT:
+          label = models[currentModel].menuLabel()
+          if label == "Home":
+            # With concurrent zones, a running mode goes on in the background.
+            if not hardware.isConcurrent():
+              controller.stop(models[currentModel])
+            models[currentModel].unlock()
+
+          if label == "Run":
+            if models[currentModel].isRunning():
+              controller.stop(models[currentModel])
+            else:
+              controller.run(models[currentModel])
+
+          if label != "Home" and label != "Run":
+            controller.stop(models[currentModel])
+      else:
+        if key == Keypad.LEFT:
+          currentModel = (currentModel - 1)%modelsCount
+
+        if key == Keypad.RIGHT:
+          currentModel = (currentModel + 1)%modelsCount
+
+        if key == Keypad.SELECT:
+          models[currentModel].lock()
+
+    event = keypad.get()
+
+  protocol.poll()
+
+  # Write changed settings only while no heater is being controlled by any
+  # mode: the flash writes stall both cores.
+  controller.whileIdle(idle)
+
+  if PROFILE:
+    allocations.start()
 
+  models[currentModel].refresh()
   lines = models[currentModel].view()
 
-  lastKey = key
-  lcd.move_to(0, 0)
-  lcd.putstr(lines[0])
-  lcd.move_to(0, 1)
-  lcd.putstr(lines[1])
+  # A line is written to the LCD only when its text changed. Unchanged lines
+  # are the same object, so the usual check is an identity test.
+  if lines[0] is not shown[0]:
+    if lines[0] != shown[0]:
+      lcd.move_to(0, 0)
+      lcd.putstr(lines[0])
+    shown[0] = lines[0]
+
+  if lines[1] is not shown[1]:
+    if lines[1] != shown[1]:
+      lcd.move_to(0, 1)
+      lcd.putstr(lines[1])
+    shown[1] = lines[1]
+
+  if PROFILE:
+    allocations.stop()
+    if allocations.frames == PROFILE_FRAMES:
+      print(f"# Rendering: {allocations.allocatingFrames}/{allocations.frames} frames allocated, {allocations.bytes} bytes, max {allocations.maxBytes}")
+      allocations.reset()
+      print(f"# UI core: {frameJitter.report()}")
+      print(f"# Control core: {controller.jitter.report()}")
+      print(f"# Control ticks: {controller.ticker.report()}")
+      print(f"# Probes: {controller.acquisition.report()}")
+      frameJitter.reset()
+      controller.jitter.reset()
+
+  if firstScreen:
+    firstScreen = False
+    if PROFILE:
+      print(f"# Time to first screen: {clock.ticks_diff(clock.ticks_ms(), bootStart)} ms")
  
-  time.sleep(1.0/60)
\ No newline at end of file
+  clock.sleep(1.0/60)
\ No newline at end of file
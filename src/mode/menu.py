@@ -0,0 +1,236 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+class MenuItem:
+  """
+    Implements a menu entry compiled once from its JSON description. A value
+    entry keeps a reference to the storage holding its value (any object
+    with get(key) and set(key, value)), its limits and step, and the template
+    used to display it. An action entry (Run, Home) only has a label.
+
+    Values are stepped as integers counted in units of the step, so a value
+    changed many times never drifts away from the grid of the step. The
+    entry can step by 10, 100, ... times the step, chosen with
+    nextDecade() or reached by holding a key.
+  """
+  VALUE = 0
+  ACTION = 1
+
+  #Repeats of a held key before the step is multiplied by 10 again.
+  ACCELERATE_REPEATS = 10
+  #The marker shown on the LCD for each decade.
+  MARKERS = ("[>]", "x10", "x100", "x1k", "x10k", "x100k", "x1M")
+
+  __slots__ = (
+    "label", "kind", "store", "key", "min", "max", "step",
+    "template", "info", "onChange", "decade", "_value", "_text",
+    "_scale", "_units", "_min", "_max", "_maxDecade"
+  )
+
+  def __init__(self, label = "", kind = 1, store = None, key = "", info = None, template = "", onChange = None):
+    """
+      Initialize a MenuItem object.
+    Args:
+      label (str, optional): the label shown on the LCD. Defaults to "".
+      kind (int, optional): MenuItem.VALUE or MenuItem.ACTION.
+        Defaults to MenuItem.ACTION.
+      store (object, optional): the storage of the value. Defaults to None.
+      key (str, optional): the key of the value in the storage. Defaults to "".
+      info (dictionary, optional): the JSON description with the keys "min",
+        "max", "step", "unit" and, optionally, "format". Defaults to None.
+      template (str, optional): the text shown on the LCD, with {} in place
+        of the value. It's built from the label, "format" and "unit" if empty.
+        Defaults to "".
+      onChange (function, optional): called with the new value after it's
+        set. Defaults to None.
+    """
+    self.label = label
+    self.kind = kind
+    self.store = store
+    self.key = key
+    self.info = info
+    self.onChange = onChange
+    self._value = None
+    self._text = None
+    self.decade = 0
+    self._maxDecade = 0
+
+    if info is None:
+      self.min = 0
+      self.max = 0
+      self.step = 0
+      self.template = label
+      return
+
+    self.min = info["min"]
+    self.max = info["max"]
+    self.step = info["step"]
+
+    #The scale turns the step into an integer: 100 for a step of 0.05.
+    self._scale = 1
+    while self._scale < 1000000 and abs(self.step*self._scale - round(self.step*self._scale)) > 1e-6:
+      self._scale *= 10
+
+    self._units = round(self.step*self._scale)
+    self._min = round(self.min*self._scale)
+    self._max = round(self.max*self._scale)
+
+    while self._maxDecade < len(MenuItem.MARKERS) - 1 and self._units*10**(self._maxDecade + 1) <= self._max - self._min:
+      self._maxDecade += 1
+
+    if template == "":
+      unit = info["unit"]
+      if len(unit) > 0 and unit[0] == "C":
+        unit = "\xDF" + unit
+      template = label + " {:" + info.get("format", "") + "}" + unit
+
+    self.template = template
+
+  def get(self):
+    """
+      Get the value of the entry.
+    Returns:
+      mixed: the value.
+    """
+    return self.store.get(self.key)
+
+  def set(self, value = None):
+    """
+      Set the value of the entry.
+    Args:
+      value (mixed, optional): the new value. Defaults to None.
+    """
+    self.store.set(self.key, value)
+    if self.onChange is not None:
+      self.onChange(value)
+
+  def increase(self, repeats = 0):
+    """
+      Increase the value by one step of the current decade. The value stops
+      at the maximum.
+    Args:
+      repeats (int, optional): how many times the key has repeated while
+        held. Every MenuItem.ACCELERATE_REPEATS repeats multiply the step
+        by 10. Defaults to 0.
+    """
+    if self.kind == MenuItem.VALUE:
+      self.change(self.increment(repeats))
+
+  def decrease(self, repeats = 0):
+    """
+      Decrease the value by one step of the current decade. The value stops
+      at the minimum.
+    Args:
+      repeats (int, optional): how many times the key has repeated while
+        held. See increase(). Defaults to 0.
+    """
+    if self.kind == MenuItem.VALUE:
+      self.change(-self.increment(repeats))
+
+  def increment(self, repeats = 0):
+    """
+      Get the step, in units of the step, for the current decade and the
+      acceleration of a held key.
+    Args:
+      repeats (int, optional): how many times the key has repeated while
+        held. Defaults to 0.
+
+    Returns:
+      int: the number of steps.
+    """
+    decade = self.decade + repeats//MenuItem.ACCELERATE_REPEATS
+    if decade > self._maxDecade:
+      decade = self._maxDecade
+
+    return self._units*10**decade
+
+  def change(self, units = 0):
+    """
+      Add a number of units of the step to the value, keeping it within the
+      limits. The result is rounded to the grid of the step.
+    Args:
+      units (int, optional): the units to be added. Defaults to 0.
+    """
+    current = round(self.get()*self._scale)
+    value = current + units
+    if value > self._max:
+      value = self._max
+
+    if value < self._min:
+      value = self._min
+
+    #Keep the value on the grid of the step, counted from the minimum.
+    value = self._min + round((value - self._min)/self._units)*self._units
+    if value > self._max:
+      value -= self._units
+
+    if self._scale != 1:
+      value = value/self._scale
+
+    #A stored value off the grid is set even if it rounds to the result.
+    if value != self.get():
+      self.set(value)
+
+  def assign(self, value = 0):
+    """
+      Set the value, rounded to the grid of the step, if it's within the
+      limits.
+    Args:
+      value (int or float, optional): the new value. Defaults to 0.
+
+    Returns:
+      bool: It's True if the value was set. Otherwise False.
+    """
+    if self.kind != MenuItem.VALUE or value < self.min or value > self.max:
+      return False
+
+    self.change(round(value*self._scale) - round(self.get()*self._scale))
+    return True
+
+  def nextDecade(self):
+    """
+      Multiply the step by 10, going back to the step after the largest one
+      that fits between the limits.
+    """
+    if self.decade < self._maxDecade:
+      self.decade += 1
+    else:
+      self.decade = 0
+
+  def marker(self):
+    """
+      Get the marker of the current decade shown on the LCD.
+    Returns:
+      str: "[>]" for the step itself, "x10", "x100", ... otherwise.
+    """
+    return MenuItem.MARKERS[self.decade]
+
+  def text(self):
+    """
+      Get the text of the entry to be displayed on the LCD.
+    Returns:
+      str: the label and the formatted value, or just the label. The text
+        is formatted again only when the value has changed.
+    """
+    if self.kind == MenuItem.VALUE:
+      value = self.get()
+      if self._text is None or value != self._value:
+        self._value = value
+        self._text = self.template.format(value)
+
+      return self._text
+
+    return self.template
@@ -14,7 +14,11 @@
  * along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import json
+from utils.config import ConfigStore
+from mode.menu import MenuItem
+from utils.view import Field, Line, fill
+from utils.controller import Snapshot
+from utils.zones import HardwareMap
 
 class Mode():
   """
@@ -27,9 +31,13 @@ class Mode():
   _isRunning = False
   _lines = ["", ""]
   _name = ""
+  _isSetup = False
+  PV = 0.0
+  SV = 0.0
+  rate = 0.0
   DEBUG = False
   
-  def __init__(self, name = "", filename = ""):
+  def __init__(self, name = "", filename = "", sensor = "", heaters = ()):
     """
     Initialize a Mode object.
 
@@ -37,22 +45,57 @@ class Mode():
         name (str, optional): the name for the Mode. Defaults to "".
         filename (str, optional): the JSON file with informations used
           by this object. Defaults to "".
+        sensor (str, optional): the zone whose probe gives the process
+          value. Defaults to "".
+        heaters (tuple, optional): the zones whose heaters are driven.
+          Defaults to ().
     """
     self._name = name
-    
     self._filename = filename
-    with open(filename) as f:
-      self._mainMenu = json.load(f)
-
-    self._mainMenuCount = len(self._mainMenu["order"])
-
     self._pidFilename = "/config/pid.json"
-    with open(self._pidFilename) as f:
-      self._menuPID = json.load(f)
-    
-    self._menuPIDCount = len(self._menuPID["order"])
-    
-    self._menuCount = self._mainMenuCount + self._menuPIDCount + 2
+    self._hardwareFilename = "/config/hardware.json"
+    self._sensorName = sensor
+    self._heaterNames = heaters
+
+    #The LCD lines and the running values shown on them are cached, so a
+    #frame where nothing changed formats and allocates nothing.
+    self._lines = ["", ""]
+    self._line0 = Line()
+    self._line1 = Line()
+    self._pvText = Field("PV {:5.1f}\xDFC".format)
+    self._timeText = Field(self.display)
+    self._rateText = Field("{:+5.2f}\xDFC/s".format)
+
+    #The state written by the control loop and the copy read by view().
+    self.shared = Snapshot()
+    self.state = Snapshot()
+
+  def setup(self):
+    """
+      Load the configuration and create the objects used by the Mode. It's
+      called by lock() the first time the Mode is used, so a Mode that is
+      never selected costs nothing at boot. The JSON files are shared by
+      all modes and parsed only once.
+    """
+    self._config = ConfigStore.shared(self._filename)
+    self._mainMenu = self._config.data()
+
+    self._pidConfig = ConfigStore.shared(self._pidFilename)
+    self._menuPID = self._pidConfig.data()
+
+    self.compileMenu()
+
+    self._hardware = HardwareMap.shared(self._hardwareFilename)
+    self._probe = self._hardware.zone(self._sensorName).probe
+    self._heaters = []
+    self._zones = [self._hardware.zone(self._sensorName)]
+    for name in self._heaterNames:
+      zone = self._hardware.zone(name)
+      self._heaters.append(zone)
+      if zone not in self._zones:
+        self._zones.append(zone)
+
+    self._isSetup = True
     
   def run(self):
     """
@@ -60,6 +103,97 @@ class Mode():
     """    
     pass
   
+  def heatersOn(self):
+    """
+      Turn on the heaters of the zones of the Mode.
+    """
+    for zone in self._heaters:
+      zone.on()
+
+  def heatersOff(self):
+    """
+      Turn off the heaters of the zones of the Mode.
+    """
+    for zone in self._heaters:
+      zone.off()
+
+  def zones(self):
+    """
+      Get the zones used by the Mode, the sensor one first.
+
+    Returns:
+      list: the Zone objects.
+    """
+    return self._zones
+
+  def canRun(self):
+    """
+      Get if the settings of the Mode let it run. Modes that may be set up
+      with nothing to do override it.
+
+    Returns:
+      bool: It's True if the Mode can run. Otherwise False.
+    """
+    return True
+
+  def fault(self):
+    """
+      Get if the probe giving the process value is in fault.
+
+    Returns:
+      bool: It's True if the Mode must not drive its heaters. Otherwise False.
+    """
+    return self._isSetup and self._probe.fault()
+
+  def acquire(self):
+    """
+      Take the zones of the Mode before running it. A probe fault is cleared
+      here, if the probe reads again, since starting the Mode is the user's
+      acknowledgement of it.
+
+    Returns:
+      bool: It's True if the probe is not in fault and no other running Mode
+        uses the zones. Otherwise False.
+    """
+    if not self._probe.clearFault():
+      return False
+
+    return self._hardware.acquire(self, self._zones)
+
+  def release(self):
+    """
+      Turn off and free the zones of the Mode after it stops.
+    """
+    if self._isSetup:
+      self._hardware.release(self)
+
+  def remaining(self):
+    """
+      Get the time left to the end of the run. Modes with a known duration
+      override it.
+
+    Returns:
+      int: the seconds left.
+    """
+    return 0
+
+  def publish(self):
+    """
+      Write the state of the run shown by view(). It's called by the
+      control loop after each run() and stop().
+    """
+    if self._isRunning:
+      self.shared.write(self.PV, self.SV, self.rate, self.remaining(), True)
+    else:
+      self.shared.write(self.PV, self.SV, self.rate, 0, False)
+
+  def refresh(self):
+    """
+      Copy the last state published by the control loop to be shown by
+      view(). It's called by the user interface before view().
+    """
+    self.shared.copy(self.state)
+
   def isRunning(self):
     """
       It's represents the Mode state.
@@ -81,6 +215,23 @@ class Mode():
     """
     pass
 
+  def show(self, line0 = "", line1 = ""):
+    """
+      Set the lines returned by view(). A line is the same object while its
+      text has not changed, so the caller can skip writing it to the LCD.
+
+    Args:
+      line0 (str, optional): the first line. Defaults to "".
+      line1 (str, optional): the second line. Defaults to "".
+
+    Returns:
+      list: the two lines.
+    """
+    self._lines[0] = line0
+    self._lines[1] = line1
+
+    return self._lines
+
   def nextMenu(self):
     """
       Set the next menu available.
@@ -117,6 +268,15 @@ class Mode():
     """
     return self._menuCount
   
+  def menuItem(self):
+    """
+      Get the current menu item.
+
+    Returns:
+      MenuItem: the current menu item.
+    """
+    return self._menu[self._menuID]
+
   def menuLabel(self):
     """
       Get the label of the current menu.
@@ -124,19 +284,16 @@ class Mode():
     Returns:
       str: the label of the current menu.
     """
-    if self._menuID < self._mainMenuCount:
-      label = self._mainMenu["order"][self._menuID]
-
-    if self._menuID >= self._mainMenuCount and self._menuID < self._mainMenuCount + self._menuPIDCount:
-      label = self._menuPID["order"][self._menuID - self._mainMenuCount]
+    return self._menu[self._menuID].label
 
-    if self._menuID == self._menuCount - 2:
-      label = "Run"
-
-    if self._menuID == self._menuCount - 1:
-      label = "Home"
+  def menuText(self):
+    """
+      Get the text of the current menu to be displayed on the LCD.
 
-    return str(label)
+    Returns:
+      str: the label and the formatted value of the current menu.
+    """
+    return self._menu[self._menuID].text()
   
   def menuInfo(self, label = ""):
     """
@@ -148,10 +305,7 @@ class Mode():
     Returns:
       dictionary: the dictionary with keys "min", "max", "step", and "unit".
     """
-    if label in ["Kp", "Ki", "Kd", "ap"]:
-      return self._menuPID["info"][label]
-    else:
-      return self._mainMenu["info"][label]
+    return self._items[label].info
 
   def getValue(self, label = ""):
     """
@@ -163,10 +317,7 @@ class Mode():
     Returns:
       mixed: the value of the menu.
     """
-    if label in ["Kp", "Ki", "Kd", "ap"]:
-      return self._menuPID[label]
-    else:
-      return self._mainMenu[label]
+    return self._items[label].get()
 
   def setValue(self, label = "", value = None):
     """
@@ -175,71 +326,149 @@ class Mode():
     Args:
       label (str, optional): the menu label. Defaults to "".
     """
-    if label in ["Kp", "Ki", "Kd", "ap"]:
-      self._menuPID[label] = value
-    else:
-      self._mainMenu[label] = value
+    self._items[label].set(value)
 
-  def increaseParameter(self):
+  def increaseParameter(self, repeats = 0):
     """
       Increase the value of the current menu.
+
+    Args:
+      repeats (int, optional): how many times the key has repeated while
+        held, to accelerate the change. Defaults to 0.
     """
-    label = self.menuLabel()
-    if label not in ["Run", "Home"]:
-      if label in ["Kp", "Ki", "Kd", "ap"]:
-        info = self._menuPID["info"][label]
-        max = info["max"]
-        step = info["step"]
-        if self._menuPID[label] + step <= max:
-          self._menuPID[label] += step
-      else:
-        info = self._mainMenu["info"][label]
-        max = info["max"]
-        step = info["step"]
-        if self._mainMenu[label] + step <= max:
-          self._mainMenu[label] += step
+    self._menu[self._menuID].increase(repeats)
   
-  def decreaseParameter(self):
+  def decreaseParameter(self, repeats = 0):
     """
       Decrease the value of the current menu.
+
+    Args:
+      repeats (int, optional): how many times the key has repeated while
+        held, to accelerate the change. Defaults to 0.
+    """
+    self._menu[self._menuID].decrease(repeats)
+
+  def nextDecade(self):
+    """
+      Multiply the step of the current menu by 10, or go back to the step.
+    """
+    self._menu[self._menuID].nextDecade()
+
+  def menuMarker(self):
     """
-    label = self.menuLabel()
-    if label not in ["Run", "Home"]:
-      if label in ["Kp", "Ki", "Kd", "ap"]:
-        info = self._menuPID["info"][label]
-        min = info["min"]
-        step = info["step"]
-        if self._menuPID[label] - step >= min:
-          self._menuPID[label] -= step
-      else:
-        info = self._mainMenu["info"][label]
-        min = info["min"]
-        step = info["step"]
-        if self._mainMenu[label] - step >= min:
-          self._mainMenu[label] -= step
+      Get the marker shown after the current menu: "[>]", or the
+      multiplier of the step, like "x10".
+
+    Returns:
+      str: the marker.
+    """
+    return self._menu[self._menuID].marker()
+
+  def parameters(self):
+    """
+      Get the labels of the menu entries holding a value, in menu order.
+
+    Returns:
+      list: the labels.
+    """
+    labels = []
+    for item in self._menu:
+      if item.kind == MenuItem.VALUE:
+        labels.append(item.label)
+
+    return labels
+
+  def assign(self, label = "", value = 0):
+    """
+      Set the value of a menu entry, checking its limits.
+
+    Args:
+      label (str, optional): the menu label. Defaults to "".
+      value (int or float, optional): the new value. Defaults to 0.
+
+    Raises:
+      ValueError: the label has no value or the value is out of its limits.
+    """
+    if label not in self._items or not self._items[label].assign(value):
+      raise ValueError(f"{label}={value} not accepted")
+
+  def compileMenu(self):
+    """
+      Build the menu items from the mode and the PID JSON files, followed
+      by Run and Home. It runs once, on setup().
+    """
+    self._menu = []
+    self._items = {}
+    for label in self._mainMenu["order"]:
+      self._menu.append(self.compileItem(label, self._config))
+
+    for label in self._menuPID["order"]:
+      self._menu.append(self.compileItem(label, self._pidConfig))
+
+    self._menu.append(MenuItem("Run"))
+    self._menu.append(MenuItem("Home"))
+
+    for item in self._menu:
+      self._items[item.label] = item
+
+    self._menuCount = len(self._menu)
+
+  def compileItem(self, label = "", store = None):
+    """
+      Build the menu item of a label described in the "info" of its JSON file.
+      Modes with other kinds of parameters override it.
+
+    Args:
+      label (str, optional): the menu label. Defaults to "".
+      store (ConfigStore, optional): the storage of the value. Defaults to None.
+
+    Returns:
+      MenuItem: the menu item.
+    """
+    return MenuItem(label, MenuItem.VALUE, store, label, store.get("info")[label])
   
   def save(self):
     """
-      Save the JSON files used by the Mode for persistence of its data.
+      Write the changed JSON files used by the Mode now. Files without
+      changes are not written.
     """
-    with open(self._filename, "w") as f:
-      json.dump(self._mainMenu, f)
+    if self._isSetup:
+      self._config.flush()
+      self._pidConfig.flush()
 
-    with open(self._pidFilename, "w") as f:
-      json.dump(self._menuPID, f)
+  def idle(self):
+    """
+      Let the Mode write its changed JSON files. It should be called only
+      while the Mode is not running, so the writes never delay the control.
+      Changes are written once they stop arriving for a while.
+    """
+    if self._isSetup:
+      self._config.idle()
+      self._pidConfig.idle()
   
+  def isSetup(self):
+    """
+      Get if the Mode has loaded its configuration and hardware.
+
+    Returns:
+      bool: It's True after setup(). Otherwise False.
+    """
+    return self._isSetup
+
   def lock(self):
     """
-      Lock the Mode to indicate that its being used.
+      Lock the Mode to indicate that its being used. The Mode is set up
+      the first time it's locked.
     """
-    self._isLocked = True
+    if not self._isSetup:
+      self.setup()
 
-    with open(self._pidFilename) as f:
-      self._menuPID = json.load(f)
+    self._isLocked = True
 
   def unlock(self):
     """
-      Unlock the Mode so other ones could be used.
+      Unlock the Mode so other ones could be used. Its changes are written
+      by idle() once no Mode is running.
     """
     self._menuID = 0
     self._isLocked = False
@@ -264,17 +493,7 @@ class Mode():
     Returns:
       str: the concatenated text with 16 characteres.
     """
-    n = 16 - (len(start) + len(end))
-
-    if n <= 0:
-      spaces = " "
-    else:
-      spaces = " "*n
-    
-    line = start + spaces + end
-    line = line[0:16]
-
-    return line
+    return fill(start, end)
 
   def name(self):
     """
@@ -14,11 +14,10 @@
  * along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import time
-from machine import Pin
+from utils import clock
 from mode.mode import Mode
-from utils.max6675 import MAX6675
 from utils.pid import PID
+from utils.ticker import Ticker
 
 class Preheater(Mode):
   """
@@ -26,78 +25,65 @@ class Preheater(Mode):
     That heater must be connected to a mechanical relay or to a 
     State Solid Relay (SSR).
   """
-  def __init__(self, name = "", filename = ""):
-    super().__init__(name, filename)
+  def __init__(self, name = "", filename = "", sensor = "bottom", heaters = ("bottom",)):
+    super().__init__(name, filename, sensor, heaters)
+    self.stopAt = 0
+    self.PV = 0.0
+    self.rate = 0.0
+    self._duration = 0
+    self._ticker = Ticker()
+    self._tickPending = False
+    self._eventDriven = False
+    self._factor = 1.0
+    # self.DEBUG = True
+
+  def setup(self):
+    super().setup()
 
-    self._bottomHeaterTemperature = MAX6675(
-      Pin(10, Pin.OUT), 
-      Pin(11, Pin.OUT), 
-      Pin(12, Pin.IN)
-    )
-    
-    self.bottomHeaterRelay= Pin(15, Pin.OUT)
-    self.bottomHeaterRelay.low()
     self._heaterPID = PID(
       Kp = self.getValue("Kp"),
       Ki = self.getValue("Ki"),
       Kd = self.getValue("Kd"),
     )
-    self.stopAt = 0
-    self.PV = 0.0
-    # self.DEBUG = True
+
+  def remaining(self):
+    return self.getValue("d") - (self._duration + 500)//1000
 
   def view(self):
     if self.isLocked():
       label = self.menuLabel()
       
-      if label == "Run" or label == "Home":
-        line1 = label
+      line1 = self.menuText()
+
+      if self.state.running:
+        state = self.state
+        line0 = self._line0.text(self._pvText.text(state.PV), self._timeText.text(state.remaining))
+        if label == "Run":
+          line1 = self._rateText.text(state.rate)
+        line1 = self._line1.text(line1, "[*]")
       else:
-        value = self.getValue(label)
-        info = self.menuInfo(label)
-        unit = info["unit"]
-        if len(unit) > 0 and unit[0] == "C":
-          unit = "\xDF" + unit
-
-      if label == "SV" or label == "Kp":
-        line1 = label + " " + f"{value:5.1f}{unit}"
-
-      if label == "Ki" or label == "Kd":
-        line1 = label + " " + f"{value:6.3f}{unit}"
-
-      if label == "ap":
-        line1 = label + " " + f"{value:4.1f}{unit}"
-        
-      if label == "d":
-        line1 = label + " " + f"{value:03d}{unit}"
-
-      if self.isRunning():
-        line0 = self.fill(f"PV {self.PV:5.1f}\xDFC", f"{self.display(self.getValue('d') - round(self._duration/1000.0))}")
-        line1 = self.fill(line1, "[*]")
-      else:
-        line0 = self.fill(self.name(), "")
-        line1 = self.fill(line1, "[>]")
+        line0 = self._line0.text(self.name(), "")
+        line1 = self._line1.text(line1, self.menuMarker())
     else:
-      line0 = self.fill("Mode", "")
-      line1 = self.fill(self.name(), "")
-      
-    self._lines = [
-      line0,
-      line1
-    ]
+      line0 = self._line0.text("Mode", "")
+      line1 = self._line1.text(self.name(), "[*]" if self.state.running else "")
 
-    return self._lines
+    return self.show(line0, line1)
 
   def run(self):
-    self.PV = self._bottomHeaterTemperature.read()
+    self.PV = self._probe.read()
+    self.rate = self._probe.rate()
+    if self.fault():
+      self.stop()
+      return
         
     if not self._isRunning:
-      self.startRunning = time.ticks_ms()
+      self.startRunning = clock.ticks_ms()
       self.firstPV = self.PV
       self.SV = self.getValue("SV")
       self.samplePeriod = 1000.0*self.getValue("ap")
       self.runningPeriod = self.getValue("d")
-      self.stopAt = time.ticks_add(self.startRunning, round(self.samplePeriod))
+      self.stopAt = clock.ticks_add(self.startRunning, round(self.samplePeriod))
       self.Kp = self.getValue("Kp")
       self._heaterPID.start(self.PV)
       self._heaterPID.coefficients(
@@ -105,9 +91,14 @@ class Preheater(Mode):
         self.getValue("Ki"),
         self.getValue("Kd")
       )
-      self.lastTime = self.startRunning
-      self._duration = 0.0
-      self.save()
+      self._ticker.setPeriod(round(self.samplePeriod))
+      self._ticker.start(self.startRunning)
+      self._tickPending = False
+      self._eventDriven = self._menuPID.get("eventDriven", False)
+      self._factor = 1.0
+      self._sequence = self._probe.sequence()
+      self._sampleTime = self._probe.timestamp()
+      self._duration = 0
       self._menuID = 0
       self._isRunning = True
       factor = 1.0
@@ -116,33 +107,51 @@ class Preheater(Mode):
         print(f"t;PV;SV;FACTOR;u")
         print(f"{0.0};{self.PV};{self.PV};{factor};0.0")
 
-    now = time.ticks_ms()
-    dt = time.ticks_diff(now, self.lastTime)/1000.0
-    self._duration = time.ticks_diff(now, self.startRunning)
+    now = clock.ticks_ms()
+    self._duration = clock.ticks_diff(now, self.startRunning)
+    sequence = self._probe.sequence()
+
+    #Update the control once per tick of the fixed-rate schedule, with a
+    #conversion it has not seen yet, over the real time between the
+    #conversions used. When event driven, the control is updated on every
+    #conversion and the tick only opens the next relay window.
+    if self._ticker.due(now):
+      if self._eventDriven:
+        self.stopAt = clock.ticks_add(self._ticker.tickTime(), round(self._factor*self.samplePeriod))
+      else:
+        self._tickPending = True
 
-    if time.ticks_diff(now, self.lastTime) > self.samplePeriod:
-      self.u = self._heaterPID.control(self.PV, self.SV, dt)
-      self.lastTime = now
+    if (self._tickPending or self._eventDriven) and sequence != self._sequence:
+      self._tickPending = False
+      sampleTime = self._probe.timestamp()
+      dt = clock.ticks_diff(sampleTime, self._sampleTime)/1000.0
+      self._sampleTime = sampleTime
+      self._sequence = sequence
+      self.u = self._heaterPID.control(self.PV, self.SV, dt, self.rate)
 
       #Calculate actuation period
       factor = 1 - (0.05)**(-self.u/(self.Kp*(-self.SV + self.firstPV)))
       if factor < 0.0:
         factor = 0.0
 
-      self.stopAt = time.ticks_add(now, round(factor*self.samplePeriod))
+      #The relay window starts at the tick deadline, not when it's noticed.
+      #An event driven update resizes the current window only while it's
+      #on, so the relay switches at most twice per window.
+      self._factor = factor
+      if not self._eventDriven or clock.ticks_diff(self.stopAt, now) > 0:
+        self.stopAt = clock.ticks_add(self._ticker.tickTime(), round(factor*self.samplePeriod))
 
       if self.DEBUG:
         print(f"{self._duration/1000.0};{self.PV};{self.SV};{factor};{self.u}")
 
-    if time.ticks_diff(self.stopAt, now) > 0:
-      self.bottomHeaterRelay.high()
+    if clock.ticks_diff(self.stopAt, now) > 0:
+      self.heatersOn()
     else:
-      self.bottomHeaterRelay.low()
+      self.heatersOff()
 
     if self._duration > 1000.0*self.runningPeriod:
       self.stop()
 
   def stop(self):
     self._isRunning = False
-    self.save()
-    self.bottomHeaterRelay.low()
\ No newline at end of file
+    self.heatersOff()
\ No newline at end of file
@@ -14,34 +14,69 @@
  * along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import time
-from machine import Pin
+from utils import clock
 from mode.mode import Mode
-from utils.max6675 import MAX6675
 from utils.pid import PID
 from utils.levels import Levels
+from utils.ticker import Ticker
+from utils.patterns import PatternStore, CurrentPattern
+from mode.menu import MenuItem
+from utils.view import Field
 
 class Reballing(Mode):
   """
     Implements the Reballing Mode to control the temperature of two heater 
     elements. Those heaters must be connected to a mechanical relay or to a 
     State Solid Relay (SSR).
+
+    A pattern with a cooling rate c ends with a cool-down: the setpoint
+    falls at c from the temperature reached until the end temperature e,
+    the fan of the mode (the zone named by "fan" in hardware.json) runs
+    while the board is above the setpoint, and the heaters are pulsed by
+    the PID when it cools faster. The run ends once PV reaches e, once the
+    setpoint has reached e and PV has not fallen by COOLING_DROP degrees
+    for COOLING_STALL seconds (a room too warm to get to e), or after
+    COOLING_TIMEOUT times the time the cool-down should take.
+
+    With "adaptive" in its JSON file, the pattern follows an adaptive
+    Levels timeline: each dwell waits, up to "maxWait" seconds per level,
+    for PV to get within "tolerance" of its limit, and so do the ramps with
+    "followRamp". The remaining time grows by the time waited.
   """
-  def __init__(self, name = "", filename = ""):
-    super().__init__(name, filename)
-    self._ptnID = 1
-
-    self.bottomHeaterTemperature = MAX6675(
-      Pin(10, Pin.OUT),
-      Pin(11, Pin.OUT),
-      Pin(12, Pin.IN)
-    )
-    
-    self.topHeaterRelay = Pin(14, Pin.OUT)
-    self.topHeaterRelay.low()
+  COOLING_TIMEOUT = 2.0
+  COOLING_STALL = 60.0
+  COOLING_DROP = 0.5
 
-    self.bottomHeaterRelay = Pin(15, Pin.OUT)
-    self.bottomHeaterRelay.low()
+  def __init__(self, name = "", filename = "", sensor = "bottom", heaters = ("bottom", "top")):
+    super().__init__(name, filename, sensor, heaters)
+    self._pattern = None
+    self.stopAt = 0
+    self.PV = 0.0
+    self.rate = 0.0
+    self._duration = 0
+    self.SV = 0.0
+    self._levels = Levels()
+    self.stage = ""
+    self._svText = Field("SV {:5.1f}\xDFC".format)
+    self._ticker = Ticker()
+    self._tickPending = False
+    self._eventDriven = False
+    self._factor = 1.0
+    self._fan = None
+    self._cooling = False
+    self._coolingRate = 0.0
+    self._coolingTime = 0.0
+    self._coolingStart = 0.0
+    self._coolingFrom = 0.0
+    self._coolingEnd = 0.0
+    self._lowest = 0.0
+    self._lowestAt = 0.0
+    self._endTemperature = 0.0
+    self._fanOn = False
+    # self.DEBUG = True
+
+  def setup(self):
+    super().setup()
   
     self.Kp = self.getValue("Kp")
     self.heaterPID = PID(
@@ -49,93 +84,107 @@ class Reballing(Mode):
       Ki = self.getValue("Ki"),
       Kd = self.getValue("Kd"),
     )
-    
-    self.stopAt = 0
-    self.PV = 0.0
-    self.SV = 0.0
-    self._levels = Levels()
-    self.stage = ""
     self.samplePeriod = 1000.0*self.getValue("ap")
-    # self.DEBUG = True
+
+    self._fan = None
+    for info in self._hardware.modes():
+      if info["name"] == self._name and "fan" in info:
+        self._fan = self._hardware.zone(info["fan"])
+        if self._fan not in self._zones:
+          self._zones.append(self._fan)
+
+  def remaining(self):
+    if self._cooling:
+      left = (self.PV - self._endTemperature)/self._coolingRate
+      return round(left) if left > 0.0 else 0
+
+    return round(self._levels.duration() - self._levels.elapsed() + self._coolingTime)
 
   def view(self):
     if self.isLocked():
       label = self.menuLabel()
       
-      if label == "Run" or label == "Home":
-        line1 = label
-
-      if label == "PTN":
-        line1 = f"PTN{self._ptnID}"
-        unit = ""
-
-      if label not in ["PTN", "Run", "Home"]:
-        value = self.getValue(label)
-        info = self.menuInfo(label)
-        unit = info["unit"]
-        if len(unit) > 0 and unit[0] == "C":
-          unit = "\xDF" + unit
-
-      if label == "SV" or label == "Kp":
-        line1 = label + " " + f"{value:5.1f}{unit}"
-
-      if label == "Ki" or label == "Kd":
-        line1 = label + " " + f"{value:6.3f}{unit}"
-
-      if label == "ap":
-        line1 = label + " " + f"{value:4.1f}{unit}"
-        
-      if label == "d":
-        line1 = label + " " + f"{value:03d}{unit}"
-
-      if label[0] == 'r':
-        value = self._mainMenu[f"PTN{self._ptnID}"][label]
-        line1 = label + " " + f"{value:5.2f}{unit}"
-      
-      if label[0] in ['L', 'd']:
-        value = self._mainMenu[f"PTN{self._ptnID}"][label]
-        line1 = label + " " + f"{value:5.1f}{unit}"
-      
-      if self.isRunning():
-        line0 = self.fill(f"PV {self.PV:5.1f}\xDFC", f"{self.display(round(self._levels.duration() - self._duration))}")
+      line1 = self.menuText()
+
+      if self.state.running:
+        state = self.state
+        line0 = self._line0.text(self._pvText.text(state.PV), self._timeText.text(state.remaining))
         if label == "PTN":
-          line1 = self.fill(f"SV {self.SV:5.1f}\xDFC", "[*]")
-        else:
-          line1 = self.fill(line1, "[*]")
+          line1 = self._svText.text(state.SV)
+        elif label == "Run":
+          line1 = self._rateText.text(state.rate)
+        line1 = self._line1.text(line1, "[*]")
       else:
-        line0 = self.fill(self.name(), "")
-        line1 = self.fill(line1, "[>]")       
+        line0 = self._line0.text(self.name(), "")
+        line1 = self._line1.text(line1, self.menuMarker())
     else:
-      line0 = self.fill("Mode", "")
-      line1 = self.fill(self.name(), "")
-      
-    self._lines = [
-      line0,
-      line1
-    ]
+      line0 = self._line0.text("Mode", "")
+      line1 = self._line1.text(self.name(), "[*]" if self.state.running else "")
 
-    return self._lines
+    return self.show(line0, line1)
+
+  def levels(self):
+    """
+      Get the levels of the current pattern, up to the first with r = 0.
+
+    Returns:
+      list: the [r, L, d] of each level.
+    """
+    levels = []
+    for i in range(1, 6):
+      r = self.getValue(f"r{i}")
+
+      if r == 0.0:
+        break
+
+      L =  self.getValue(f"L{i}")
+      d = self.getValue(f"d{i}") 
+       
+      levels.append([r, L, d])
+
+    return levels
+
+  def canRun(self):
+    return len(self.levels()) > 0
 
   def run(self):
-    self.PV = self.bottomHeaterTemperature.read()
+    self.PV = self._probe.read()
+    self.rate = self._probe.rate()
+    if self.fault():
+      self.stop()
+      return
 
     if not self._isRunning:
-      levels = []
-      for i in range(1, 6):
-        r = self.getValue(f"r{i}")
+      #A pattern not stored yet is all zeros: there is nothing to run.
+      levels = self.levels()
+      if len(levels) == 0:
+        self.stop()
+        return
 
-        if r == 0.0:
-          break
+      #The cool-down is estimated from the last limit to the end temperature.
+      #A pattern saved before it existed may have e = 0.
+      self._coolingRate = self.getValue("c")
+      self._endTemperature = max(self.getValue("e"), self.menuInfo("e")["min"])
+      self._coolingTime = 0.0
+      if self._coolingRate > 0.0 and len(levels) > 0 and levels[-1][1] > self._endTemperature:
+        self._coolingTime = (levels[-1][1] - self._endTemperature)/self._coolingRate
+      self._cooling = False
+      self._fanOn = False
 
-        L =  self.getValue(f"L{i}")
-        d = self.getValue(f"d{i}") 
-         
-        levels.append([r, L, d])
-
-      self._startRunning = time.ticks_ms()
-      self._lastTime = self._startRunning
+      self._startRunning = clock.ticks_ms()
+      self._sequence = self._probe.sequence()
+      self._sampleTime = self._probe.timestamp()
       self._duration = 0.0
-      self._levels = Levels(self.PV, levels)
+      tolerance = 0.0
+      if self._mainMenu.get("adaptive", False):
+        tolerance = self._mainMenu.get("tolerance", 3.0)
+      self._levels = Levels(
+        self.PV,
+        levels,
+        tolerance,
+        self._mainMenu.get("maxWait", 300),
+        self._mainMenu.get("followRamp", False)
+      )
       self.heaterPID.start(self.PV)
       self.Kp = self.getValue("Kp")
       self.heaterPID.coefficients(
@@ -144,8 +193,12 @@ class Reballing(Mode):
         self.getValue("Kd")
       )
       self.samplePeriod = 1000.0*self.getValue("ap")
-      self.stopAt = time.ticks_add(self._startRunning, round(self.samplePeriod))
-      self.save()
+      self.stopAt = clock.ticks_add(self._startRunning, round(self.samplePeriod))
+      self._ticker.setPeriod(round(self.samplePeriod))
+      self._ticker.start(self._startRunning)
+      self._tickPending = False
+      self._eventDriven = self._menuPID.get("eventDriven", False)
+      self._factor = 1.0
       self._menuID = 0   
       self.u = 0
       self._isRunning = True
@@ -154,18 +207,42 @@ class Reballing(Mode):
         print(f"t;PV;SV;FACTOR;u")
         print(f"{0.0};{self.PV};{self.PV};{factor};0.0")
 
-    now = time.ticks_ms()
-    dt = time.ticks_diff(now, self._lastTime)/1000.0
-    self._duration = time.ticks_diff(now, self._startRunning)/1000.0
+    now = clock.ticks_ms()
+    self._duration = clock.ticks_diff(now, self._startRunning)/1000.0
+    sequence = self._probe.sequence()
+
+    if self._cooling:
+      self.SV = self._coolingFrom - self._coolingRate*(self._duration - self._coolingStart)
+      if self.SV < self._endTemperature:
+        self.SV = self._endTemperature
+    else:
+      self.SV, self.stage = self._levels.value(self._duration, self.PV)
 
-    self.SV, self.stage = self._levels.value(self._duration)
+    #Update the control once per tick of the fixed-rate schedule, with a
+    #conversion it has not seen yet, over the real time between the
+    #conversions used. When event driven, the control is updated on every
+    #conversion and the tick only opens the next relay window.
+    if self._ticker.due(now):
+      if self._eventDriven:
+        self.stopAt = clock.ticks_add(self._ticker.tickTime(), round(self._factor*self.samplePeriod))
+      else:
+        self._tickPending = True
 
-    if time.ticks_diff(now, self._lastTime) > self.samplePeriod:
-      self.u = self.heaterPID.control(self.PV, self.SV, dt)
-      self._lastTime = now
+    if (self._tickPending or self._eventDriven) and sequence != self._sequence:
+      self._tickPending = False
+      sampleTime = self._probe.timestamp()
+      dt = clock.ticks_diff(sampleTime, self._sampleTime)/1000.0
+      self._sampleTime = sampleTime
+      self._sequence = sequence
+      self.u = self.heaterPID.control(self.PV, self.SV, dt, self.rate)
 
       #Calculate actuation period
-      factor = 1 - (0.05)**(-self.u/(self.Kp*(-self._levels.limit() + self._levels.start())))
+      if self._cooling:
+        span = self._coolingFrom - self._endTemperature
+        self._fanOn = self.PV > self.SV
+      else:
+        span = self._levels.limit() - self._levels.start()
+      factor = 1 - (0.05)**(self.u/(self.Kp*span))
       if factor < 0.0:
         factor = 0.0
 
@@ -174,101 +251,129 @@ class Reballing(Mode):
       if self._actuationPeriod > self.samplePeriod:
         self._actuationPeriod = self.samplePeriod
 
-      self.stopAt = time.ticks_add(now, round(self._actuationPeriod))
+      #The relay window starts at the tick deadline, not when it's noticed.
+      #An event driven update resizes the current window only while it's
+      #on, so the relay switches at most twice per window.
+      self._factor = self._actuationPeriod/self.samplePeriod
+      if not self._eventDriven or clock.ticks_diff(self.stopAt, now) > 0:
+        self.stopAt = clock.ticks_add(self._ticker.tickTime(), round(self._actuationPeriod))
 
       if self.DEBUG:
         print(f"{self._duration};{self.PV};{self.SV};{factor};{self.u}")
 
-    if time.ticks_diff(self.stopAt, now) > 0:
-      self.bottomHeaterRelay.high()
-      self.topHeaterRelay.high()
+    if clock.ticks_diff(self.stopAt, now) > 0:
+      self.heatersOn()
     else:
-      self.bottomHeaterRelay.low()
-      self.topHeaterRelay.low()
+      self.heatersOff()
 
-    if self._duration > self._levels.duration():
-      self.stop()
+    if self._fan is not None:
+      if self._fanOn:
+        self._fan.on()
+      else:
+        self._fan.off()
+
+    if self._cooling:
+      if self.PV < self._lowest - Reballing.COOLING_DROP:
+        self._lowest = self.PV
+        self._lowestAt = self._duration
+
+      if self.PV <= self._endTemperature or self._duration > self._coolingEnd:
+        self.stop()
+      elif self.SV <= self._endTemperature and self._duration - self._lowestAt > Reballing.COOLING_STALL:
+        self.stop()
+    elif self._levels.elapsed() > self._levels.duration():
+      if self._coolingRate > 0.0 and self.PV > self._endTemperature:
+        self.cool()
+      else:
+        self.stop()
+
+  def cool(self):
+    """
+      Start the cool-down from the current temperature. The PID starts
+      again, so the heaters are only pulsed if the board cools faster than
+      the cooling rate.
+    """
+    self._cooling = True
+    self._coolingStart = self._duration
+    self._coolingFrom = self.PV
+    self._coolingEnd = self._duration + Reballing.COOLING_TIMEOUT*(self.PV - self._endTemperature)/self._coolingRate
+    self._lowest = self.PV
+    self._lowestAt = self._duration
+    self.stage = "C"
+    self.heaterPID.start(self.PV)
+    self._fanOn = True
 
   def stop(self):
     self._isRunning = False
-    self.save()
-    self.bottomHeaterRelay.low()
-    self.topHeaterRelay.low()
+    self._cooling = False
+    self._fanOn = False
+    self.heatersOff()
+    if self._fan is not None:
+      self._fan.off()
 
-  def menuInfo(self, label = ""):
-    if label in ["Kp", "Ki", "Kd", "ap"]:
-      return self._menuPID["info"][label]
-    else:
-      if label[0] in ["r", "L", "d"]:
-        return self._mainMenu["info"][label[0]]
-      else:
-        return self._mainMenu["info"][label]
+  def compileMenu(self):
+    self._pattern = CurrentPattern(PatternStore(), self._config.get("PTN"))
+    super().compileMenu()
+
+  def compileItem(self, label = "", store = None):
+    info = self._mainMenu["info"]
+    if label == "PTN":
+      return MenuItem(label, MenuItem.VALUE, store, label, info[label], "PTN{}", self._pattern.select)
 
-  def getValue(self, label = ""):
-    if label in ["Kp", "Ki", "Kd", "ap"]:
-      return self._menuPID[label]
+    if label[0] in ["r", "L", "d", "c", "e"]:
+      return MenuItem(label, MenuItem.VALUE, self._pattern, label, info[label[0]])
+
+    return super().compileItem(label, store)
+
+  def readPattern(self, n = 1):
+    """
+      Get a stored pattern, with the changes not written yet if it's the
+      current one.
+
+    Args:
+      n (int, optional): the pattern number. Defaults to 1.
+
+    Returns:
+      dictionary: the pattern with the keys r1, L1, d1, ..., r5, L5, d5, c
+        and e.
+    """
+    return self._pattern.load(n)
+
+  def writePattern(self, n = 1, values = None):
+    """
+      Change some values of a pattern and write it.
+
+    Args:
+      n (int, optional): the pattern number. Defaults to 1.
+      values (dictionary, optional): the new values, for example
+        {"r1": 0.9}. Defaults to None.
+
+    Raises:
+      ValueError: a key or a value is out of the limits of the pattern.
+    """
+    info = self._mainMenu["info"]
+    if n < info["PTN"]["min"] or n > info["PTN"]["max"]:
+      raise ValueError(f"pattern {n} not accepted")
+
+    pattern = self.readPattern(n)
+    for key, value in values.items():
+      if key not in pattern or value < info[key[0]]["min"] or value > info[key[0]]["max"]:
+        raise ValueError(f"{key}={value} not accepted")
+
+    if n == self._pattern.number():
+      for key, value in values.items():
+        self._items[key].assign(value)
+      self._pattern.save()
     else:
-      if label[0] in ["r", "L", "d"]:
-        return self._mainMenu[f"PTN{self._ptnID}"][label]
-      else:
-        return self._mainMenu[label]
+      pattern.update(values)
+      self._pattern.write(n, pattern)
 
-  def setValue(self, label = "", value = None):
-    if label not in ["Run", "Home"]:
-      if label in ["Kp", "Ki", "Kd", "ap"]:
-        self._menuPID[label] = value
-      else:
-        if label[0] in ["r", "L", "d"]:
-          self._mainMenu[f"PTN{self._ptnID}"][label] = value
-        else:
-          self._mainMenu[label] = value
-  
-  def increaseParameter(self):
-    label = self.menuLabel()     
-    if label not in ["Run", "Home"]:
-      if label in ["Kp", "Ki", "Kd", "ap"]:
-        info = self._menuPID["info"][label]
-        max = info["max"]
-        step = info["step"]
-        if self._menuPID[label] + step <= max:
-          self._menuPID[label] += step
-      else:
-        if label[0] in ['r', 'L', 'd']:       
-          info = self._mainMenu["info"][label[0]]
-          max = info["max"]
-          step = info["step"]
-          
-          if self._mainMenu[f"PTN{self._ptnID}"][label] + step <= max:
-            self._mainMenu[f"PTN{self._ptnID}"][label] += step
-        else:
-          info = self._mainMenu["info"][label]
-          max = info["max"]
-          step = info["step"]
-          
-          if self._ptnID + step <= max:
-            self._ptnID += step
-            
-  def decreaseParameter(self):
-    label = self.menuLabel()  
-    if label not in ["Run", "Home"]:
-      if label in ["Kp", "Ki", "Kd", "ap"]:
-        info = self._menuPID["info"][label]
-        min = info["min"]
-        step = info["step"]
-        if self._menuPID[label] - step >= min:
-          self._menuPID[label] -= step
-      else:
-        if label[0] in ['r', 'L', 'd']:       
-          info = self._mainMenu["info"][label[0]]
-          min = info["min"]
-          step = info["step"]
-          
-          if self._mainMenu[f"PTN{self._ptnID}"][label] - step >= min:
-            self._mainMenu[f"PTN{self._ptnID}"][label] -= step
-        else:
-          info = self._mainMenu["info"][label]
-          min = info["min"]
-          step = info["step"]
-          
-          if self._ptnID - step >= min:
-            self._ptnID -= step
\ No newline at end of file
+  def save(self):
+    super().save()
+    if self._isSetup:
+      self._pattern.save()
+
+  def idle(self):
+    super().idle()
+    if self._isSetup:
+      self._pattern.idle()
\ No newline at end of file
@@ -14,12 +14,10 @@
  * along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import time
-from machine import Pin
+from utils import clock
 from mode.mode import Mode
-from utils.max6675 import MAX6675
-from utils.extreme import Extreme
-from utils.linear_regression import LinearRegression
+from utils.stats import Regression, Extremes
+from utils.ticker import Ticker
 
 class Tuning(Mode):
   """
@@ -29,113 +27,87 @@ class Tuning(Mode):
     the two heater elements and use that data to calculate the parameters
     for a PID controller. 
   """
-  def __init__(self, name = "", filename = ""):
-    super().__init__(name, filename)
- 
-    self._bottomHeaterTemperature = MAX6675(
-      Pin(10, Pin.OUT),
-      Pin(11, Pin.OUT),
-      Pin(12, Pin.IN)
-    )
-    self._bottomHeaterSSR = Pin(15, Pin.OUT)
-    self._bottomHeaterSSR.low()
-
-    self._topHeaterTemperature = MAX6675(
-      Pin(7, Pin.OUT),
-      Pin(8, Pin.OUT),
-      Pin(9, Pin.IN)
-    )
-    self._topHeaterSSR = Pin(14, Pin.OUT)
-    self._topHeaterSSR.low()
-    
+  def __init__(self, name = "", filename = "", sensor = "bottom", heaters = ("bottom", "top")):
+    super().__init__(name, filename, sensor, heaters)
     self.PV = 0.0
+    self.rate = 0.0
+    self._duration = 0
     self.firstPV = 0.0
+    self.stopAt = 0
+    self._ticker = Ticker()
+    # self.DEBUG = True
+
+  def setup(self):
+    super().setup()
+
     self.SV = self.getValue("SV")
     self.runPeriod = 1000.0*self.getValue("d")
     self.samplePeriod = 1000.0*self.getValue("ap")
-    self.stopAt = 0
-    # self.DEBUG = True
+
+  def remaining(self):
+    return self.getValue("d") - (self._duration + 500)//1000
 
   def view(self):
     if self.isLocked():
       label = self.menuLabel()
       
-      if label == "Run" or label == "Home":
-        line1 = label
+      line1 = self.menuText()
+
+      if self.state.running:
+        state = self.state
+        line0 = self._line0.text(self._pvText.text(state.PV), self._timeText.text(state.remaining))
+        if label == "Run":
+          line1 = self._rateText.text(state.rate)
+        line1 = self._line1.text(line1, "[*]")
       else:
-        value = self.getValue(label)
-        info = self.menuInfo(label)
-        unit = info["unit"]
-        if len(unit) > 0 and unit[0] == "C":
-          unit = "\xDF" + unit
-
-      if label == "SV" or label == "Kp":
-        line1 = label + " " + f"{value:5.1f}{unit}"
-
-      if label == "Ki" or label == "Kd":
-        line1 = label + " " + f"{value:6.3f}{unit}"
-
-      if label == "ap":
-        line1 = label + " " + f"{value:4.1f}{unit}"
-        
-      if label == "d":
-        line1 = label + " " + f"{value:03d}{unit}"
-
-      if self.isRunning():
-        line0 = self.fill(f"PV {self.PV:5.1f}\xDFC", f"{self.display(self.getValue('d') - round(self._duration/1000.0))}")
-        line1 = self.fill(line1, "[*]")
-      else:
-        line0 = self.fill(self.name(), "")
-        line1 = self.fill(line1, "[>]")
+        line0 = self._line0.text(self.name(), "")
+        line1 = self._line1.text(line1, self.menuMarker())
     else:
-      line0 = self.fill("Mode", "")
-      line1 = self.fill(self.name(), "")
-      
-    self._lines = [
-      line0,
-      line1
-    ]
+      line0 = self._line0.text("Mode", "")
+      line1 = self._line1.text(self.name(), "[*]" if self.state.running else "")
 
-    return self._lines
+    return self.show(line0, line1)
 
   def run(self):
-    self.PV = self._bottomHeaterTemperature.read()
+    self.PV = self._probe.read()
+    self.rate = self._probe.rate()
+    if self.fault():
+      self.stop()
+      return
 
     if not self._isRunning:
-      self._startRunning = time.ticks_ms()
-      self._lastTime = self._startRunning
-      self._duration = 0.0
-      
-      self.e = Extreme()
-      self.lr = LinearRegression()
+      self._startRunning = clock.ticks_ms()
+      self._duration = 0
       
+      self._extremes = Extremes()
+      self._trend = Regression()
       self._integral = 0.0
+      self._sequence = self._probe.sequence()
 
-      self.stopAt = time.ticks_add(self._startRunning, round(self.samplePeriod))
-      self._Min = 1.0e+20
-      self._Max = 1.0e-20
+      self.stopAt = clock.ticks_add(self._startRunning, round(self.samplePeriod))
       self._firstCross = False
+      self._firstCrossTime = 0
       self.SV = self.getValue("SV")
       self.runPeriod = 1000.0*self.getValue("d")
       self.samplePeriod = 1000.0*self.getValue("ap")
+      self._ticker.setPeriod(round(self.samplePeriod))
+      self._ticker.start(self._startRunning)
       self.firstPV = self.PV
       self.lastPV = self.PV
       self._menuID = 0
       self._isRunning = True
-      self.save()
       factor = 1.0
       if self.DEBUG:
         print(f"t;PV;SV;FACTOR")
         print(f"{0.0};{self.PV};{self.PV};{factor}")
 
-    now = time.ticks_ms()
-    self._duration = time.ticks_diff(now, self._startRunning)
-    deltat = time.ticks_diff(now, self._lastTime)
-   
-    if deltat > self.samplePeriod:
+    now = clock.ticks_ms()
+    self._duration = clock.ticks_diff(now, self._startRunning)
+
+    #Switch the heaters once per tick of the fixed-rate schedule.
+    if self._ticker.due(now):
       duration = self._duration/1000.0
-      deltat /= 1000.0
-     
+
       if self.PV < self.SV:
         factor = 1.0
       else:
@@ -145,44 +117,43 @@ class Tuning(Mode):
           self._firstCrossTime = self._duration
           self._zeroCrosses = 0
 
-      self.stopAt = time.ticks_add(now, round(self.samplePeriod*factor))
-
-      #Save current values as past values
-      self._lastTime = now
+      #The relay window starts at the tick deadline, not when it's noticed.
+      self.stopAt = clock.ticks_add(self._ticker.tickTime(), round(self.samplePeriod*factor))
 
       if self.DEBUG:
         print(f"{duration};{self.PV};{self.SV};{factor}")
 
-    if self._firstCross:
-      #Keep track of the minimum, maximum, and zeros for PV
-      self.e.sample(self.PV)
-      
-      if (self.SV - self.lastPV)*(self.SV - self.PV) < 0.0:
-        self._zeroCrosses += 1
-      
-      self._integral += self.PV - self.SV
-    else:
-      #Keep track of PV for calculate the linear regression
-      self.lr.sample(self._duration/1000.0, self.PV)
+    #Process each conversion once, weighted by the time between conversions.
+    sequence = self._probe.sequence()
+    if sequence != self._sequence:
+      self._sequence = sequence
+      sampleTime = clock.ticks_diff(self._probe.timestamp(), self._startRunning)
+
+      if self._firstCross:
+        #Keep track of the minimum, maximum, integral, and zeros for PV
+        self._extremes.sample(self.PV, sampleTime)
+        
+        if (self.SV - self.lastPV)*(self.SV - self.PV) < 0.0:
+          self._zeroCrosses += 1
+        
+        self._integral += (self.PV - self.SV)*self._probe.interval()/1000.0
+      else:
+        #Keep track of PV for calculate the linear regression
+        self._trend.sample(sampleTime/1000.0, self.PV)
 
-    self.lastPV = self.PV
+      self.lastPV = self.PV
 
-    if time.ticks_diff(self.stopAt, now) > 0:
-      self._bottomHeaterSSR.high()
-      self._topHeaterSSR.high()
+    if clock.ticks_diff(self.stopAt, now) > 0:
+      self.heatersOn()
     else:
-      self._bottomHeaterSSR.low()
-      self._topHeaterSSR.low()
+      self.heatersOff()
 
     if self._duration > 1000.0*self._mainMenu["d"]:
-      self._regression = self.lr.regression()
-      self.setValue("Kp", round(self.e.xMax() - self.e.xMin(), 1))
-      self.setValue("Ki", round(0.025*(self._integral*(self._mainMenu['d'] - self._firstCrossTime/1000.0)/(self.e.numberOfSamples()*(self.SV - self.firstPV))), 3))
-      self.setValue("Kd", round(0.05*self._regression[0], 3))
+      self.setValue("Kp", round(self._extremes.range(), 1))
+      self.setValue("Ki", round(0.025*self._integral/(self.SV - self.firstPV), 3))
+      self.setValue("Kd", round(0.05*self._trend.slope(), 3))
       self.stop()
 
   def stop(self):
     self._isRunning = False
-    self.save()
-    self._bottomHeaterSSR.low()
-    self._topHeaterSSR.low()
\ No newline at end of file
+    self.heatersOff()
\ No newline at end of file
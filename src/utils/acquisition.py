@@ -0,0 +1,201 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from utils import clock
+from utils.max6675 import MAX6675
+
+class Acquisition:
+  """
+    Implements the reading of the probes of every zone by the control loop.
+    The first conversions start spread over the conversion period, and a
+    probe starts its next conversion when it's read, so the probes stay
+    staggered and each one delivers a value every period. Each step()
+    reads at most maxReads probes, the one whose conversion waits the
+    longest first, which bounds the time the bit-banged transfers take from
+    a pass of the loop.
+
+    The modes get the values with Probe.read(), which leaves the sensors of
+    scheduled probes alone. The reads, the errors, the interval between
+    conversions and the largest age reached by the value of each probe
+    are recorded.
+  """
+  def __init__(self, zones = (), maxReads = 1, period = MAX6675.MEASUREMENT_PERIOD_MS):
+    """
+      Initialize an Acquisition object and start the conversions.
+    Args:
+      zones (list, optional): the Zone objects; those without a probe are
+        ignored. Defaults to ().
+      maxReads (int, optional): the most probes read by a step().
+        Defaults to 1.
+      period (int, optional): the conversion period in milliseconds.
+        Defaults to MAX6675.MEASUREMENT_PERIOD_MS.
+    """
+    self._allZones = zones
+    self._maxReads = maxReads
+    self._period = period
+    self.start(clock.ticks_ms())
+
+  def start(self, now = 0):
+    """
+      Schedule the probes, spreading the start of their first conversions
+      over the period, and clear the statistics.
+    Args:
+      now (int, optional): the current time (clock.ticks_ms). Defaults to 0.
+    """
+    self._zones = [zone for zone in self._allZones if zone.probe is not None]
+    count = len(self._zones)
+    self._names = [zone.name for zone in self._zones]
+    self._due = [clock.ticks_add(now, i*self._period//count) for i in range(count)]
+    self._waiting = [True]*count
+    self._reads = [0]*count
+    self._errors = [0]*count
+    self._maxAge = [0]*count
+    self._intervals = [0]*count
+    self._maxInterval = [0]*count
+    self._next = now
+    for zone in self._zones:
+      zone.probe.setScheduled(True)
+
+  def step(self, now = 0):
+    """
+      Start the conversions due and read up to maxReads probes with a
+      finished conversion.
+    Args:
+      now (int, optional): the current time (clock.ticks_ms). Defaults to 0.
+
+    Returns:
+      int: the number of probes read.
+    """
+    #Most passes have nothing to do until the earliest time due.
+    if clock.ticks_diff(self._next, now) > 0:
+      return 0
+
+    count = len(self._zones)
+    reads = 0
+    while reads < self._maxReads:
+      chosen = -1
+      oldest = 0
+      for i in range(count):
+        #A conversion takes a period, so the sensor is not asked before.
+        if clock.ticks_diff(self._due[i], now) > 0:
+          continue
+
+        probe = self._zones[i].probe
+        if self._waiting[i]:
+          self._waiting[i] = False
+          self._due[i] = clock.ticks_add(now, self._period)
+          probe.refresh()
+        elif probe.ready():
+          if chosen < 0 or clock.ticks_diff(probe.timestamp(), oldest) < 0:
+            chosen = i
+            oldest = probe.timestamp()
+
+      if chosen < 0:
+        break
+
+      probe = self._zones[chosen].probe
+      if probe.sample():
+        self._reads[chosen] += 1
+        if probe.error():
+          self._errors[chosen] += 1
+        age = clock.ticks_diff(now, oldest)
+        if age > self._maxAge[chosen]:
+          self._maxAge[chosen] = age
+        #The first interval counts from the creation of the probe.
+        if self._reads[chosen] > 1:
+          interval = probe.interval()
+          self._intervals[chosen] += interval
+          if interval > self._maxInterval[chosen]:
+            self._maxInterval[chosen] = interval
+      #Reading the sensor starts its next conversion.
+      self._due[chosen] = clock.ticks_add(now, self._period)
+      reads += 1
+
+    self._next = clock.ticks_add(now, self._period)
+    for i in range(count):
+      if clock.ticks_diff(self._due[i], self._next) < 0:
+        self._next = self._due[i]
+
+    return reads
+
+  def names(self):
+    """
+      Get the zones whose probes are scheduled.
+    Returns:
+      list: the zone names.
+    """
+    return self._names
+
+  def reads(self, name = ""):
+    """
+      Get the conversions read from a probe.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+
+    Returns:
+      int: the number of reads.
+    """
+    return self._reads[self._names.index(name)]
+
+  def errors(self, name = ""):
+    """
+      Get the readings of a probe with the error bit set.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+
+    Returns:
+      int: the number of errors.
+    """
+    return self._errors[self._names.index(name)]
+
+  def maxAge(self, name = ""):
+    """
+      Get the largest age of the value of a probe when a new conversion
+      replaced it.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+
+    Returns:
+      int: the age (in milliseconds).
+    """
+    return self._maxAge[self._names.index(name)]
+
+  def meanInterval(self, name = ""):
+    """
+      Get the mean time between the conversions read from a probe.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+
+    Returns:
+      float: the interval (in milliseconds).
+    """
+    i = self._names.index(name)
+    if self._reads[i] < 2:
+      return 0.0
+
+    return self._intervals[i]/(self._reads[i] - 1)
+
+  def report(self):
+    """
+      Get a summary of the statistics.
+    Returns:
+      str: the reads, errors, interval and largest age of each probe.
+    """
+    items = []
+    for i in range(len(self._zones)):
+      items.append(f"{self._names[i]}: reads={self._reads[i]} errors={self._errors[i]} interval mean={self.meanInterval(self._names[i]):.1f} max={self._maxInterval[i]} age max={self._maxAge[i]}")
+
+    return "; ".join(items)
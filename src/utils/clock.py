@@ -0,0 +1,139 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# The time base of the FCR. Every timing of the code reads and waits with
+# the functions of this module, as clock.ticks_ms(), never with the time
+# module, so a simulation can replace the time with use(). On the device
+# they are the functions of time; after use(VirtualClock()) they read and
+# advance a clock moved by the program.
+#
+# The ticks wrap around at PERIOD; compare them only with ticks_diff().
+
+import time
+
+PERIOD = 1 << 30
+_MASK = PERIOD - 1
+_HALF = PERIOD >> 1
+
+def _ticks_add(ticks, delta):
+  return (ticks + delta) & _MASK
+
+def _ticks_diff(ticks1, ticks2):
+  return ((ticks1 - ticks2 + _HALF) & _MASK) - _HALF
+
+class VirtualClock:
+  """
+    Implements a clock moved by the program instead of the real time, with
+    the ticks wrapping around at PERIOD like on the RP2040. The sleep
+    functions advance it at once. With a rate, it also runs by itself,
+    rate times faster than the real time.
+  """
+  def __init__(self, start = 0, rate = 0.0):
+    """
+      Initialize a VirtualClock object.
+    Args:
+      start (int, optional): the first time in microseconds; start near
+        PERIOD*1000 to test the wrap-around. Defaults to 0.
+      rate (float, optional): the virtual seconds per real second, 0 for a
+        clock moved only by advance() and the sleep functions.
+        Defaults to 0.0.
+    """
+    self._us = start
+    self._rate = rate
+    self._real = _real() if rate > 0 else 0
+
+  def _update(self):
+    if self._rate > 0:
+      real = _real()
+      self._us += int(self._rate*_elapsed(real, self._real))
+      self._real = real
+
+  def now(self):
+    """
+      Get the time without wrap-around.
+    Returns:
+      int: the microseconds since 0.
+    """
+    self._update()
+    return self._us
+
+  def advance(self, us = 0):
+    """
+      Move the clock forward.
+    Args:
+      us (int, optional): the microseconds. Defaults to 0.
+    """
+    if us > 0:
+      self._us += int(us)
+
+  def ticks_ms(self):
+    self._update()
+    return (self._us//1000) & _MASK
+
+  def ticks_us(self):
+    self._update()
+    return self._us & _MASK
+
+  def ticks_add(self, ticks, delta):
+    return _ticks_add(ticks, delta)
+
+  def ticks_diff(self, ticks1, ticks2):
+    return _ticks_diff(ticks1, ticks2)
+
+  def sleep(self, seconds):
+    self.advance(1000000*seconds)
+
+  def sleep_ms(self, ms):
+    self.advance(1000*ms)
+
+  def sleep_us(self, us):
+    self.advance(us)
+
+def _real():
+  if hasattr(time, "ticks_us"):
+    return time.ticks_us()
+
+  return time.monotonic_ns()//1000
+
+def _elapsed(real1, real2):
+  if hasattr(time, "ticks_diff"):
+    return time.ticks_diff(real1, real2)
+
+  return real1 - real2
+
+def use(backend = None):
+  """
+    Make backend the time base of every module.
+  Args:
+    backend (object, optional): an object with the functions ticks_ms,
+      ticks_us, ticks_add, ticks_diff, sleep, sleep_ms and sleep_us, like
+      a VirtualClock. The time module is used if it's None.
+      Defaults to None.
+  """
+  global ticks_ms, ticks_us, ticks_add, ticks_diff, sleep, sleep_ms, sleep_us
+  if backend is None:
+    backend = time
+
+  ticks_ms = backend.ticks_ms
+  ticks_us = backend.ticks_us
+  ticks_add = backend.ticks_add
+  ticks_diff = backend.ticks_diff
+  sleep = backend.sleep
+  sleep_ms = backend.sleep_ms
+  sleep_us = backend.sleep_us
+
+#Outside MicroPython, without the ticks of time, the clock runs in real time.
+use(None if hasattr(time, "ticks_ms") else VirtualClock(0, 1.0))
@@ -0,0 +1,186 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+from utils import clock
+
+class ConfigStore:
+  """
+    Implements the persistence of a JSON configuration file. The data is
+    kept in memory and the keys changed since the last write are tracked.
+    Changes are coalesced and written only at idle time, to a temporary
+    file that is then renamed over the original one, so a power cut never
+    leaves a half written file behind.
+  """
+  IDLE_DELAY_MS = 2000
+  _shared = {}
+
+  @staticmethod
+  def shared(filename = ""):
+    """
+      Get the ConfigStore of a file shared by every user of that file. The
+      file is parsed only the first time it's requested.
+    Args:
+      filename (str, optional): the JSON file. Defaults to "".
+
+    Returns:
+      ConfigStore: the shared store.
+    """
+    store = ConfigStore._shared.get(filename)
+    if store is None:
+      store = ConfigStore(filename)
+      ConfigStore._shared[filename] = store
+
+    return store
+
+  def __init__(self, filename = ""):
+    """
+      Initialize a ConfigStore object.
+    Args:
+      filename (str, optional): the JSON file. Defaults to "".
+    """
+    self._filename = filename
+    self._tempFilename = filename + ".tmp"
+    self._dirty = set()
+    self._changedAt = 0
+    self._writes = 0
+    self._data = self._load()
+
+  def _load(self):
+    try:
+      with open(self._filename) as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      #The rename did not happen: the temporary file is complete.
+      with open(self._tempFilename) as f:
+        data = json.load(f)
+      os.rename(self._tempFilename, self._filename)
+      return data
+
+  def reload(self):
+    """
+      Read the file again, discarding the changes not written yet.
+    """
+    self._data = self._load()
+    self._dirty = set()
+
+  def data(self):
+    """
+      Get the configuration data.
+    Returns:
+      dictionary: the data loaded from the file.
+    """
+    return self._data
+
+  def get(self, key = ""):
+    """
+      Get the value of a key.
+    Args:
+      key (str, optional): the key. Defaults to "".
+
+    Returns:
+      mixed: the value of the key.
+    """
+    return self._data[key]
+
+  def set(self, key = "", value = None):
+    """
+      Set the value of a key. The key is marked as changed only if the value
+      is different from the current one.
+    Args:
+      key (str, optional): the key. Defaults to "".
+      value (mixed, optional): the new value. Defaults to None.
+    """
+    if key not in self._data or self._data[key] != value:
+      self._data[key] = value
+      self.touch(key)
+
+  def touch(self, key = ""):
+    """
+      Mark a key as changed. It's used after changing a nested value in place.
+    Args:
+      key (str, optional): the key. Defaults to "".
+    """
+    self._dirty.add(key)
+    self._changedAt = clock.ticks_ms()
+
+  def changed(self):
+    """
+      Get the keys changed since the last write.
+    Returns:
+      set: the changed keys.
+    """
+    return self._dirty
+
+  def isDirty(self):
+    """
+      Get if there are changes not written yet.
+    Returns:
+      bool: It's True if there are changes. Otherwise False.
+    """
+    return len(self._dirty) > 0
+
+  def flush(self):
+    """
+      Write the file now if there are changes.
+    Returns:
+      bool: It's True if the file was written. Otherwise False.
+    """
+    if not self._dirty:
+      return False
+
+    #A change made while the file is written marks it dirty again, so it's
+    #written by the next flush.
+    dirty = self._dirty
+    self._dirty = set()
+    try:
+      with open(self._tempFilename, "w") as f:
+        json.dump(self._data, f)
+
+      try:
+        os.rename(self._tempFilename, self._filename)
+      except OSError:
+        #Filesystems that do not rename over an existing file.
+        os.remove(self._filename)
+        os.rename(self._tempFilename, self._filename)
+    except OSError:
+      self._dirty.update(dirty)
+      raise
+
+    self._writes += 1
+    return True
+
+  def idle(self):
+    """
+      Write the file if there are changes and no new change happened in the
+      last IDLE_DELAY_MS milliseconds. It should be called when no heater
+      is being controlled.
+    Returns:
+      bool: It's True if the file was written. Otherwise False.
+    """
+    if self._dirty and clock.ticks_diff(clock.ticks_ms(), self._changedAt) > ConfigStore.IDLE_DELAY_MS:
+      return self.flush()
+
+    return False
+
+  def numberOfWrites(self):
+    """
+      Get the number of times the file was written.
+    Returns:
+      int: the number of writes.
+    """
+    return self._writes
@@ -0,0 +1,270 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import _thread
+from utils import clock
+from machine import WDT
+from utils.jitter import Jitter
+from utils.ticker import Ticker
+
+class Snapshot:
+  """
+    Implements the state of a running Mode shown by the user interface. The
+    control core writes it and the user interface core copies it, both
+    holding the lock, so the values read always belong to the same update.
+  """
+  __slots__ = ("_lock", "PV", "SV", "rate", "remaining", "running")
+
+  def __init__(self, lock = None):
+    """
+      Initialize a Snapshot object.
+    Args:
+      lock (lock, optional): the lock shared with the other copy of the
+        state. A new lock is created if it's None. Defaults to None.
+    """
+    self._lock = _thread.allocate_lock() if lock is None else lock
+    self.PV = 0.0
+    self.SV = 0.0
+    self.rate = 0.0
+    self.remaining = 0
+    self.running = False
+
+  def write(self, PV = 0.0, SV = 0.0, rate = 0.0, remaining = 0, running = False):
+    """
+      Set every value at once.
+    Args:
+      PV (float, optional): the process value. Defaults to 0.0.
+      SV (float, optional): the setpoint. Defaults to 0.0.
+      rate (float, optional): the rate of change of PV. Defaults to 0.0.
+      remaining (int, optional): the seconds left. Defaults to 0.
+      running (bool, optional): if the Mode is running. Defaults to False.
+    """
+    self._lock.acquire()
+    self.PV = PV
+    self.SV = SV
+    self.rate = rate
+    self.remaining = remaining
+    self.running = running
+    self._lock.release()
+
+  def copy(self, target):
+    """
+      Copy every value at once into another Snapshot.
+    Args:
+      target (Snapshot): the copy.
+    """
+    self._lock.acquire()
+    target.PV = self.PV
+    target.SV = self.SV
+    target.rate = self.rate
+    target.remaining = self.remaining
+    target.running = self.running
+    self._lock.release()
+
+class Controller:
+  """
+    Implements the control loop of the running modes on the second core of
+    the RP2040. The sensor acquisition, the PID, the profile and the relays
+    run there, so the LCD, the keypad and the garbage collections of the
+    user interface do not delay them.
+
+    The user interface asks the loop to start or stop a Mode; only the loop
+    calls Mode.run() and Mode.stop(). A Mode starts only if Mode.canRun()
+    allows it and it can acquire its zones, so modes on separate zones run
+    side by side and a zone is never driven by two of them. A running Mode
+    whose probe is in fault is stopped, which turns its zones off. Without
+    start(), step() runs one pass of the loop in the caller's thread.
+
+    The passes follow a Ticker with absolute deadlines. Late passes are
+    skipped, not run in a burst, since each pass works on the current
+    time. A pass feeds the hardware watchdog, when used, only if the user
+    interface has called checkIn() since the last feed, so a stall of
+    either core resets the RP2040 and the relays drop with the reset. When
+    given an Acquisition, each pass steps it before the modes, so they read
+    the values it has just taken from the probes.
+  """
+  START = 1
+  STOP = 2
+
+  MAX_COMMANDS = 8
+
+  def __init__(self, period = 10, watchdog = 0, acquisition = None):
+    """
+      Initialize a Controller object.
+    Args:
+      period (int, optional): the period of the loop in milliseconds.
+        Defaults to 10.
+      watchdog (int, optional): the timeout of the hardware watchdog in
+        milliseconds, up to 8388 on the RP2040. The watchdog cannot be
+        stopped once started; it's not used if 0. Defaults to 0.
+      acquisition (Acquisition, optional): the scheduler of the probe
+        readings. The modes read the sensors themselves if it's None.
+        Defaults to None.
+    """
+    self._period = period
+    self._watchdog = watchdog
+    self.acquisition = acquisition
+    self.ticker = Ticker(1000*period, Ticker.SKIP)
+    self._lock = _thread.allocate_lock()
+    self._commands = []
+    self._running = []
+    self._started = False
+    self._checkedIn = False
+    self.jitter = Jitter(1000*period)
+
+  def start(self):
+    """
+      Start the loop on the second core.
+    """
+    if not self._started:
+      self._started = True
+      _thread.start_new_thread(self._loop, ())
+
+  def checkIn(self):
+    """
+      Tell the loop that the user interface is alive. It must be called
+      more often than the watchdog timeout, or the RP2040 is reset.
+    """
+    self._checkedIn = True
+
+  def isStarted(self):
+    """
+      Get if the loop runs on the second core.
+    Returns:
+      bool: It's True if start() was called. Otherwise False.
+    """
+    return self._started
+
+  def _command(self, mode, command):
+    self._lock.acquire()
+    if len(self._commands) < Controller.MAX_COMMANDS:
+      self._commands.append((mode, command))
+    self._lock.release()
+
+  def run(self, mode):
+    """
+      Ask the loop to start a Mode. It's not started if one of its zones is
+      used by another running Mode.
+    Args:
+      mode (Mode): the Mode.
+    """
+    self._command(mode, Controller.START)
+
+  def stop(self, mode):
+    """
+      Ask the loop to stop a Mode.
+    Args:
+      mode (Mode): the Mode.
+    """
+    self._command(mode, Controller.STOP)
+
+  def running(self):
+    """
+      Get the modes being controlled.
+    Returns:
+      list: the Mode objects.
+    """
+    return self._running
+
+  def whileIdle(self, function):
+    """
+      Call a function if no Mode runs or was asked to start, holding the
+      loop so none starts until it returns. It's used to write to the
+      flash, which stalls both cores of the RP2040.
+    Args:
+      function (function): called without arguments.
+
+    Returns:
+      bool: It's True if the function was called. Otherwise False.
+    """
+    self._lock.acquire()
+    try:
+      if len(self._running) > 0 or len(self._commands) > 0:
+        return False
+
+      function()
+      return True
+    finally:
+      self._lock.release()
+
+  def step(self):
+    """
+      Run one pass of the loop: carry out the commands, read the probes,
+      let each running Mode control its heaters, and publish their state.
+    """
+    #The commands are carried out holding the lock, so whileIdle() never
+    #sees a Mode between its command and the list of running modes.
+    self._lock.acquire()
+    commands = self._commands
+    if len(commands) > 0:
+      self._commands = []
+
+    for mode, command in commands:
+      if command == Controller.START:
+        if mode not in self._running and mode.canRun() and mode.acquire():
+          mode.run()
+          self._running.append(mode)
+      elif command == Controller.STOP:
+        if mode in self._running:
+          self._running.remove(mode)
+        mode.stop()
+        mode.release()
+
+      mode.publish()
+    self._lock.release()
+
+    if self.acquisition is not None:
+      self.acquisition.step(clock.ticks_ms())
+
+    i = 0
+    while i < len(self._running):
+      mode = self._running[i]
+      #A probe in fault stops the Mode before its heaters are driven.
+      if mode.isRunning():
+        if mode.fault():
+          mode.stop()
+        else:
+          mode.run()
+
+      #A Mode that stopped itself, or did not start, frees its zones. The
+      #list is changed holding the lock, like the commands change it.
+      if mode.isRunning():
+        i += 1
+      else:
+        self._lock.acquire()
+        mode.release()
+        self._running.remove(mode)
+        self._lock.release()
+
+      mode.publish()
+
+  def _loop(self):
+    wdt = None
+    if self._watchdog > 0:
+      wdt = WDT(timeout=self._watchdog)
+
+    self.ticker.start(clock.ticks_us())
+    while True:
+      now = clock.ticks_us()
+      if self.ticker.due(now):
+        self.jitter.sample(now)
+        self.step()
+        #Both cores must be alive: this one and the one that checked in.
+        if wdt is not None and self._checkedIn:
+          self._checkedIn = False
+          wdt.feed()
+
+      clock.sleep_us(self.ticker.remaining(clock.ticks_us()))
@@ -0,0 +1,367 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from math import sqrt
+
+class Filter:
+  """
+    Implements the interface of a filter stage. A stage gets a sample and the
+    time (in seconds) since the previous one and returns the filtered value.
+  """
+  __slots__ = ("_value",)
+
+  def __init__(self):
+    self._value = 0.0
+
+  def reset(self, x = 0.0):
+    """
+      Restart the filter from the value x.
+    Args:
+      x (float, optional): the initial value. Defaults to 0.0.
+    """
+    self._value = x
+
+  def sample(self, x = 0.0, dt = 0.0):
+    """
+      Filter the x sample.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      dt (float, optional): the time (in seconds) since the previous sample.
+        Defaults to 0.0.
+
+    Returns:
+      float: the filtered value.
+    """
+    self._value = x
+    return x
+
+  def value(self):
+    """
+      Get the last filtered value.
+    Returns:
+      float: the filtered value.
+    """
+    return self._value
+
+  def hasRate(self):
+    """
+      Get if the filter estimates the rate of change of its input.
+    Returns:
+      bool: It's True if rate() is an estimate. Otherwise False.
+    """
+    return False
+
+  def rate(self):
+    """
+      Get the rate of change estimated by the filter.
+    Returns:
+      float: the rate (in units per second).
+    """
+    return 0.0
+
+class Median(Filter):
+  """
+    Implements the median of the last n samples. It removes isolated spikes
+    while keeping steps. The samples are kept in preallocated arrays.
+  """
+  __slots__ = ("_n", "_ring", "_sorted", "_head")
+
+  def __init__(self, n = 3):
+    """
+      Initialize a Median object.
+    Args:
+      n (int, optional): the number of samples. Defaults to 3.
+    """
+    super().__init__()
+    self._n = n
+    self._ring = array("f", [0.0]*n)
+    self._sorted = array("f", [0.0]*n)
+    self._head = 0
+
+  def reset(self, x = 0.0):
+    for i in range(self._n):
+      self._ring[i] = x
+    self._head = 0
+    self._value = x
+
+  def sample(self, x = 0.0, dt = 0.0):
+    self._ring[self._head] = x
+    self._head = (self._head + 1) % self._n
+
+    #Insertion sort on the copy: n is small.
+    s = self._sorted
+    for i in range(self._n):
+      v = self._ring[i]
+      j = i
+      while j > 0 and s[j - 1] > v:
+        s[j] = s[j - 1]
+        j -= 1
+      s[j] = v
+
+    self._value = s[self._n >> 1]
+    return self._value
+
+class EMA(Filter):
+  """
+    Implements the exponential moving average y += alpha*(x - y).
+  """
+  __slots__ = ("_alpha",)
+
+  def __init__(self, alpha = 0.5):
+    """
+      Initialize an EMA object.
+    Args:
+      alpha (float, optional): the smoothing factor in (0, 1]. Defaults to 0.5.
+    """
+    super().__init__()
+    self._alpha = alpha
+
+  def sample(self, x = 0.0, dt = 0.0):
+    self._value += self._alpha*(x - self._value)
+    return self._value
+
+class AlphaBeta(Filter):
+  """
+    Implements the alpha-beta tracker. It estimates the value and its rate
+    of change, which is the steady state of a Kalman filter for a constant
+    rate model.
+  """
+  __slots__ = ("_alpha", "_beta", "_rate")
+
+  def __init__(self, alpha = 0.5, beta = 0.1):
+    """
+      Initialize an AlphaBeta object.
+    Args:
+      alpha (float, optional): the value gain. Defaults to 0.5.
+      beta (float, optional): the rate gain. Defaults to 0.1.
+    """
+    super().__init__()
+    self._alpha = alpha
+    self._beta = beta
+    self._rate = 0.0
+
+  def reset(self, x = 0.0):
+    self._value = x
+    self._rate = 0.0
+
+  def sample(self, x = 0.0, dt = 0.0):
+    if dt <= 0.0:
+      return self._value
+
+    predicted = self._value + self._rate*dt
+    residual = x - predicted
+    self._value = predicted + self._alpha*residual
+    self._rate += self._beta*residual/dt
+    return self._value
+
+  def hasRate(self):
+    return True
+
+  def rate(self):
+    return self._rate
+
+class Kalman(AlphaBeta):
+  """
+    Implements the steady state Kalman filter for a constant rate model. The
+    alpha and beta gains are calculated from the process noise q (in units
+    per second squared), the measurement noise r (in units), and the sample
+    period.
+  """
+  __slots__ = ()
+
+  def __init__(self, q = 0.05, r = 0.1, period = 0.22):
+    """
+      Initialize a Kalman object.
+    Args:
+      q (float, optional): the process noise. Defaults to 0.05.
+      r (float, optional): the measurement noise. Defaults to 0.1.
+      period (float, optional): the sample period (in seconds). Defaults to 0.22.
+    """
+    #Tracking index and the optimal gains for it (Kalata, 1984).
+    l = q*period*period/r
+    s = (4.0 + l - sqrt(8.0*l + l*l))/4.0
+    alpha = 1.0 - s*s
+    beta = 2.0*(2.0 - alpha) - 4.0*sqrt(1.0 - alpha)
+    super().__init__(alpha, beta)
+
+class Outlier(Filter):
+  """
+    Implements the rejection of samples that jump more than step from the
+    last accepted one. After hold consecutive rejections the new level is
+    accepted, so real steps are only delayed.
+  """
+  __slots__ = ("_step", "_hold", "_rejected")
+
+  def __init__(self, step = 20.0, hold = 3):
+    """
+      Initialize an Outlier object.
+    Args:
+      step (float, optional): the largest accepted jump. Defaults to 20.0.
+      hold (int, optional): the number of rejections before accepting a jump.
+        Defaults to 3.
+    """
+    super().__init__()
+    self._step = step
+    self._hold = hold
+    self._rejected = 0
+
+  def reset(self, x = 0.0):
+    self._value = x
+    self._rejected = 0
+
+  def sample(self, x = 0.0, dt = 0.0):
+    diff = x - self._value
+    if -self._step <= diff <= self._step or self._rejected >= self._hold:
+      self._value = x
+      self._rejected = 0
+    else:
+      self._rejected += 1
+
+    return self._value
+
+FILTERS = {
+  "median": Median,
+  "ema": EMA,
+  "alphabeta": AlphaBeta,
+  "kalman": Kalman,
+  "outlier": Outlier
+}
+
+class Pipeline:
+  """
+    Implements a chain of filters. Samples flagged with the sensor error bit
+    are dropped, so the chain holds its last value. The rate comes from the
+    last stage that estimates it or, without one, from the difference of the
+    filtered values.
+  """
+  __slots__ = (
+    "_filters", "_rateFilter", "_value", "_rate", "_started",
+    "_samples", "_errors"
+  )
+
+  def __init__(self, filters = ()):
+    """
+      Initialize a Pipeline object.
+    Args:
+      filters (tuple, optional): the Filter objects in the order they are
+        applied. Defaults to ().
+    """
+    self._filters = tuple(filters)
+    self._rateFilter = None
+    for f in self._filters:
+      if f.hasRate():
+        self._rateFilter = f
+
+    self._value = 0.0
+    self._rate = 0.0
+    self._started = False
+    self._samples = 0
+    self._errors = 0
+
+  @staticmethod
+  def fromConfig(config = ()):
+    """
+      Create a Pipeline from a list of filter descriptions, for example
+      [{"type": "median", "n": 3}, {"type": "ema", "alpha": 0.5}].
+    Args:
+      config (list, optional): the filter descriptions. Defaults to ().
+
+    Returns:
+      Pipeline: the new pipeline.
+    """
+    filters = []
+    for item in config:
+      args = {k: v for k, v in item.items() if k != "type"}
+      filters.append(FILTERS[item["type"]](**args))
+
+    return Pipeline(filters)
+
+  def reset(self):
+    """
+      Restart the pipeline. The next sample initializes every stage.
+    """
+    self._started = False
+    self._rate = 0.0
+
+  def sample(self, x = 0.0, dt = 0.0, error = 0):
+    """
+      Filter the x sample.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      dt (float, optional): the time (in seconds) since the previous sample.
+        Defaults to 0.0.
+      error (int, optional): the sensor error bit. Defaults to 0.
+
+    Returns:
+      float: the filtered value.
+    """
+    if error:
+      self._errors += 1
+      return self._value
+
+    self._samples += 1
+    if not self._started:
+      for f in self._filters:
+        f.reset(x)
+      self._value = x
+      self._rate = 0.0
+      self._started = True
+      return x
+
+    last = self._value
+    for f in self._filters:
+      x = f.sample(x, dt)
+
+    self._value = x
+    if self._rateFilter is not None:
+      self._rate = self._rateFilter.rate()
+    elif dt > 0.0:
+      self._rate = (x - last)/dt
+
+    return x
+
+  def value(self):
+    """
+      Get the last filtered value.
+    Returns:
+      float: the filtered value.
+    """
+    return self._value
+
+  def rate(self):
+    """
+      Get the filtered rate of change.
+    Returns:
+      float: the rate (in units per second).
+    """
+    return self._rate
+
+  def numberOfSamples(self):
+    """
+      Get the number of accepted samples.
+    Returns:
+      int: the number of samples.
+    """
+    return self._samples
+
+  def numberOfErrors(self):
+    """
+      Get the number of samples dropped because of the sensor error bit.
+    Returns:
+      int: the number of errors.
+    """
+    return self._errors
@@ -0,0 +1,137 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from utils import clock
+from utils.stats import Welford
+
+class Jitter:
+  """
+    Implements the measurement of the jitter of a periodic task: how much
+    each interval between two runs differs from the expected period, in
+    microseconds.
+  """
+  def __init__(self, period = 0):
+    """
+      Initialize a Jitter object.
+    Args:
+      period (int, optional): the expected period in microseconds.
+        Defaults to 0.
+    """
+    self._period = period
+    self._deviation = Welford()
+    self.reset()
+
+  def reset(self):
+    """
+      Clear the measurements. The next sample only starts an interval.
+    """
+    self._last = -1
+    self._deviation.reset()
+    self._max = 0
+    self._min = 0
+
+  def period(self):
+    """
+      Get the expected period.
+    Returns:
+      int: the period in microseconds.
+    """
+    return self._period
+
+  def setPeriod(self, period = 0):
+    """
+      Set the expected period and clear the measurements.
+    Args:
+      period (int, optional): the period in microseconds. Defaults to 0.
+    """
+    self._period = period
+    self.reset()
+
+  def sample(self, now = 0):
+    """
+      Mark a run of the task.
+    Args:
+      now (int, optional): the time of the run, from clock.ticks_us().
+        Defaults to 0.
+
+    Returns:
+      int: the deviation of the interval from the period in microseconds,
+        0 for the first run.
+    """
+    if self._last < 0:
+      self._last = now
+      return 0
+
+    deviation = clock.ticks_diff(now, self._last) - self._period
+    self._last = now
+
+    if self._deviation.numberOfSamples() == 0 or deviation > self._max:
+      self._max = deviation
+
+    if self._deviation.numberOfSamples() == 0 or deviation < self._min:
+      self._min = deviation
+
+    self._deviation.sample(deviation)
+    return deviation
+
+  def numberOfSamples(self):
+    """
+      Get the number of intervals measured.
+    Returns:
+      int: the number of intervals.
+    """
+    return self._deviation.numberOfSamples()
+
+  def mean(self):
+    """
+      Get the mean deviation. A positive mean is a task running late.
+    Returns:
+      float: the mean in microseconds.
+    """
+    return self._deviation.mean()
+
+  def stdev(self):
+    """
+      Get the standard deviation of the intervals.
+    Returns:
+      float: the standard deviation in microseconds.
+    """
+    return self._deviation.stdev()
+
+  def max(self):
+    """
+      Get the largest deviation, the longest interval minus the period.
+    Returns:
+      int: the deviation in microseconds.
+    """
+    return self._max
+
+  def min(self):
+    """
+      Get the smallest deviation, the shortest interval minus the period.
+    Returns:
+      int: the deviation in microseconds.
+    """
+    return self._min
+
+  def report(self):
+    """
+      Get a summary of the measurements.
+    Returns:
+      str: the number of intervals and the mean, standard deviation,
+        minimum and maximum deviations in microseconds.
+    """
+    return f"n={self.numberOfSamples()} mean={self.mean():.0f}us stdev={self.stdev():.0f}us min={self._min}us max={self._max}us"
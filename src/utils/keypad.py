@@ -0,0 +1,191 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from machine import Timer
+
+class Keypad:
+  """
+    Implements a keypad service for Keyes_AD_Key compatible keypads. The
+    ADC is sampled on a hardware timer, the samples go through a debounce,
+    press, long-press and repeat state machine, and the resulting events are
+    pushed into a fixed-size queue drained by the user interface. Presses
+    are not lost while the main loop is busy, as long as the queue does not
+    fill up.
+
+    An event is an integer: the key in the low bits (Keypad.KEY) and the
+    kind in the high bits (Keypad.KIND). The sampling uses integers only and
+    allocates nothing, so it can run in a hard interrupt.
+  """
+  LEFT = 0
+  UP = 1
+  DOWN = 2
+  RIGHT = 3
+  SELECT = 4
+  NONE = 7
+
+  PRESS = 0x00
+  REPEAT = 0x08
+  LONG = 0x10
+  RELEASE = 0x18
+
+  KEY = 0x07
+  KIND = 0x18
+
+  #ADC readings (read_u16) of each key, in the order of the key numbers.
+  LEVELS = (655, 9175, 20971, 31457, 45875)
+  TOLERANCE = 655
+
+  PERIOD_MS = 10
+  DEBOUNCE_SAMPLES = 3
+  LONG_SAMPLES = 100
+  REPEAT_DELAY_SAMPLES = 40
+  REPEAT_SAMPLES = 10
+  #Keys sending REPEAT events while held. The others send one LONG event.
+  REPEATING = (1 << LEFT) | (1 << UP) | (1 << DOWN) | (1 << RIGHT)
+
+  QUEUE_SIZE = 16
+
+  def __init__(self, adc, period = 10, start = True):
+    """
+      Initialize a Keypad object.
+    Args:
+      adc (ADC): a machine.ADC object.
+      period (int, optional): the sampling period in milliseconds. The
+        debounce, long-press and repeat times are counted in samples of
+        Keypad.PERIOD_MS, so they scale with it. Defaults to 10.
+      start (bool, optional): start the sampling timer. Without it, the
+        caller samples the keypad by calling sample(). Defaults to True.
+    """
+    self._adc = adc
+    self._period = period
+    self._candidate = Keypad.NONE
+    self._count = 0
+    self._stable = Keypad.NONE
+    self._held = 0
+    self._queue = array("B", bytes(Keypad.QUEUE_SIZE))
+    self._head = 0
+    self._tail = 0
+    self.dropped = 0
+    self._timer = None
+    #Created once: a bound method made in the interrupt would allocate.
+    self._callback = self._tick
+
+    if start:
+      self.start()
+
+  def start(self):
+    """
+      Start sampling the keypad on a periodic timer.
+    """
+    if self._timer is None:
+      self._timer = Timer(-1)
+      self._timer.init(period=self._period, mode=Timer.PERIODIC, callback=self._callback)
+
+  def stop(self):
+    """
+      Stop the sampling timer.
+    """
+    if self._timer is not None:
+      self._timer.deinit()
+      self._timer = None
+
+  def _tick(self, timer):
+    self.sample()
+
+  def key(self, value = 0):
+    """
+      Get the key of an ADC reading.
+    Args:
+      value (int, optional): the reading of ADC.read_u16(). Defaults to 0.
+
+    Returns:
+      int: the key number or Keypad.NONE.
+    """
+    key = 0
+    while key < 5:
+      level = Keypad.LEVELS[key]
+      if level - Keypad.TOLERANCE < value < level + Keypad.TOLERANCE:
+        return key
+      key += 1
+
+    return Keypad.NONE
+
+  def sample(self):
+    """
+      Read the ADC once and update the state machine. A key must be read
+      Keypad.DEBOUNCE_SAMPLES times in a row before it's pressed or
+      released.
+    """
+    key = self.key(self._adc.read_u16())
+
+    if key != self._candidate:
+      self._candidate = key
+      self._count = 1
+    elif self._count < Keypad.DEBOUNCE_SAMPLES:
+      self._count += 1
+
+    if self._count == Keypad.DEBOUNCE_SAMPLES and self._candidate != self._stable:
+      if self._stable != Keypad.NONE:
+        self._push(Keypad.RELEASE | self._stable)
+
+      self._stable = self._candidate
+      self._held = 0
+      if self._stable != Keypad.NONE:
+        self._push(Keypad.PRESS | self._stable)
+
+      return
+
+    if self._stable == Keypad.NONE:
+      return
+
+    self._held += 1
+    if (1 << self._stable) & Keypad.REPEATING:
+      repeat = self._held - Keypad.REPEAT_DELAY_SAMPLES
+      if repeat >= 0 and repeat % Keypad.REPEAT_SAMPLES == 0:
+        self._push(Keypad.REPEAT | self._stable)
+    elif self._held == Keypad.LONG_SAMPLES:
+      self._push(Keypad.LONG | self._stable)
+
+  def _push(self, event):
+    head = (self._head + 1) % Keypad.QUEUE_SIZE
+    if head == self._tail:
+      self.dropped += 1
+      return
+
+    self._queue[self._head] = event
+    self._head = head
+
+  def get(self):
+    """
+      Take the oldest event from the queue.
+    Returns:
+      int: the event or -1 if the queue is empty.
+    """
+    if self._tail == self._head:
+      return -1
+
+    event = self._queue[self._tail]
+    self._tail = (self._tail + 1) % Keypad.QUEUE_SIZE
+    return event
+
+  def pressed(self):
+    """
+      Get the key being held down.
+    Returns:
+      int: the key number or Keypad.NONE.
+    """
+    return self._stable
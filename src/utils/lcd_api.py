@@ -21,7 +21,7 @@
  * CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import time
+from utils import clock
 
 class LcdApi:
     
@@ -206,4 +206,4 @@ class LcdApi:
 
     def hal_sleep_us(self, usecs):
         # Sleep for some time (given in microseconds)
-        time.sleep_us(usecs)
\ No newline at end of file
+        clock.sleep_us(usecs)
\ No newline at end of file
@@ -18,10 +18,17 @@ class Levels:
   """
     Implements the calculation of the setpoint variable (SV) from a given
     profile.
+
+    With a tolerance, the timeline is adaptive: it waits for the process
+    variable (PV) given to value(). The dwell d at a limit L only starts
+    once PV is within the tolerance of L and, with followRamp, a ramp stops
+    advancing while PV lags the setpoint by more than the tolerance. A level
+    waits at most maxWait seconds in total, so a heater that cannot keep up
+    does not hold the process forever.
   """  
   MAX_NUMER_OF_LEVELS = 5
 
-  def __init__(self, start = 0.0, levels = []):
+  def __init__(self, start = 0.0, levels = [], tolerance = 0.0, maxWait = 0.0, followRamp = False):
     """
       Initialize a Levels object.
     Args:
@@ -29,7 +36,19 @@ class Levels:
           Defaults to 0.0.
         levels (list, optional): the list of rate (r), limit (L), and delay (d)
           to calculate setpoint variable.
+        tolerance (float, optional): the largest distance between PV and
+          the setpoint that lets the timeline advance. The timeline follows
+          the time only if it's 0.0. Defaults to 0.0.
+        maxWait (float, optional): the most time (in seconds) a level waits
+          for PV. Defaults to 0.0.
+        followRamp (bool, optional): if the ramps wait for PV too.
+          Defaults to False.
     """ 
+    #An empty profile holds the start value for no time, so the process
+    #ends on the first call.
+    if len(levels) == 0:
+      levels = [[1.0, start, 0]]
+
     self._levels = levels
     self._numberOfLevels = len(levels)
     self._start = [0.0]*self._numberOfLevels
@@ -47,8 +66,16 @@ class Levels:
     
     self._levelID = 0
     self._t = 0.0
+    self._tolerance = tolerance
+    self._maxWait = maxWait
+    self._followRamp = followRamp
+    self._waited = 0.0
+    self._levelWaited = 0.0
+    self._sp = start
+    self._ramping = True
+    self._dwelling = False
     
-  def value(self, t = 0.0):
+  def value(self, t = 0.0, PV = None):
     """
       Get the value of the setpoint variable at the time t (in seconds).
       It's suposed that the time t is always inscreasing when this method
@@ -56,14 +83,25 @@ class Levels:
     Args:
       t (float, optional): the time to calculate the setpoint variable.
         Defaults to 0.0.
+      PV (float, optional): the process variable followed by an adaptive
+        timeline. Defaults to None.
 
     Returns:
       (float, str): the value of the setpoint variable and its stage on
         the process.
     """
+    if self._tolerance > 0.0 and PV is not None and self._isBehind(PV):
+      if self._waited - self._levelWaited < self._maxWait:
+        self._waited += t - self._t
+
+    self._t = t
+    t -= self._waited
+
     if t > self._length[self._levelID]:
       if self._levelID < self._numberOfLevels - 1:
         self._levelID += 1
+        self._levelWaited = self._waited
+        self._dwelling = False
 
     r = self._levels[self._levelID][0]
     L = self._levels[self._levelID][1]
@@ -78,12 +116,50 @@ class Levels:
     if t <= self._length[self._levelID] - d:
       sp = start + r*(t - diff)
       stage = f"r{self._levelID + 1}"
+      self._ramping = True
     else:
       sp = L
       stage = f"L{self._levelID + 1}"
+      self._ramping = False
 
+    self._sp = sp
     return sp, stage
 
+  def _isBehind(self, PV):
+    #A ramp waits while PV lags it; a dwell starts once PV reaches L.
+    if self._ramping:
+      if not self._followRamp:
+        return False
+
+      if self._levels[self._levelID][0] > 0.0:
+        return self._sp - PV > self._tolerance
+
+      return PV - self._sp > self._tolerance
+
+    if not self._dwelling:
+      self._dwelling = abs(PV - self._levels[self._levelID][1]) <= self._tolerance
+
+    return not self._dwelling
+
+  def elapsed(self):
+    """
+      Get the time reached on the process. It's the time given to value()
+      less the time waited for PV.
+
+    Returns:
+      float: the time (in seconds) from the start of the process.
+    """
+    return self._t - self._waited
+
+  def waited(self):
+    """
+      Get the time the adaptive timeline waited for PV.
+
+    Returns:
+      float: the time (in seconds).
+    """
+    return self._waited
+
   def duration(self):
     """
       Get the duration of the process.
@@ -22,7 +22,7 @@
  * SOFTWARE.
 """
 
-import time
+from utils import clock
 class MAX6675:
     MEASUREMENT_PERIOD_MS = 220
 
@@ -46,28 +46,30 @@ class MAX6675:
         self._last_measurement_start = 0
         self._last_read_temp = 0
         self._error = 0
+        self._sequence = 0
+        self._timestamp = 0
 
     def _cycle_sck(self):
         self._sck.high()
-        time.sleep_us(1)
+        clock.sleep_us(1)
         self._sck.low()
-        time.sleep_us(1)
+        clock.sleep_us(1)
 
     def refresh(self):
         """
         Start a new measurement.
         """
         self._cs.low()
-        time.sleep_us(10)
+        clock.sleep_us(10)
         self._cs.high()
-        self._last_measurement_start = time.ticks_ms()
+        self._last_measurement_start = clock.ticks_ms()
 
     def ready(self):
         """
         Signals if measurement is finished.
         :return: True if measurement is ready for reading.
         """
-        return time.ticks_diff(time.ticks_ms(), self._last_measurement_start) > MAX6675.MEASUREMENT_PERIOD_MS
+        return clock.ticks_diff(clock.ticks_ms(), self._last_measurement_start) > MAX6675.MEASUREMENT_PERIOD_MS
 
     def error(self):
         """
@@ -77,6 +79,21 @@ class MAX6675:
         """
         return self._error
 
+    def sequence(self):
+        """
+        Returns the sequence number of the last reading. It is incremented once per
+        conversion read from the chip, so consumers can tell a new value from a repeated one.
+        :return: Sequence number (0 before the first reading)
+        """
+        return self._sequence
+
+    def timestamp(self):
+        """
+        Returns the time of the last reading, in `clock.ticks_ms` units.
+        :return: Timestamp of the last reading
+        """
+        return self._timestamp
+
     def read(self):
         """
         Reads last measurement and starts a new one. If new measurement is not ready yet, returns last value.
@@ -90,7 +107,7 @@ class MAX6675:
             # the conversion process. Forcing the pin down outputs
             # first (dummy) sign bit 15.
             self._cs.low()
-            time.sleep_us(10)
+            clock.sleep_us(10)
 
             # Read temperature bits 14-3 from MAX6675.
             value = 0
@@ -110,8 +127,10 @@ class MAX6675:
 
             # Finish protocol and start new measurement
             self._cs.high()
-            self._last_measurement_start = time.ticks_ms()
+            self._last_measurement_start = clock.ticks_ms()
 
             self._last_read_temp = value * 0.25
+            self._sequence += 1
+            self._timestamp = self._last_measurement_start
 
         return self._last_read_temp
\ No newline at end of file
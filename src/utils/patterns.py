@@ -0,0 +1,341 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import struct
+from utils import clock
+from utils.config import ConfigStore
+
+class PatternStore:
+  """
+    Implements the storage of the Reballing patterns in a binary file. The
+    file has a header followed by one fixed size record per pattern, so the
+    record of the pattern n is found at a known offset and a single pattern
+    is read or written without touching the others.
+
+    Each level of a record keeps the rate r (in hundredths of degree per
+    second), the limit L (in tenths of degree) and the duration d (in
+    seconds) as integers, so the values read back are exactly the ones
+    written. A record of zeros is an empty pattern.
+
+    The record ends with the optional cool-down: the cooling rate c (in
+    hundredths of degree per second, 0 for none) and the end temperature e
+    (in tenths of degree). A file of the version 1, without them, is
+    rewritten with both set to 0 when it's opened.
+  """
+  MAGIC = b"FCRP"
+  VERSION = 2
+  HEADER = "<4sBBH"
+  LEVEL = "hHH"
+  COOLING = "HH"
+  NUMBER_OF_LEVELS = 5
+  MAX_PATTERNS = 99
+
+  def __init__(self, filename = "/config/patterns.bin", source = "/config/patterns.json"):
+    """
+      Initialize a PatternStore object. If the binary file does not exist,
+      it's created from the patterns in the JSON file source.
+    Args:
+      filename (str, optional): the binary file.
+        Defaults to "/config/patterns.bin".
+      source (str, optional): the JSON file used to create the binary file.
+        Defaults to "/config/patterns.json".
+    """
+    self._filename = filename
+    self._headerSize = struct.calcsize(PatternStore.HEADER)
+    self._record = "<" + PatternStore.LEVEL*PatternStore.NUMBER_OF_LEVELS + PatternStore.COOLING
+    self._recordSize = struct.calcsize(self._record)
+
+    try:
+      with open(filename, "rb") as f:
+        magic, version, levels, count = struct.unpack(PatternStore.HEADER, f.read(self._headerSize))
+    except OSError:
+      self._count = 0
+      self._create()
+      self.importJSON(source)
+      return
+
+    if magic != PatternStore.MAGIC or version not in (1, PatternStore.VERSION) or levels != PatternStore.NUMBER_OF_LEVELS:
+      raise ValueError(f"{filename} is not a pattern file")
+
+    self._count = count
+    if version == 1:
+      self._upgrade()
+
+  def _create(self):
+    with open(self._filename, "wb") as f:
+      f.write(self._header())
+
+  def _upgrade(self):
+    #The records of the version 1 have only the levels.
+    old = struct.calcsize("<" + PatternStore.LEVEL*PatternStore.NUMBER_OF_LEVELS)
+    with open(self._filename, "rb") as f:
+      f.seek(self._headerSize)
+      data = f.read(self._count*old)
+
+    cooling = bytes(self._recordSize - old)
+    with open(self._filename, "wb") as f:
+      f.write(self._header())
+      for n in range(self._count):
+        f.write(data[n*old:(n + 1)*old])
+        f.write(cooling)
+
+  def _header(self):
+    return struct.pack(
+      PatternStore.HEADER,
+      PatternStore.MAGIC,
+      PatternStore.VERSION,
+      PatternStore.NUMBER_OF_LEVELS,
+      self._count
+    )
+
+  def count(self):
+    """
+      Get the number of patterns in the file.
+    Returns:
+      int: the highest pattern number stored.
+    """
+    return self._count
+
+  def load(self, n = 1):
+    """
+      Read the pattern n.
+    Args:
+      n (int, optional): the pattern number, starting from 1. Defaults to 1.
+
+    Returns:
+      dictionary: the pattern with the keys r1, L1, d1, ..., r5, L5, d5, c
+        and e. A pattern not stored yet is all zeros.
+    """
+    if n < 1 or n > self._count:
+      values = (0,)*(3*PatternStore.NUMBER_OF_LEVELS + 2)
+    else:
+      with open(self._filename, "rb") as f:
+        f.seek(self._headerSize + (n - 1)*self._recordSize)
+        values = struct.unpack(self._record, f.read(self._recordSize))
+
+    pattern = {}
+    for i in range(PatternStore.NUMBER_OF_LEVELS):
+      pattern[f"r{i + 1}"] = values[3*i]/100.0
+      pattern[f"L{i + 1}"] = values[3*i + 1]/10.0
+      pattern[f"d{i + 1}"] = values[3*i + 2]
+
+    pattern["c"] = values[-2]/100.0
+    pattern["e"] = values[-1]/10.0
+    return pattern
+
+  def save(self, n = 1, pattern = None):
+    """
+      Write the pattern n. Only its record is written, unless the file has
+      to grow to hold it.
+    Args:
+      n (int, optional): the pattern number, starting from 1. Defaults to 1.
+      pattern (dictionary, optional): the pattern with the keys r1, L1, d1,
+        ..., r5, L5, d5, c and e. Defaults to None.
+    """
+    if n < 1 or n > PatternStore.MAX_PATTERNS:
+      raise ValueError(f"pattern {n} out of range")
+
+    values = []
+    for i in range(PatternStore.NUMBER_OF_LEVELS):
+      values.append(round(100*pattern.get(f"r{i + 1}", 0.0)))
+      values.append(round(10*pattern.get(f"L{i + 1}", 0.0)))
+      values.append(round(pattern.get(f"d{i + 1}", 0)))
+
+    values.append(round(100*pattern.get("c", 0.0)))
+    values.append(round(10*pattern.get("e", 0.0)))
+    record = struct.pack(self._record, *values)
+
+    with open(self._filename, "r+b") as f:
+      if n > self._count:
+        f.seek(self._headerSize + self._count*self._recordSize)
+        empty = bytes(self._recordSize)
+        for i in range(self._count, n - 1):
+          f.write(empty)
+        self._count = n
+        f.write(record)
+        f.seek(0)
+        f.write(self._header())
+      else:
+        f.seek(self._headerSize + (n - 1)*self._recordSize)
+        f.write(record)
+
+  def importJSON(self, filename = ""):
+    """
+      Write the patterns of a JSON file with the keys PTN1, PTN2, ... as
+      used by the previous reballing.json.
+    Args:
+      filename (str, optional): the JSON file. Defaults to "".
+    """
+    with open(filename) as f:
+      data = json.load(f)
+
+    for n in range(1, PatternStore.MAX_PATTERNS + 1):
+      key = f"PTN{n}"
+      if key in data:
+        self.save(n, data[key])
+
+  def exportJSON(self, filename = ""):
+    """
+      Write every stored pattern to a JSON file with the keys PTN1, PTN2, ...
+    Args:
+      filename (str, optional): the JSON file. Defaults to "".
+    """
+    data = {}
+    for n in range(1, self._count + 1):
+      data[f"PTN{n}"] = self.load(n)
+
+    with open(filename, "w") as f:
+      json.dump(data, f)
+
+class CurrentPattern:
+  """
+    Implements the pattern selected on the Reballing Mode. Only that pattern
+    is kept in memory, with the changed patterns not written yet; the
+    changes are written to the PatternStore on save() or at idle time, so
+    selecting another pattern never writes to the flash.
+  """
+  def __init__(self, store, n = 1):
+    """
+      Initialize a CurrentPattern object.
+    Args:
+      store (PatternStore): the storage of the patterns.
+      n (int, optional): the pattern number. Defaults to 1.
+    """
+    self._store = store
+    self._number = n
+    self._pattern = store.load(n)
+    self._changed = False
+    self._changedAt = 0
+    self._pending = {}
+
+  def number(self):
+    """
+      Get the number of the current pattern.
+    Returns:
+      int: the pattern number.
+    """
+    return self._number
+
+  def store(self):
+    """
+      Get the storage of the patterns.
+    Returns:
+      PatternStore: the storage.
+    """
+    return self._store
+
+  def values(self):
+    """
+      Get a copy of the current pattern.
+    Returns:
+      dictionary: the pattern with the keys r1, L1, d1, ..., r5, L5, d5, c
+        and e.
+    """
+    return dict(self._pattern)
+
+  def load(self, n = 1):
+    """
+      Get a pattern, with the changes not written yet.
+    Args:
+      n (int, optional): the pattern number. Defaults to 1.
+
+    Returns:
+      dictionary: the pattern with the keys r1, L1, d1, ..., r5, L5, d5, c
+        and e.
+    """
+    if n == self._number:
+      return self.values()
+
+    if n in self._pending:
+      return dict(self._pending[n])
+
+    return self._store.load(n)
+
+  def select(self, n = 1):
+    """
+      Make the pattern n the current one. The changes on the previous
+      pattern are kept until they are written.
+    Args:
+      n (int, optional): the pattern number. Defaults to 1.
+    """
+    if n == self._number:
+      return
+
+    if self._changed:
+      self._pending[self._number] = self._pattern
+
+    self._number = n
+    if n in self._pending:
+      self._pattern = self._pending.pop(n)
+      self._changed = True
+    else:
+      self._pattern = self._store.load(n)
+      self._changed = False
+
+  def get(self, key = ""):
+    """
+      Get a value of the current pattern.
+    Args:
+      key (str, optional): the key, for example "r1". Defaults to "".
+
+    Returns:
+      mixed: the value.
+    """
+    return self._pattern[key]
+
+  def set(self, key = "", value = None):
+    """
+      Set a value of the current pattern.
+    Args:
+      key (str, optional): the key, for example "r1". Defaults to "".
+      value (mixed, optional): the new value. Defaults to None.
+    """
+    if self._pattern[key] != value:
+      self._pattern[key] = value
+      self._changed = True
+      self._changedAt = clock.ticks_ms()
+
+  def write(self, n = 1, pattern = None):
+    """
+      Write a pattern other than the current one, replacing its changes not
+      written yet.
+    Args:
+      n (int, optional): the pattern number. Defaults to 1.
+      pattern (dictionary, optional): the pattern. Defaults to None.
+    """
+    self._pending.pop(n, None)
+    self._store.save(n, pattern)
+
+  def save(self):
+    """
+      Write the current pattern and the previous ones if they have changed.
+    """
+    for n, pattern in self._pending.items():
+      self._store.save(n, pattern)
+    self._pending.clear()
+
+    if self._changed:
+      self._store.save(self._number, self._pattern)
+      self._changed = False
+
+  def idle(self):
+    """
+      Write the changed patterns if no new change happened in the last
+      ConfigStore.IDLE_DELAY_MS milliseconds.
+    """
+    if (self._changed or len(self._pending) > 0) and clock.ticks_diff(clock.ticks_ms(), self._changedAt) > ConfigStore.IDLE_DELAY_MS:
+      self.save()
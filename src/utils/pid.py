@@ -40,7 +40,7 @@ class PID:
     self._Ki = Ki
     self._Kd = Kd
   
-  def control(self, process, setpoint, dt = 0.0001):
+  def control(self, process, setpoint, dt = 0.0001, rate = None):
     """
       Calculate the PID control variable (u(t)).
 
@@ -48,6 +48,9 @@ class PID:
       process (float): the process variable (PV).
       setpoint (float): the setpoint variable (SV).
       dt (float): the time increment used for discretization. Defaults to 0.0001.
+      rate (float, optional): the filtered rate of change of the process
+        variable. If given, it replaces the difference of the last two
+        process values in the derivative term. Defaults to None.
 
     Returns:
       float: the control variable (u(t)) value.
@@ -55,7 +58,10 @@ class PID:
     
     up = self._Kp*(setpoint - process)
     ui = self._lastui + self._Ki*(setpoint - process)*dt
-    ud = self._Kd*((setpoint - process) - (self._lastSetpoint - self._lastProcess))/dt
+    if rate is None:
+      ud = self._Kd*((setpoint - process) - (self._lastSetpoint - self._lastProcess))/dt
+    else:
+      ud = self._Kd*((setpoint - self._lastSetpoint)/dt - rate)
     u = up + ui + ud
     self._lastSetpoint = setpoint
     self._lastProcess = process
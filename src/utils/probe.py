@@ -0,0 +1,197 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from utils import clock
+from utils.filters import Pipeline
+
+class Probe:
+  """
+    Implements a temperature probe: a MAX6675 sensor followed by a filter
+    Pipeline. Each new conversion goes through the pipeline once, and the
+    modes get the filtered temperature and its rate of change. The sequence
+    number and the timestamp of the last conversion let consumers process
+    each conversion exactly once.
+
+    A conversion with the error bit set, like an open thermocouple, leaves
+    the value as it was. After MAX_ERRORS of them in a row the probe is in
+    fault, and it stays so until clearFault() finds it reading again, so a
+    frozen value never keeps a heater on.
+  """
+  MAX_ERRORS = 4
+
+  def __init__(self, sensor, filters = ()):
+    """
+      Initialize a Probe object.
+    Args:
+      sensor (MAX6675): the thermocouple sensor.
+      filters (list, optional): the filter descriptions used by
+        Pipeline.fromConfig. Defaults to ().
+    """
+    self._sensor = sensor
+    self._pipeline = Pipeline.fromConfig(filters)
+    self._sequence = sensor.sequence()
+    self._timestamp = clock.ticks_ms()
+    self._interval = 0
+    self._raw = 0.0
+    self._scheduled = False
+    self._consecutiveErrors = 0
+    self._fault = False
+
+  def read(self):
+    """
+      Read the sensor if a new conversion is ready and filter it. A probe
+      scheduled by an Acquisition leaves the sensor to it.
+    Returns:
+      float: the filtered temperature.
+    """
+    if not self._scheduled:
+      self.sample()
+
+    return self._pipeline.value()
+
+  def sample(self):
+    """
+      Read the sensor if a new conversion is ready and filter it.
+    Returns:
+      bool: It's True if a new conversion was read. Otherwise False.
+    """
+    raw = self._sensor.read()
+    sequence = self._sensor.sequence()
+    if sequence == self._sequence:
+      return False
+
+    timestamp = self._sensor.timestamp()
+    self._interval = clock.ticks_diff(timestamp, self._timestamp)
+    self._timestamp = timestamp
+    self._sequence = sequence
+    self._raw = raw
+    error = self._sensor.error()
+    if error:
+      self._consecutiveErrors += 1
+      if self._consecutiveErrors >= Probe.MAX_ERRORS:
+        self._fault = True
+    else:
+      self._consecutiveErrors = 0
+    self._pipeline.sample(raw, self._interval/1000.0, error)
+    return True
+
+  def ready(self):
+    """
+      Get if the sensor has finished a conversion.
+    Returns:
+      bool: It's True if a new conversion can be read. Otherwise False.
+    """
+    return self._sensor.ready()
+
+  def refresh(self):
+    """
+      Start a new conversion of the sensor.
+    """
+    self._sensor.refresh()
+
+  def setScheduled(self, scheduled = True):
+    """
+      Set if the sensor is read by an Acquisition instead of read().
+    Args:
+      scheduled (bool, optional): the new state. Defaults to True.
+    """
+    self._scheduled = scheduled
+
+  def sequence(self):
+    """
+      Get the sequence number of the last conversion. It changes once per
+      new conversion, so a consumer that keeps the last number it processed
+      knows whether the current value is fresh.
+    Returns:
+      int: the sequence number.
+    """
+    return self._sequence
+
+  def timestamp(self):
+    """
+      Get the time of the last conversion.
+    Returns:
+      int: the time of the last conversion (in milliseconds, clock.ticks_ms).
+    """
+    return self._timestamp
+
+  def interval(self):
+    """
+      Get the time between the last two conversions.
+    Returns:
+      int: the interval (in milliseconds).
+    """
+    return self._interval
+
+  def value(self):
+    """
+      Get the last filtered temperature without reading the sensor.
+    Returns:
+      float: the filtered temperature.
+    """
+    return self._pipeline.value()
+
+  def rate(self):
+    """
+      Get the filtered rate of change of the temperature.
+    Returns:
+      float: the rate (in degrees Celsius per second).
+    """
+    return self._pipeline.rate()
+
+  def raw(self):
+    """
+      Get the last unfiltered temperature.
+    Returns:
+      float: the temperature read from the sensor.
+    """
+    return self._raw
+
+  def error(self):
+    """
+      Get the error bit of the last reading.
+    Returns:
+      int: the error bit value.
+    """
+    return self._sensor.error()
+
+  def numberOfErrors(self):
+    """
+      Get the number of readings dropped because of the error bit.
+    Returns:
+      int: the number of errors.
+    """
+    return self._pipeline.numberOfErrors()
+
+  def fault(self):
+    """
+      Get if the probe has failed MAX_ERRORS readings in a row since the
+      fault was last cleared.
+    Returns:
+      bool: It's True if the probe is in fault. Otherwise False.
+    """
+    return self._fault
+
+  def clearFault(self):
+    """
+      Clear the fault if the last reading was good.
+    Returns:
+      bool: It's True if the probe is not in fault anymore. Otherwise False.
+    """
+    if self._consecutiveErrors == 0:
+      self._fault = False
+
+    return not self._fault
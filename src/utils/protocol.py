@@ -0,0 +1,297 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import select
+import sys
+
+class Protocol:
+  """
+    Implements the command protocol of the USB serial port. Each request is
+    a JSON object on one line, like {"id": 1, "cmd": "state", "mode": 0},
+    and gets one response line: {"id": 1, "ok": true, "result": ...} or
+    {"id": 1, "ok": false, "error": "..."}. The FCR prints other lines on
+    the same port, like the PROFILE reports of main.py, which start with
+    "#", and the DEBUG traces of the modes, so a client must skip every
+    line that is not a JSON object with the id of its request.
+
+    The commands are:
+      modes                      list the modes
+      get mode [keys]            read the values of a mode's menu
+      set mode values            write values, like {"Kp": 30.5}
+      pattern mode n [values]    read, or change and write, a pattern
+      run mode / stop mode       start or stop a mode
+      state mode                 the PV, SV, rate and remaining time
+
+    A mode is its index or its name. Values are only changed while their
+    mode is stopped. Since the flash writes stall both cores, the settings
+    are written right away only if no mode is running, and otherwise once
+    none is; a pattern is only written while no mode is running. The input
+    is read without blocking, at most Protocol.MAX_CHARS bytes per call to
+    poll(), so a request arriving slowly never holds up the user interface.
+    The bytes of a line are kept as they arrive and decoded as UTF-8 with
+    the request, so any input gets an error response instead of an
+    exception.
+  """
+  MAX_LINE = 512
+  MAX_CHARS = 64
+
+  def __init__(self, models, controller, stream = None, output = None):
+    """
+      Initialize a Protocol object.
+    Args:
+      models (list): the Mode objects.
+      controller (Controller): starts and stops the modes.
+      stream (stream, optional): the input. Its binary buffer is read if it
+        has one. Defaults to sys.stdin.
+      output (stream, optional): the output. Defaults to sys.stdout.
+    """
+    self._models = models
+    self._controller = controller
+    self._stream = sys.stdin if stream is None else stream
+    self._input = getattr(self._stream, "buffer", self._stream)
+    self._output = sys.stdout if output is None else output
+    self._buffer = bytearray(Protocol.MAX_LINE)
+    self._length = 0
+    self._overflow = False
+    self._poller = select.poll()
+    self._poller.register(self._stream, select.POLLIN)
+    #MicroPython's ipoll() does not allocate a list on every call.
+    self._poll = getattr(self._poller, "ipoll", self._poller.poll)
+    self.requests = 0
+    self.errors = 0
+
+  def _ready(self):
+    for entry in self._poll(0):
+      return True
+
+    return False
+
+  def poll(self):
+    """
+      Read the characters waiting on the input and carry out each complete
+      request.
+    """
+    count = 0
+    while count < Protocol.MAX_CHARS and self._ready():
+      data = self._input.read(1)
+      if not data:
+        break
+
+      self.feed(data)
+      count += 1
+
+  def feed(self, data = b""):
+    """
+      Take bytes of the input. A request is carried out when its end of
+      line arrives. Lines longer than Protocol.MAX_LINE bytes are discarded.
+    Args:
+      data (bytes, optional): the bytes. A str is encoded as UTF-8.
+        Defaults to b"".
+    """
+    if isinstance(data, str):
+      data = data.encode()
+
+    for c in data:
+      if c == 10 or c == 13:
+        length = self._length
+        overflow = self._overflow
+        self._length = 0
+        self._overflow = False
+        if length > 0 and not overflow:
+          self.handle(bytes(self._buffer[0:length]))
+        elif overflow:
+          self.reply(None, False, "line too long")
+      elif self._length < Protocol.MAX_LINE:
+        self._buffer[self._length] = c
+        self._length += 1
+      else:
+        self._overflow = True
+
+  def reply(self, id = None, ok = True, value = None):
+    """
+      Write a response line.
+    Args:
+      id (mixed, optional): the id of the request. Defaults to None.
+      ok (bool, optional): if the request succeeded. Defaults to True.
+      value (mixed, optional): the result, or the error message.
+        Defaults to None.
+    """
+    if ok:
+      response = {"id": id, "ok": True, "result": value}
+    else:
+      self.errors += 1
+      response = {"id": id, "ok": False, "error": value}
+
+    self._output.write(json.dumps(response) + "\n")
+
+  def handle(self, line = b""):
+    """
+      Carry out a request and write its response.
+    Args:
+      line (bytes or str, optional): the request. Defaults to b"".
+    """
+    self.requests += 1
+    id = None
+    try:
+      if isinstance(line, bytes):
+        line = line.decode()
+
+      request = json.loads(line)
+      id = request.get("id")
+      command = request["cmd"]
+      if command not in Protocol.COMMANDS:
+        raise ValueError(f"unknown command {command}")
+
+      self.reply(id, True, Protocol.COMMANDS[command](self, request))
+    except Exception as e:
+      self.reply(id, False, f"{type(e).__name__}: {e}")
+
+  def mode(self, request):
+    """
+      Get the Mode of a request, set up if it was not yet.
+    Args:
+      request (dictionary): the request with the key "mode".
+
+    Returns:
+      Mode: the Mode.
+    """
+    key = request["mode"]
+    mode = None
+    if isinstance(key, int):
+      if 0 <= key < len(self._models):
+        mode = self._models[key]
+    else:
+      for model in self._models:
+        if model.name() == key:
+          mode = model
+
+    if mode is None:
+      raise ValueError(f"unknown mode {key}")
+
+    if not mode.isSetup():
+      mode.setup()
+
+    return mode
+
+  def modes(self, request):
+    result = []
+    for i in range(len(self._models)):
+      model = self._models[i]
+      result.append({
+        "mode": i,
+        "name": model.name(),
+        "type": type(model).__name__,
+        "running": model.isRunning(),
+        "locked": model.isLocked()
+      })
+
+    return result
+
+  def get(self, request):
+    mode = self.mode(request)
+    keys = request.get("keys") or mode.parameters()
+    values = {}
+    for key in keys:
+      values[key] = mode.getValue(key)
+
+    return values
+
+  def stopped(self, request):
+    """
+      Get the Mode of a request, if it's not running.
+    Args:
+      request (dictionary): the request with the key "mode".
+
+    Returns:
+      Mode: the Mode.
+    """
+    mode = self.mode(request)
+    if mode.isRunning():
+      raise ValueError(f"{mode.name()} is running")
+
+    return mode
+
+  def set(self, request):
+    mode = self.stopped(request)
+    values = request["values"]
+    #Check every value first, so a request is applied whole or not at all.
+    for key, value in values.items():
+      if key not in mode.parameters():
+        raise ValueError(f"unknown parameter {key}")
+
+      info = mode.menuInfo(key)
+      if value < info["min"] or value > info["max"]:
+        raise ValueError(f"{key}={value} not accepted")
+
+    for key, value in values.items():
+      mode.assign(key, value)
+    self._controller.whileIdle(mode.save)
+
+    return self.get({"mode": request["mode"], "keys": list(values.keys())})
+
+  def pattern(self, request):
+    if "values" in request:
+      mode = self.stopped(request)
+    else:
+      mode = self.mode(request)
+
+    if not hasattr(mode, "readPattern"):
+      raise ValueError(f"{mode.name()} has no patterns")
+
+    n = request["n"]
+    if "values" in request:
+      values = request["values"]
+      if not self._controller.whileIdle(lambda: mode.writePattern(n, values)):
+        raise ValueError("a mode is running")
+
+    return mode.readPattern(n)
+
+  def run(self, request):
+    mode = self.mode(request)
+    if not mode.canRun():
+      raise ValueError(f"{mode.name()} has nothing to run")
+
+    self._controller.run(mode)
+    return True
+
+  def stop(self, request):
+    mode = self.mode(request)
+    self._controller.stop(mode)
+    return True
+
+  def state(self, request):
+    mode = self.mode(request)
+    mode.refresh()
+    state = mode.state
+    return {
+      "PV": state.PV,
+      "SV": state.SV,
+      "rate": state.rate,
+      "remaining": state.remaining,
+      "running": state.running,
+      "fault": mode.fault()
+    }
+
+  COMMANDS = {
+    "modes": modes,
+    "get": get,
+    "set": set,
+    "pattern": pattern,
+    "run": run,
+    "stop": stop,
+    "state": state
+  }
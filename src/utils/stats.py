@@ -0,0 +1,565 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from math import sqrt
+
+class Welford:
+  """
+    Implements the streaming calculation of the mean and the variance for a
+    given sample of values (Welford's algorithm). Unlike the raw sums of x and
+    x², the running mean and the sum of squared deviations do not lose
+    precision when the samples are large and close to each other.
+  """
+  __slots__ = ("_numberOfSamples", "_mean", "_m2")
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._numberOfSamples = 0
+    self._mean = 0.0
+    self._m2 = 0.0
+
+  def sample(self, x = 0.0):
+    """
+      Set the x sample.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+    """
+    self._numberOfSamples += 1
+    delta = x - self._mean
+    self._mean += delta/self._numberOfSamples
+    self._m2 += delta*(x - self._mean)
+
+  def mean(self):
+    """
+      Get the mean of the samples.
+    Returns:
+      float: the mean. It's 0.0 if there is no sample.
+    """
+    return self._mean
+
+  def variance(self):
+    """
+      Get the sample variance.
+    Returns:
+      float: the sample variance. It's 0.0 if there are less than two samples.
+    """
+    if self._numberOfSamples < 2:
+      return 0.0
+
+    return self._m2/(self._numberOfSamples - 1)
+
+  def stdev(self):
+    """
+      Get the sample standard deviation.
+    Returns:
+      float: the sample standard deviation.
+    """
+    return sqrt(self.variance())
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples.
+    Returns:
+        int: the number of samples
+    """
+    return self._numberOfSamples
+
+class Regression:
+  """
+    Implements the streaming calculation of the linear regression for a given
+    sample of values. The means and the co-moments are updated around the
+    running means, and x is taken relative to the first sample, so long runs
+    with millisecond timestamps do not suffer catastrophic cancellation.
+  """
+  __slots__ = ("_numberOfSamples", "_x0", "_xMean", "_yMean", "_sxx", "_sxy")
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._numberOfSamples = 0
+    self._x0 = 0.0
+    self._xMean = 0.0
+    self._yMean = 0.0
+    self._sxx = 0.0
+    self._sxy = 0.0
+
+  def sample(self, x = 0.0, y = 0.0):
+    """
+      Set the x and y sample.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      y (float, optional): the value of y sample. Defaults to 0.0.
+    """
+    if self._numberOfSamples == 0:
+      self._x0 = x
+
+    x -= self._x0
+    self._numberOfSamples += 1
+    dx = x - self._xMean
+    self._xMean += dx/self._numberOfSamples
+    self._yMean += (y - self._yMean)/self._numberOfSamples
+    self._sxx += dx*(x - self._xMean)
+    self._sxy += dx*(y - self._yMean)
+
+  def regression(self):
+    """
+      Calculate the linear regression for the samples.
+    Returns:
+        float, float: the angular coefficient and the linear coefficient of the linear regression.
+          Both are 0.0 if the samples do not define a line.
+    """
+    if self._sxx <= 0.0:
+      return 0.0, 0.0
+
+    a = self._sxy/self._sxx
+    b = self._yMean - a*(self._xMean + self._x0)
+    return a, b
+
+  def slope(self):
+    """
+      Get the angular coefficient of the linear regression.
+    Returns:
+      float: the angular coefficient.
+    """
+    if self._sxx <= 0.0:
+      return 0.0
+
+    return self._sxy/self._sxx
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples.
+    Returns:
+        int: the number of samples
+    """
+    return self._numberOfSamples
+
+class Extremes:
+  """
+    Implements the calculation of the minimum and maximum for a given
+    sample of values, keeping the time at which each one happened.
+  """
+  __slots__ = ("_numberOfSamples", "_min", "_max", "_tMin", "_tMax")
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._numberOfSamples = 0
+    self._min = 0.0
+    self._max = 0.0
+    self._tMin = 0
+    self._tMax = 0
+
+  def sample(self, x = 0.0, t = 0):
+    """
+      Set the x sample taken at the time t.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      t (int, optional): the time of the sample. Defaults to 0.
+    """
+    if self._numberOfSamples == 0 or x < self._min:
+      self._min = x
+      self._tMin = t
+
+    if self._numberOfSamples == 0 or x > self._max:
+      self._max = x
+      self._tMax = t
+
+    self._numberOfSamples += 1
+
+  def min(self):
+    """
+      Get the minimum value from the given samples.
+    Returns:
+      float: the minimum value. It's 0.0 if there is no sample.
+    """
+    return self._min
+
+  def max(self):
+    """
+      Get the maximum value from the given samples.
+    Returns:
+      float: the maximum value. It's 0.0 if there is no sample.
+    """
+    return self._max
+
+  def tMin(self):
+    """
+      Get the time of the minimum value.
+    Returns:
+      int: the time given with the minimum sample.
+    """
+    return self._tMin
+
+  def tMax(self):
+    """
+      Get the time of the maximum value.
+    Returns:
+      int: the time given with the maximum sample.
+    """
+    return self._tMax
+
+  def range(self):
+    """
+      Get the difference between the maximum and the minimum values.
+    Returns:
+      float: the range of the samples.
+    """
+    return self._max - self._min
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples.
+    Returns:
+        int: the number of samples
+    """
+    return self._numberOfSamples
+
+class WindowWelford:
+  """
+    Implements the mean and the variance of the last `size` samples. Each
+    sample replaces the oldest one in a preallocated ring buffer and both
+    statistics are updated in O(1).
+  """
+  __slots__ = ("_size", "_x", "_head", "_numberOfSamples", "_mean", "_m2")
+
+  def __init__(self, size = 16):
+    """
+      Initialize a WindowWelford object.
+    Args:
+      size (int, optional): the number of samples in the window. Defaults to 16.
+    """
+    self._size = size
+    self._x = array("f", [0.0]*size)
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._head = 0
+    self._numberOfSamples = 0
+    self._mean = 0.0
+    self._m2 = 0.0
+
+  def sample(self, x = 0.0):
+    """
+      Set the x sample, dropping the oldest one if the window is full.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+    """
+    #Use the stored value so the sample removed later is the one added now.
+    old = self._x[self._head]
+    self._x[self._head] = x
+    x = self._x[self._head]
+    self._head = (self._head + 1) % self._size
+
+    if self._numberOfSamples < self._size:
+      self._numberOfSamples += 1
+      delta = x - self._mean
+      self._mean += delta/self._numberOfSamples
+      self._m2 += delta*(x - self._mean)
+    else:
+      mean = self._mean + (x - old)/self._size
+      self._m2 += (x - old)*(x - mean + old - self._mean)
+      self._mean = mean
+      if self._m2 < 0.0:
+        self._m2 = 0.0
+
+  def mean(self):
+    """
+      Get the mean of the samples in the window.
+    Returns:
+      float: the mean. It's 0.0 if there is no sample.
+    """
+    return self._mean
+
+  def variance(self):
+    """
+      Get the sample variance of the samples in the window.
+    Returns:
+      float: the sample variance. It's 0.0 if there are less than two samples.
+    """
+    if self._numberOfSamples < 2:
+      return 0.0
+
+    return self._m2/(self._numberOfSamples - 1)
+
+  def stdev(self):
+    """
+      Get the sample standard deviation of the samples in the window.
+    Returns:
+      float: the sample standard deviation.
+    """
+    return sqrt(self.variance())
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples in the window.
+    Returns:
+        int: the number of samples
+    """
+    return self._numberOfSamples
+
+class WindowRegression:
+  """
+    Implements the linear regression of the last `size` samples. The means
+    and the co-moments are updated in O(1) by adding the new sample and
+    removing the oldest one from a preallocated ring buffer. x is taken
+    relative to the first sample since the last reset.
+  """
+  __slots__ = (
+    "_size", "_x", "_y", "_head", "_numberOfSamples", "_x0",
+    "_xMean", "_yMean", "_sxx", "_sxy"
+  )
+
+  def __init__(self, size = 16):
+    """
+      Initialize a WindowRegression object.
+    Args:
+      size (int, optional): the number of samples in the window. Defaults to 16.
+    """
+    self._size = size
+    #Doubles keep timestamps exact where the port has double precision.
+    self._x = array("d", [0.0]*size)
+    self._y = array("d", [0.0]*size)
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._head = 0
+    self._numberOfSamples = 0
+    self._x0 = 0.0
+    self._xMean = 0.0
+    self._yMean = 0.0
+    self._sxx = 0.0
+    self._sxy = 0.0
+
+  def sample(self, x = 0.0, y = 0.0):
+    """
+      Set the x and y sample, dropping the oldest one if the window is full.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      y (float, optional): the value of y sample. Defaults to 0.0.
+    """
+    if self._numberOfSamples == 0:
+      self._x0 = x
+
+    #Use the stored values so the sample removed later is the one added now.
+    xOld = self._x[self._head]
+    yOld = self._y[self._head]
+    self._x[self._head] = x - self._x0
+    self._y[self._head] = y
+    x = self._x[self._head]
+    y = self._y[self._head]
+    self._head = (self._head + 1) % self._size
+
+    if self._numberOfSamples == self._size == 1:
+      self._numberOfSamples = 0
+      self._xMean = 0.0
+      self._yMean = 0.0
+      self._sxx = 0.0
+      self._sxy = 0.0
+    elif self._numberOfSamples == self._size:
+      #Remove the oldest sample
+      n = self._size - 1
+      xMean = self._xMean - (xOld - self._xMean)/n
+      yMean = self._yMean - (yOld - self._yMean)/n
+      self._sxx -= (xOld - xMean)*(xOld - self._xMean)
+      self._sxy -= (xOld - xMean)*(yOld - self._yMean)
+      self._xMean = xMean
+      self._yMean = yMean
+      self._numberOfSamples = n
+
+    self._numberOfSamples += 1
+    dx = x - self._xMean
+    self._xMean += dx/self._numberOfSamples
+    self._yMean += (y - self._yMean)/self._numberOfSamples
+    self._sxx += dx*(x - self._xMean)
+    self._sxy += dx*(y - self._yMean)
+
+  def regression(self):
+    """
+      Calculate the linear regression for the samples in the window.
+    Returns:
+        float, float: the angular coefficient and the linear coefficient of the linear regression.
+          Both are 0.0 if the samples do not define a line.
+    """
+    if self._sxx <= 0.0:
+      return 0.0, 0.0
+
+    a = self._sxy/self._sxx
+    b = self._yMean - a*(self._xMean + self._x0)
+    return a, b
+
+  def slope(self):
+    """
+      Get the angular coefficient of the linear regression.
+    Returns:
+      float: the angular coefficient.
+    """
+    if self._sxx <= 0.0:
+      return 0.0
+
+    return self._sxy/self._sxx
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples in the window.
+    Returns:
+        int: the number of samples
+    """
+    return self._numberOfSamples
+
+class WindowExtremes:
+  """
+    Implements the minimum and the maximum of the last `size` samples with
+    timestamps. Two monotonic queues of sample indexes are kept in
+    preallocated arrays, so each sample costs amortized O(1).
+  """
+  __slots__ = (
+    "_size", "_x", "_t", "_count",
+    "_minQueue", "_minHead", "_minTail",
+    "_maxQueue", "_maxHead", "_maxTail"
+  )
+
+  def __init__(self, size = 16):
+    """
+      Initialize a WindowExtremes object.
+    Args:
+      size (int, optional): the number of samples in the window. Defaults to 16.
+    """
+    self._size = size
+    self._x = array("f", [0.0]*size)
+    self._t = array("i", [0]*size)
+    self._minQueue = array("i", [0]*size)
+    self._maxQueue = array("i", [0]*size)
+    self.reset()
+
+  def reset(self):
+    """
+      Discard all the samples.
+    """
+    self._count = 0
+    self._minHead = 0
+    self._minTail = 0
+    self._maxHead = 0
+    self._maxTail = 0
+
+  def sample(self, x = 0.0, t = 0):
+    """
+      Set the x sample taken at the time t.
+    Args:
+      x (float, optional): the value of x sample. Defaults to 0.0.
+      t (int, optional): the time of the sample. Defaults to 0.
+    """
+    size = self._size
+    index = self._count
+    slot = index % size
+    oldest = index - size + 1
+
+    #Queues hold increasing sample indexes; head and tail are absolute positions.
+    #The index leaving the window is dropped before its slot is reused.
+    if self._minTail > self._minHead and self._minQueue[self._minHead % size] < oldest:
+      self._minHead += 1
+    if self._maxTail > self._maxHead and self._maxQueue[self._maxHead % size] < oldest:
+      self._maxHead += 1
+
+    self._x[slot] = x
+    self._t[slot] = t
+
+    while self._minTail > self._minHead and self._x[self._minQueue[(self._minTail - 1) % size] % size] >= x:
+      self._minTail -= 1
+    self._minQueue[self._minTail % size] = index
+    self._minTail += 1
+
+    while self._maxTail > self._maxHead and self._x[self._maxQueue[(self._maxTail - 1) % size] % size] <= x:
+      self._maxTail -= 1
+    self._maxQueue[self._maxTail % size] = index
+    self._maxTail += 1
+
+    self._count += 1
+
+  def min(self):
+    """
+      Get the minimum value in the window.
+    Returns:
+      float: the minimum value. It's 0.0 if there is no sample.
+    """
+    if self._count == 0:
+      return 0.0
+
+    return self._x[self._minQueue[self._minHead % self._size] % self._size]
+
+  def max(self):
+    """
+      Get the maximum value in the window.
+    Returns:
+      float: the maximum value. It's 0.0 if there is no sample.
+    """
+    if self._count == 0:
+      return 0.0
+
+    return self._x[self._maxQueue[self._maxHead % self._size] % self._size]
+
+  def tMin(self):
+    """
+      Get the time of the minimum value in the window.
+    Returns:
+      int: the time given with the minimum sample.
+    """
+    if self._count == 0:
+      return 0
+
+    return self._t[self._minQueue[self._minHead % self._size] % self._size]
+
+  def tMax(self):
+    """
+      Get the time of the maximum value in the window.
+    Returns:
+      int: the time given with the maximum sample.
+    """
+    if self._count == 0:
+      return 0
+
+    return self._t[self._maxQueue[self._maxHead % self._size] % self._size]
+
+  def numberOfSamples(self):
+    """
+      Get the number of samples in the window.
+    Returns:
+        int: the number of samples
+    """
+    if self._count < self._size:
+      return self._count
+
+    return self._size
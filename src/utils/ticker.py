@@ -0,0 +1,207 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from utils import clock
+from utils.stats import Welford
+
+class Ticker:
+  """
+    Implements a fixed-rate tick scheduled against absolute deadlines. The
+    deadline of tick n is start + n*period, whatever the time the previous
+    ticks were noticed, so the ticks never drift.
+
+    A tick noticed after the deadline of the next one is an overrun. The
+    missed ticks are either skipped (Ticker.SKIP), keeping the grid of
+    deadlines, or run back to back (Ticker.CATCH_UP), at most maxCatchUp of
+    them; older ones are skipped. The lateness of every tick is recorded.
+
+    Times are integers from clock.ticks_ms() or clock.ticks_us(); the period
+    is in the same unit.
+  """
+  SKIP = 0
+  CATCH_UP = 1
+
+  def __init__(self, period = 1000, policy = 0, maxCatchUp = 3):
+    """
+      Initialize a Ticker object.
+    Args:
+      period (int, optional): the period. Defaults to 1000.
+      policy (int, optional): Ticker.SKIP or Ticker.CATCH_UP.
+        Defaults to Ticker.SKIP.
+      maxCatchUp (int, optional): the most ticks run back to back by
+        Ticker.CATCH_UP. Defaults to 3.
+    """
+    self._period = period
+    self._policy = policy
+    self._maxCatchUp = maxCatchUp
+    self._lateness = Welford()
+    self.start(0)
+
+  def start(self, now = 0):
+    """
+      Set the first deadline one period after now and clear the statistics.
+    Args:
+      now (int, optional): the current time. Defaults to 0.
+    """
+    self._deadline = clock.ticks_add(now, self._period)
+    self._tick = now
+    self._lateness.reset()
+    self._maxLateness = 0
+    self._overruns = 0
+    self._skipped = 0
+    self._ticks = 0
+
+  def period(self):
+    """
+      Get the period.
+    Returns:
+      int: the period.
+    """
+    return self._period
+
+  def setPeriod(self, period = 1000):
+    """
+      Set the period. It's used from the next deadline on.
+    Args:
+      period (int, optional): the period. Defaults to 1000.
+    """
+    self._period = period
+
+  def due(self, now = 0):
+    """
+      Get if a tick is due, and if so, move to the next deadline.
+    Args:
+      now (int, optional): the current time. Defaults to 0.
+
+    Returns:
+      bool: It's True once for every tick reached. Otherwise False.
+    """
+    late = clock.ticks_diff(now, self._deadline)
+    if late < 0:
+      return False
+
+    self._ticks += 1
+    self._lateness.sample(late)
+    if late > self._maxLateness:
+      self._maxLateness = late
+
+    skip = 0
+    missed = late//self._period
+    if missed > 0:
+      self._overruns += 1
+      if self._policy == Ticker.CATCH_UP:
+        #Keep the latest maxCatchUp missed ticks and skip the older ones.
+        skip = missed - self._maxCatchUp
+        if skip < 0:
+          skip = 0
+      else:
+        skip = missed
+
+      self._skipped += skip
+
+    #The tick run is the latest deadline not skipped.
+    self._tick = clock.ticks_add(self._deadline, skip*self._period)
+    self._deadline = clock.ticks_add(self._tick, self._period)
+    return True
+
+  def tickTime(self):
+    """
+      Get the deadline of the last tick, the time it should have run. After
+      skipped ticks, it's the deadline of the latest one.
+    Returns:
+      int: the time of the last tick.
+    """
+    return self._tick
+
+  def deadline(self):
+    """
+      Get the deadline of the next tick.
+    Returns:
+      int: the time of the next tick.
+    """
+    return self._deadline
+
+  def remaining(self, now = 0):
+    """
+      Get the time left to the next deadline.
+    Args:
+      now (int, optional): the current time. Defaults to 0.
+
+    Returns:
+      int: the time left, 0 if the tick is due.
+    """
+    left = clock.ticks_diff(self._deadline, now)
+    if left < 0:
+      return 0
+
+    return left
+
+  def ticks(self):
+    """
+      Get the number of ticks run.
+    Returns:
+      int: the number of ticks.
+    """
+    return self._ticks
+
+  def overruns(self):
+    """
+      Get the number of ticks run more than one period after their
+      deadline.
+    Returns:
+      int: the number of overruns.
+    """
+    return self._overruns
+
+  def skipped(self):
+    """
+      Get the number of ticks not run because of overruns.
+    Returns:
+      int: the number of skipped ticks.
+    """
+    return self._skipped
+
+  def meanLateness(self):
+    """
+      Get the mean time between the deadlines and the ticks.
+    Returns:
+      float: the mean lateness.
+    """
+    return self._lateness.mean()
+
+  def stdevLateness(self):
+    """
+      Get the standard deviation of the lateness of the ticks.
+    Returns:
+      float: the standard deviation.
+    """
+    return self._lateness.stdev()
+
+  def maxLateness(self):
+    """
+      Get the largest time between a deadline and its tick.
+    Returns:
+      int: the maximum lateness.
+    """
+    return self._maxLateness
+
+  def report(self):
+    """
+      Get a summary of the statistics.
+    Returns:
+      str: the ticks, overruns, skipped ticks and the lateness.
+    """
+    return f"ticks={self._ticks} overruns={self._overruns} skipped={self._skipped} late mean={self.meanLateness():.1f} stdev={self.stdevLateness():.1f} max={self._maxLateness}"
@@ -0,0 +1,166 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import gc
+
+def fill(start = "", end = "", columns = 16):
+  """
+    Concatenate start and end with spaces between them.
+  Args:
+    start (str, optional): the start of the text. Defaults to "".
+    end (str, optional): the end of the text. Defaults to "".
+    columns (int, optional): the length of the text. Defaults to 16.
+
+  Returns:
+    str: the concatenated text with the given number of characters.
+  """
+  n = columns - (len(start) + len(end))
+
+  if n <= 0:
+    spaces = " "
+  else:
+    spaces = " "*n
+
+  line = start + spaces + end
+  return line[0:columns]
+
+class Field:
+  """
+    Implements a piece of text shown on the LCD. The text is formatted from
+    a value and kept until the value changes, so redrawing a screen whose
+    values did not change formats nothing.
+  """
+  __slots__ = ("_format", "_value", "_text")
+
+  def __init__(self, format = str):
+    """
+      Initialize a Field object.
+    Args:
+      format (function, optional): gets the value and returns its text, for
+        example "PV {:5.1f}".format. Defaults to str.
+    """
+    self._format = format
+    self._value = None
+    self._text = None
+
+  def text(self, value = None):
+    """
+      Get the text of a value.
+    Args:
+      value (mixed, optional): the value. Defaults to None.
+
+    Returns:
+      str: the formatted value, the same object while the value is the same.
+    """
+    if self._text is None or value != self._value:
+      self._value = value
+      self._text = self._format(value)
+
+    return self._text
+
+  def invalidate(self):
+    """
+      Format the value again on the next call to text().
+    """
+    self._text = None
+
+class Line:
+  """
+    Implements a LCD line made of a start and an end text filled with
+    spaces. The line is built again only when one of the texts changes.
+    Texts coming from a Field, or string constants, are the same object
+    while unchanged, so most checks are a cheap identity test.
+  """
+  __slots__ = ("_columns", "_start", "_end", "_text")
+
+  def __init__(self, columns = 16):
+    """
+      Initialize a Line object.
+    Args:
+      columns (int, optional): the number of characters. Defaults to 16.
+    """
+    self._columns = columns
+    self._start = None
+    self._end = None
+    self._text = " "*columns
+
+  def text(self, start = "", end = ""):
+    """
+      Get the line with start and end.
+    Args:
+      start (str, optional): the start of the text. Defaults to "".
+      end (str, optional): the end of the text. Defaults to "".
+
+    Returns:
+      str: the line, the same object while start and end are the same.
+    """
+    if start is not self._start or end is not self._end:
+      if start != self._start or end != self._end:
+        self._text = fill(start, end, self._columns)
+
+      self._start = start
+      self._end = end
+
+    return self._text
+
+class AllocationCounter:
+  """
+    Counts the heap allocations of a piece of code run once per frame, like
+    the rendering of the LCD. Between start() and stop() the allocated bytes
+    reported by gc.mem_alloc() only grow, unless a collection runs in the
+    middle; those frames are not counted.
+  """
+  def __init__(self):
+    """
+      Initialize an AllocationCounter object.
+    """
+    self.reset()
+
+  def reset(self):
+    """
+      Clear the counters.
+    """
+    self._start = 0
+    self.frames = 0
+    self.allocatingFrames = 0
+    self.bytes = 0
+    self.maxBytes = 0
+
+  def start(self):
+    """
+      Start a frame.
+    """
+    self._start = gc.mem_alloc()
+
+  def stop(self):
+    """
+      End a frame and count its allocations.
+
+    Returns:
+      int: the bytes allocated in the frame.
+    """
+    allocated = gc.mem_alloc() - self._start
+    if allocated < 0:
+      return 0
+
+    self.frames += 1
+    if allocated > 0:
+      self.allocatingFrames += 1
+      self.bytes += allocated
+      if allocated > self.maxBytes:
+        self.maxBytes = allocated
+
+    return allocated
@@ -0,0 +1,213 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from machine import Pin
+from utils.config import ConfigStore
+from utils.max6675 import MAX6675
+from utils.probe import Probe
+
+class Zone:
+  """
+    Implements a heating zone of the station: a temperature probe, the relay
+    of its heater and the power of the heater. Either part is optional, so a
+    zone can be only a probe or only a heater. A zone is used by one running
+    Mode at a time, its owner.
+  """
+  def __init__(self, name = "", probe = None, relay = None, watts = 0):
+    """
+      Initialize a Zone object.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+      probe (Probe, optional): the temperature probe. Defaults to None.
+      relay (Pin, optional): the output driving the heater relay or SSR.
+        Defaults to None.
+      watts (int, optional): the power of the heater. Defaults to 0.
+    """
+    self.name = name
+    self.probe = probe
+    self.relay = relay
+    self.watts = watts
+    self.owner = None
+    self.off()
+
+  def on(self):
+    """
+      Turn the heater on.
+    """
+    if self.relay is not None:
+      self.relay.high()
+
+  def off(self):
+    """
+      Turn the heater off.
+    """
+    if self.relay is not None:
+      self.relay.low()
+
+class HardwareMap:
+  """
+    Implements the hardware of the station described by hardware.json: the
+    zones, each with its sensor pins, relay pin and heater power, and the
+    zones used by each Mode. Every zone is created once and shared by the
+    modes using it; HardwareMap.acquire() keeps two running modes from
+    driving the same zone.
+  """
+  _shared = {}
+
+  def __init__(self, filename = "/config/hardware.json", probesFilename = "/config/probes.json"):
+    """
+      Initialize a HardwareMap object. Every zone is created and its heater
+      turned off.
+    Args:
+      filename (str, optional): the hardware description.
+        Defaults to "/config/hardware.json".
+      probesFilename (str, optional): the filters of the probes.
+        Defaults to "/config/probes.json".
+    """
+    self._data = ConfigStore.shared(filename).data()
+    probes = ConfigStore.shared(probesFilename).data()
+    self._maxWatts = self._data.get("maxWatts", 0)
+    self._zones = {}
+
+    for name, info in self._data["zones"].items():
+      probe = None
+      if "sensor" in info:
+        sensor = info["sensor"]
+        probe = Probe(
+          MAX6675(
+            Pin(sensor["sck"], Pin.OUT),
+            Pin(sensor["cs"], Pin.OUT),
+            Pin(sensor["so"], Pin.IN)
+          ),
+          probes[info.get("probe", name)]
+        )
+
+      relay = None
+      if "relay" in info:
+        relay = Pin(info["relay"], Pin.OUT, value=0)
+
+      self._zones[name] = Zone(name, probe, relay, info.get("watts", 0))
+
+  @staticmethod
+  def shared(filename = "/config/hardware.json"):
+    """
+      Get the HardwareMap of a file, creating it on the first call.
+    Args:
+      filename (str, optional): the hardware description.
+        Defaults to "/config/hardware.json".
+
+    Returns:
+      HardwareMap: the shared object.
+    """
+    if filename not in HardwareMap._shared:
+      HardwareMap._shared[filename] = HardwareMap(filename)
+
+    return HardwareMap._shared[filename]
+
+  def zone(self, name = ""):
+    """
+      Get a zone.
+    Args:
+      name (str, optional): the zone name. Defaults to "".
+
+    Returns:
+      Zone: the zone.
+    """
+    return self._zones[name]
+
+  def zones(self):
+    """
+      Get every zone.
+    Returns:
+      list: the Zone objects.
+    """
+    return list(self._zones.values())
+
+  def modes(self):
+    """
+      Get the description of the modes: a list of dictionaries with the
+      keys "type", "name", "config", "sensor" and "heaters".
+    Returns:
+      list: the modes.
+    """
+    return self._data["modes"]
+
+  def isConcurrent(self):
+    """
+      Get if modes using other zones may keep running while another Mode
+      is used.
+    Returns:
+      bool: the "concurrent" option.
+    """
+    return self._data.get("concurrent", False)
+
+  def watts(self):
+    """
+      Get the power of the heaters of the zones in use.
+    Returns:
+      int: the sum of the power of the owned zones.
+    """
+    watts = 0
+    for zone in self._zones.values():
+      if zone.owner is not None:
+        watts += zone.watts
+
+    return watts
+
+  def acquire(self, owner, zones):
+    """
+      Make owner the owner of zones, if none of them is used by another
+      owner and the power budget "maxWatts" (0 for no budget) allows it.
+    Args:
+      owner (object): the new owner, usually a Mode.
+      zones (list): the Zone objects.
+
+    Returns:
+      bool: It's True if the zones were acquired. Otherwise False.
+    """
+    watts = self.watts()
+    for zone in zones:
+      if zone.owner is not None and zone.owner is not owner:
+        return False
+
+      if zone.owner is None:
+        watts += zone.watts
+
+    if self._maxWatts > 0 and watts > self._maxWatts:
+      return False
+
+    for zone in zones:
+      zone.owner = owner
+
+    return True
+
+  def release(self, owner):
+    """
+      Turn off and free every zone of owner.
+    Args:
+      owner (object): the owner.
+    """
+    for zone in self._zones.values():
+      if zone.owner is owner:
+        zone.off()
+        zone.owner = None
+
+  def off(self):
+    """
+      Turn off every heater.
+    """
+    for zone in self._zones.values():
+      zone.off()
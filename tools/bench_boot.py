@@ -0,0 +1,125 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Startup benchmark. It imports the modules loaded by main.py, creates the
+# modes, and reports the time spent and the heap left. Each module is
+# reported as source (.py), compiled (.mpy) or frozen (in the firmware).
+#
+# On the device:  mpremote run tools/bench_boot.py
+# On the host:    python tools/bench_boot.py
+
+import gc
+import os
+import sys
+
+HOST = sys.implementation.name != "micropython"
+
+if HOST:
+  import tracemalloc
+  sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+  import host
+  host.setup()
+  tracemalloc.start()
+
+import time
+
+MODULES = (
+  "utils.i2c_lcd",
+  "utils.keypad",
+  "mode.preheater",
+  "mode.reballing",
+  "mode.tuning"
+)
+
+def heapUsed():
+  """
+    Get the bytes allocated on the heap.
+  Returns:
+    int: the allocated bytes.
+  """
+  gc.collect()
+  if HOST:
+    return tracemalloc.get_traced_memory()[0]
+
+  return gc.mem_alloc()
+
+def heapFree():
+  """
+    Get the bytes free on the heap. It's -1 on the host.
+  Returns:
+    int: the free bytes.
+  """
+  gc.collect()
+  if HOST:
+    return -1
+
+  return gc.mem_free()
+
+def origin(module):
+  """
+    Get where a module was loaded from.
+  Args:
+    module (module): the module.
+
+  Returns:
+    str: "source", "compiled" or "frozen".
+  """
+  filename = getattr(module, "__file__", "")
+  if filename.endswith(".mpy"):
+    return "compiled"
+
+  try:
+    os.stat(filename)
+  except OSError:
+    return "frozen"
+
+  return "source"
+
+def main():
+  before = heapUsed()
+  start = time.ticks_us()
+
+  origins = {}
+  for name in MODULES:
+    __import__(name)
+    origins[name] = origin(sys.modules[name])
+
+  importTime = time.ticks_diff(time.ticks_us(), start)
+  importHeap = heapUsed() - before
+
+  from mode.preheater import Preheater
+  from mode.reballing import Reballing
+  from mode.tuning import Tuning
+
+  start = time.ticks_us()
+  models = [
+    Preheater("Preheater", "/config/preheater.json"),
+    Reballing("Reballing", "/config/reballing.json"),
+    Tuning("Auto Tuning", "/config/tuning.json")
+  ]
+  modesTime = time.ticks_diff(time.ticks_us(), start)
+
+  variants = set(origins.values())
+  variant = variants.pop() if len(variants) == 1 else "mixed"
+
+  print("platform;variant;import_us;modes_us;import_heap;mem_free")
+  print(f"{sys.platform};{variant};{importTime};{modesTime};{importHeap};{heapFree()}")
+  for name in MODULES:
+    print(f"# {name}: {origins[name]}")
+
+  return models
+
+main()
@@ -0,0 +1,114 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Rendering benchmark. For every mode it renders idle frames (nothing
+# changed since the previous frame) on the mode screen and on each menu
+# entry, and reports the frames that allocated on the heap and the lines
+# that would have been written to the LCD. Idle frames must allocate nothing
+# and write nothing; the exit status is 1 otherwise.
+#
+# On the device:  mpremote run tools/bench_view.py
+# On the host:    python tools/bench_view.py
+
+import sys
+
+HOST = sys.implementation.name != "micropython"
+
+if HOST:
+  import os
+  sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+  import host
+  host.setup()
+
+from utils.view import AllocationCounter
+from mode.preheater import Preheater
+from mode.reballing import Reballing
+from mode.tuning import Tuning
+
+IDLE_FRAMES = 60
+
+def render(model, shown, counter):
+  """
+    Render one frame like main.py does, without the LCD.
+  Args:
+    model (Mode): the current mode.
+    shown (list): the lines on the LCD, updated in place.
+    counter (AllocationCounter): counts the allocations of the frame.
+
+  Returns:
+    int: the number of lines that would be written to the LCD.
+  """
+  counter.start()
+  lines = model.view()
+  writes = 0
+  if lines[0] is not shown[0]:
+    if lines[0] != shown[0]:
+      writes += 1
+    shown[0] = lines[0]
+
+  if lines[1] is not shown[1]:
+    if lines[1] != shown[1]:
+      writes += 1
+    shown[1] = lines[1]
+
+  counter.stop()
+  return writes
+
+def idle(model, shown, counter):
+  """
+    Render a changed frame followed by IDLE_FRAMES idle ones.
+  Args:
+    model (Mode): the current mode.
+    shown (list): the lines on the LCD.
+    counter (AllocationCounter): counts the allocations of the idle frames.
+
+  Returns:
+    int: the lines written during the idle frames.
+  """
+  render(model, shown, AllocationCounter())
+  writes = 0
+  for i in range(IDLE_FRAMES):
+    writes += render(model, shown, counter)
+
+  return writes
+
+def main():
+  models = [
+    Preheater("Preheater", "/config/preheater.json"),
+    Reballing("Reballing", "/config/reballing.json"),
+    Tuning("Auto Tuning", "/config/tuning.json")
+  ]
+
+  shown = [None, None]
+  failed = False
+  print("mode;frames;allocating_frames;bytes;lcd_writes")
+  for model in models:
+    counter = AllocationCounter()
+    writes = idle(model, shown, counter)
+
+    model.lock()
+    for i in range(model.menuCount()):
+      writes += idle(model, shown, counter)
+      model.nextMenu()
+
+    model.unlock()
+    print(f"{model.name()};{counter.frames};{counter.allocatingFrames};{counter.bytes};{writes}")
+    failed = failed or counter.allocatingFrames > 0 or writes > 0
+
+  return failed
+
+if main():
+  sys.exit(1)
@@ -0,0 +1,245 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Builds the FCR for the Raspberry Pi Pico.
+#
+#   python tools/build.py mpy                  compile mode/ and utils/ to .mpy
+#   python tools/build.py firmware --micropython PATH
+#                                              freeze them into a firmware image
+#   python tools/build.py deploy source|mpy|frozen [--config]
+#                                              copy a variant to the device
+#   python tools/build.py clean
+#
+# The output goes to build/. Files are processed in sorted order and
+# build/<variant>/BUILD_INFO lists the tool version and the SHA-256 of every
+# file, so two builds of the same tree can be compared. deploy only copies
+# the files of config/ missing on the device, so the settings, patterns and
+# hardware map of the station are kept; --config replaces them.
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+BUILD = os.path.join(ROOT, "build")
+PACKAGES = ("mode", "utils")
+MANIFEST = os.path.join(ROOT, "tools", "manifest.py")
+
+def run(command, cwd = None):
+  """
+    Run a command, stopping the build if it fails.
+  Args:
+    command (list): the command and its arguments.
+    cwd (str, optional): the working directory. Defaults to None.
+
+  Returns:
+    str: the standard output.
+  """
+  print("$ " + " ".join(command))
+  result = subprocess.run(command, cwd=cwd, stdout=subprocess.PIPE, text=True)
+  if result.returncode != 0:
+    sys.exit(result.returncode)
+
+  return result.stdout
+
+def sourceFiles(package):
+  """
+    Get the Python files of a package, in sorted order.
+  Args:
+    package (str): the package directory inside src/.
+
+  Returns:
+    list: the paths relative to src/.
+  """
+  files = []
+  for name in sorted(os.listdir(os.path.join(SRC, package))):
+    if name.endswith(".py"):
+      files.append(os.path.join(package, name))
+
+  return files
+
+def copyCommon(out):
+  """
+    Copy main.py and config/ to out. They always stay as source files.
+  Args:
+    out (str): the output directory.
+  """
+  os.makedirs(out, exist_ok=True)
+  shutil.copy2(os.path.join(SRC, "main.py"), os.path.join(out, "main.py"))
+  shutil.copytree(
+    os.path.join(SRC, "config"),
+    os.path.join(out, "config"),
+    dirs_exist_ok=True,
+    ignore=shutil.ignore_patterns("*.bin", "*.tmp")
+  )
+
+def writeBuildInfo(out, tool = ""):
+  """
+    Write BUILD_INFO with the tool version and the hash of every file.
+  Args:
+    out (str): the output directory.
+    tool (str, optional): the version of the tool used. Defaults to "".
+  """
+  lines = [f"tool: {tool.strip()}"]
+  for directory, dirs, files in sorted(os.walk(out)):
+    dirs.sort()
+    for name in sorted(files):
+      if name == "BUILD_INFO":
+        continue
+
+      path = os.path.join(directory, name)
+      with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+      lines.append(f"{digest}  {os.path.relpath(path, out)}")
+
+  with open(os.path.join(out, "BUILD_INFO"), "w") as f:
+    f.write("\n".join(lines) + "\n")
+
+def buildSource(args):
+  out = os.path.join(BUILD, "source")
+  shutil.rmtree(out, ignore_errors=True)
+  copyCommon(out)
+  for package in PACKAGES:
+    os.makedirs(os.path.join(out, package), exist_ok=True)
+    for path in sourceFiles(package):
+      shutil.copy2(os.path.join(SRC, path), os.path.join(out, path))
+
+  writeBuildInfo(out, "source")
+  return out
+
+def buildMpy(args):
+  out = os.path.join(BUILD, "mpy")
+  shutil.rmtree(out, ignore_errors=True)
+  copyCommon(out)
+  tool = run([args.mpy_cross, "--version"])
+  for package in PACKAGES:
+    os.makedirs(os.path.join(out, package), exist_ok=True)
+    for path in sourceFiles(package):
+      target = os.path.join(out, path[:-3] + ".mpy")
+      #-s keeps the relative name in tracebacks instead of the host path.
+      run([args.mpy_cross, "-march=armv6m", "-s", path, "-o", target, path], cwd=SRC)
+
+  writeBuildInfo(out, tool)
+  return out
+
+def buildFirmware(args):
+  if args.micropython is None:
+    sys.exit("firmware: use --micropython with the path of a MicroPython checkout")
+
+  port = os.path.join(args.micropython, "ports", "rp2")
+  run(["make", "-C", port, f"BOARD={args.board}", f"FROZEN_MANIFEST={MANIFEST}"])
+
+  out = os.path.join(BUILD, "frozen")
+  shutil.rmtree(out, ignore_errors=True)
+  copyCommon(out)
+  image = os.path.join(port, f"build-{args.board}", "firmware.uf2")
+  shutil.copy2(image, os.path.join(BUILD, f"fcr-{args.board}.uf2"))
+  tool = run(["git", "-C", args.micropython, "describe", "--always", "--dirty"])
+  writeBuildInfo(out, f"micropython {tool}")
+  print(f"Flash {os.path.join(BUILD, f'fcr-{args.board}.uf2')} and deploy the frozen variant.")
+  return out
+
+def deviceFiles(mpremote, path = ""):
+  """
+    List the files of a directory of the device.
+  Args:
+    mpremote (list): the mpremote command and its connection arguments.
+    path (str, optional): the directory. Defaults to "".
+
+  Returns:
+    set: the file names, empty if the directory does not exist.
+  """
+  result = subprocess.run(mpremote + ["fs", "ls", f":{path}"], stdout=subprocess.PIPE, text=True)
+  if result.returncode != 0:
+    return set()
+
+  names = set()
+  for line in result.stdout.splitlines():
+    fields = line.split()
+    if len(fields) == 2 and fields[0].isdigit():
+      names.add(fields[1])
+
+  return names
+
+def deploy(args):
+  builders = {"source": buildSource, "mpy": buildMpy}
+  if args.variant in builders:
+    out = builders[args.variant](args)
+  else:
+    out = os.path.join(BUILD, "frozen")
+    if not os.path.isdir(out):
+      sys.exit("deploy frozen: run the firmware target first")
+
+  mpremote = [args.mpremote]
+  if args.device:
+    mpremote += ["connect", args.device]
+
+  #Files of another variant would shadow this one: .py is imported before .mpy.
+  for package in PACKAGES:
+    subprocess.run(mpremote + ["fs", "rm", "-r", f":{package}"])
+
+  for name in sorted(os.listdir(out)):
+    if name == "BUILD_INFO":
+      continue
+
+    if name == "config" and not args.config:
+      present = deviceFiles(mpremote, name)
+      if len(present) == 0:
+        subprocess.run(mpremote + ["fs", "mkdir", f":{name}"])
+
+      for filename in sorted(os.listdir(os.path.join(out, name))):
+        if filename in present:
+          print(f"keeping :{name}/{filename}")
+        else:
+          run(mpremote + ["fs", "cp", os.path.join(out, name, filename), f":{name}/{filename}"])
+      continue
+
+    run(mpremote + ["fs", "cp", "-r", os.path.join(out, name), ":"])
+
+def clean(args):
+  shutil.rmtree(BUILD, ignore_errors=True)
+
+def main():
+  parser = argparse.ArgumentParser(description="Build the FCR firmware variants.")
+  parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+  parser.add_argument("--mpremote", default="mpremote", help="mpremote executable")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  commands.add_parser("source", help="copy the source files to build/source").set_defaults(func=buildSource)
+  commands.add_parser("mpy", help="compile mode/ and utils/ to build/mpy").set_defaults(func=buildMpy)
+
+  firmware = commands.add_parser("firmware", help="freeze mode/ and utils/ into a firmware image")
+  firmware.add_argument("--micropython", help="path of a MicroPython checkout")
+  firmware.add_argument("--board", default="RPI_PICO")
+  firmware.set_defaults(func=buildFirmware)
+
+  deployer = commands.add_parser("deploy", help="copy a variant to the device with mpremote")
+  deployer.add_argument("variant", choices=("source", "mpy", "frozen"))
+  deployer.add_argument("--device", help="serial port of the device")
+  deployer.add_argument("--config", action="store_true", help="replace the config files on the device")
+  deployer.set_defaults(func=deploy)
+
+  commands.add_parser("clean", help="remove build/").set_defaults(func=clean)
+
+  args = parser.parse_args()
+  args.func(args)
+
+if __name__ == "__main__":
+  main()
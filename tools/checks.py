@@ -0,0 +1,323 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Checks of the building blocks of the control that the regression suite
+# only reaches through whole runs. Each check runs the code of src/ on the
+# host against a brute-force reference:
+#   windows   the windowed mean, variance, minimum and maximum of stats.py
+#   median    the Median filter of filters.py
+#   menu      MenuItem.change() keeping the values on the grid of the step
+#   patterns  the PatternStore write/read round trip, with empty patterns
+#   probe     the error holding of the pipeline and the probe fault
+#
+#   python tools/checks.py                run every check
+#   python tools/checks.py menu probe     run some checks
+#
+# The exit status is 1 if any check fails.
+
+import argparse
+import json
+import random
+import sys
+from array import array
+
+import host
+
+host.setup()
+
+from utils.filters import Median, Pipeline
+from utils.patterns import PatternStore
+from utils.probe import Probe
+from utils.stats import WindowExtremes, WindowWelford
+from mode.menu import MenuItem
+
+SEED = 2025
+
+def single(x = 0.0):
+  """
+    Round a number to the precision of the array("f") buffers of src/.
+  Args:
+    x (float, optional): the number. Defaults to 0.0.
+
+  Returns:
+    float: the rounded number.
+  """
+  return array("f", [x])[0]
+
+def close(a = 0.0, b = 0.0, tolerance = 1e-3):
+  return abs(a - b) <= tolerance*max(1.0, abs(a), abs(b))
+
+def windows():
+  failures = []
+  rng = random.Random(SEED)
+  for size in (1, 2, 3, 8, 16, 17):
+    for kind in ("noise", "ramp", "steps"):
+      welford = WindowWelford(size)
+      extremes = WindowExtremes(size)
+      xs = []
+      for t in range(10*size + 50):
+        if kind == "noise":
+          x = rng.uniform(-50.0, 250.0)
+        elif kind == "ramp":
+          x = 25.0 + 0.5*t + rng.gauss(0.0, 0.2)
+        else:
+          x = float(rng.choice((20, 20, 150, 230)))
+
+        welford.sample(x)
+        extremes.sample(x, t)
+        xs.append((single(x), t))
+        window = xs[-size:]
+        values = [v for v, _ in window]
+
+        mean = sum(values)/len(values)
+        variance = 0.0
+        if len(values) > 1:
+          variance = sum((v - mean)**2 for v in values)/(len(values) - 1)
+        #Among equal extremes the newest one is kept.
+        low = min(values)
+        high = max(values)
+        tLow = [u for v, u in window if v == low][-1]
+        tHigh = [u for v, u in window if v == high][-1]
+
+        found = (welford.mean(), welford.variance(), extremes.min(), extremes.max(), extremes.tMin(), extremes.tMax())
+        expected = (mean, variance, low, high, tLow, tHigh)
+        if not (close(found[0], mean) and close(found[1], variance, 1e-2) and found[2:] == expected[2:]):
+          failures.append(f"size {size} {kind} t={t}: {found} != {expected}")
+          break
+
+  return failures
+
+def median():
+  failures = []
+  rng = random.Random(SEED)
+  for n in (1, 3, 5, 7):
+    f = Median(n)
+    f.reset(25.0)
+    xs = [25.0]*n
+    for t in range(200):
+      x = rng.choice((rng.uniform(20.0, 30.0), 500.0, -10.0))
+      xs.append(single(x))
+      found = f.sample(x)
+      expected = sorted(xs[-n:])[n//2]
+      if found != expected:
+        failures.append(f"n {n} t={t}: {found} != {expected}")
+        break
+
+  return failures
+
+class Store:
+  """
+    Implements the storage of a single menu value.
+  """
+  def __init__(self, value = 0):
+    self.value = value
+
+  def get(self, key = ""):
+    return self.value
+
+  def set(self, key = "", value = None):
+    self.value = value
+
+def onGrid(item, value):
+  units = (round(value*item._scale) - item._min)/item._units
+  return abs(units - round(units)) < 1e-9 and item.min <= value <= item.max
+
+def menu():
+  failures = []
+  infos = {
+    "r": {"min": -1, "max": 1, "step": 0.01, "unit": "C/s"},
+    "L": {"min": 0, "max": 300, "step": 0.5, "unit": "C"},
+    "d": {"min": 60, "max": 300, "step": 30, "unit": "s"},
+    "c": {"min": 0, "max": 3, "step": 0.05, "unit": "C/s"},
+    #The maximum is not on the grid: the last step stops at 0.9.
+    "x": {"min": 0, "max": 1, "step": 0.3, "unit": ""},
+    "y": {"min": 0.1, "max": 2.5, "step": 0.2, "unit": ""}
+  }
+  for label, info in infos.items():
+    lowest = info["min"]
+    highest = info["min"]
+    while highest + info["step"] <= info["max"] + 1e-9:
+      highest = round(highest + info["step"], 6)
+
+    for start in (info["min"], info["max"], (info["min"] + info["max"])/2, info["min"] + 0.37*info["step"]):
+      for repeats in (0, 10, 20, 30):
+        for direction in (1, -1):
+          store = Store(start)
+          item = MenuItem(label, MenuItem.VALUE, store, label, info)
+          for i in range(2000):
+            if direction > 0:
+              item.increase(repeats)
+            else:
+              item.decrease(repeats)
+
+            if not onGrid(item, store.value):
+              failures.append(f"{label} from {start} x{repeats}: {store.value} off the grid")
+              break
+
+          bound = highest if direction > 0 else lowest
+          if abs(store.value - bound) > 1e-9:
+            failures.append(f"{label} from {start} x{repeats}: ends at {store.value}, not {bound}")
+
+    #The decades stop at the limits too.
+    store = Store(info["min"])
+    item = MenuItem(label, MenuItem.VALUE, store, label, info)
+    for decade in range(len(MenuItem.MARKERS)):
+      item.increase()
+      if not onGrid(item, store.value):
+        failures.append(f"{label} {item.marker()}: {store.value} off the grid")
+      item.nextDecade()
+
+  return failures
+
+def patterns():
+  failures = []
+  first = {"r1": 1.5, "L1": 100.0, "d1": 30, "c": 0.0, "e": 0.0}
+  second = {"r1": 0.5, "L1": 150.0, "d1": 90, "r2": 0.25, "L2": 217.5, "d2": 45}
+  with open("/config/checks.json", "w") as f:
+    json.dump({"PTN1": first, "PTN2": second}, f)
+
+  store = PatternStore("/config/checks.bin", "/config/checks.json")
+  empty = {key: 0 for key in store.load(PatternStore.MAX_PATTERNS)}
+  pattern = {
+    "r1": 0.86, "L1": 120.0, "d1": 60,
+    "r2": -0.57, "L2": 180.5, "d2": 65535,
+    "r3": 0.0, "L3": 0.0, "d3": 0,
+    "r4": 0.0, "L4": 0.0, "d4": 0,
+    "r5": 0.0, "L5": 0.0, "d5": 0,
+    "c": 0.35, "e": 50.0
+  }
+  store.save(7, pattern)
+  store.save(9, empty)
+
+  #A new store reads the file as written, from its header. The patterns
+  #between the last one and PTN7 are empty, like those after the last one.
+  reopened = PatternStore("/config/checks.bin", "/config/checks.json")
+  if reopened.count() != 9:
+    failures.append(f"count {reopened.count()} != 9")
+
+  expected = {0: empty, 1: dict(empty, **first), 2: dict(empty, **second), 7: pattern, 10: empty}
+  for n in range(3, 10):
+    expected.setdefault(n, empty)
+  for s in (store, reopened):
+    for n in sorted(expected):
+      found = s.load(n)
+      if found != expected[n]:
+        failures.append(f"PTN{n}: {found} != {expected[n]}")
+
+  return failures
+
+class Sensor:
+  """
+    Implements a MAX6675 stand-in giving a list of readings, one per
+    conversion.
+  """
+  def __init__(self, readings = ()):
+    self._readings = readings
+    self._index = -1
+    self._time = 0
+
+  def next(self):
+    self._index += 1
+    self._time += 220
+
+  def read(self):
+    return self._readings[self._index][0]
+
+  def sequence(self):
+    return self._index
+
+  def timestamp(self):
+    return self._time
+
+  def error(self):
+    return self._readings[self._index][1]
+
+def probe():
+  failures = []
+  limit = Probe.MAX_ERRORS
+  readings = [(100.0, 0)] + [(0.0, 1)]*(limit - 1) + [(101.0, 0)] + [(0.0, 1)]*limit + [(102.0, 0)]
+  sensor = Sensor(readings)
+  p = Probe(sensor)
+  faults = []
+  for i in range(len(readings)):
+    sensor.next()
+    p.sample()
+    faults.append(p.fault())
+    #A reading with the error bit keeps the last good value.
+    good = [x for x, error in readings[:i + 1] if not error]
+    if p.value() != good[-1]:
+      failures.append(f"reading {i}: value {p.value()} != {good[-1]}")
+
+  expected = [False]*(limit + 1) + [False]*(limit - 1) + [True, True]
+  if faults != expected:
+    failures.append(f"faults {faults} != {expected}")
+
+  if not p.clearFault() or p.fault():
+    failures.append("the fault is not cleared by a good reading")
+
+  sensor = Sensor([(0.0, 1)]*limit)
+  p = Probe(sensor)
+  for i in range(limit):
+    sensor.next()
+    p.sample()
+  if p.clearFault() or not p.fault():
+    failures.append("the fault is cleared while the probe fails")
+
+  if p.numberOfErrors() != limit:
+    failures.append(f"{p.numberOfErrors()} errors counted, not {limit}")
+
+  pipeline = Pipeline.fromConfig([{"type": "median", "n": 3}])
+  pipeline.sample(50.0, 0.22)
+  pipeline.sample(0.0, 0.22, 1)
+  if pipeline.value() != 50.0 or pipeline.numberOfSamples() != 1:
+    failures.append("the pipeline does not drop the samples with the error bit")
+
+  return failures
+
+CHECKS = {
+  "windows": windows,
+  "median": median,
+  "menu": menu,
+  "patterns": patterns,
+  "probe": probe
+}
+
+def main():
+  parser = argparse.ArgumentParser(description="Check the building blocks of the control against references.")
+  parser.add_argument("checks", nargs="*", help="check names, every check by default")
+  args = parser.parse_args()
+
+  names = args.checks or list(CHECKS)
+  for name in names:
+    if name not in CHECKS:
+      sys.exit(f"unknown check {name}, use one of {', '.join(CHECKS)}")
+
+  failed = False
+  for name in names:
+    failures = CHECKS[name]()
+    if len(failures) == 0:
+      print(f"{name}: ok")
+      continue
+
+    failed = True
+    print(f"{name}: FAIL")
+    for failure in failures[:10]:
+      print(f"  {failure}")
+
+  sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,238 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Controls one or more FCRs over USB serial with the protocol of
+# src/utils/protocol.py. Needs pyserial (pip install pyserial).
+#
+#   python tools/fcrctl.py --port /dev/ttyACM0 modes
+#   python tools/fcrctl.py --port /dev/ttyACM0 get Reballing [KEY ...]
+#   python tools/fcrctl.py --port /dev/ttyACM0 set Preheater SV=150 Kp=30.5
+#   python tools/fcrctl.py --port /dev/ttyACM0 pattern Reballing 3 [r1=0.9 ...]
+#   python tools/fcrctl.py --port /dev/ttyACM0 export Reballing patterns.json
+#   python tools/fcrctl.py --port /dev/ttyACM0 import Reballing patterns.json
+#   python tools/fcrctl.py --port /dev/ttyACM0 run|stop|state Preheater
+#
+# --port may be repeated to send the same command to several stations; the
+# output of each one is prefixed with its port. A mode is its name or its
+# index in the list of modes.
+
+import argparse
+import json
+import sys
+
+BAUDRATE = 115200
+TIMEOUT = 5.0
+PATTERNS = 99
+
+class Station:
+  """
+    Implements the connection to one FCR.
+  """
+  def __init__(self, port = "", timeout = TIMEOUT):
+    """
+      Initialize a Station object.
+    Args:
+      port (str, optional): the serial port. Defaults to "".
+      timeout (float, optional): the seconds to wait for a response.
+        Defaults to TIMEOUT.
+    """
+    try:
+      import serial
+    except ImportError:
+      sys.exit("fcrctl needs pyserial: pip install pyserial")
+
+    self.port = port
+    self._serial = serial.Serial(port, BAUDRATE, timeout=timeout)
+    self._id = 0
+
+  def request(self, command = "", **arguments):
+    """
+      Send a request and wait for its response. Lines printed by the FCR
+      that are not responses are skipped.
+    Args:
+      command (str, optional): the command. Defaults to "".
+      arguments: the other keys of the request.
+
+    Returns:
+      mixed: the result.
+
+    Raises:
+      RuntimeError: the FCR refused the request or did not answer.
+    """
+    self._id += 1
+    request = dict(arguments, id=self._id, cmd=command)
+    self._serial.write((json.dumps(request) + "\n").encode())
+    while True:
+      line = self._serial.readline()
+      if not line:
+        raise RuntimeError(f"no response to {command}")
+
+      line = line.decode(errors="replace").strip()
+      if not line.startswith("{"):
+        continue
+
+      try:
+        response = json.loads(line)
+      except ValueError:
+        continue
+
+      if response.get("id") != self._id:
+        continue
+
+      if not response["ok"]:
+        raise RuntimeError(response["error"])
+
+      return response["result"]
+
+  def close(self):
+    self._serial.close()
+
+def modeKey(mode):
+  return int(mode) if mode.isdigit() else mode
+
+def parseValues(assignments):
+  """
+    Parse KEY=VALUE arguments.
+  Args:
+    assignments (list): the arguments.
+
+  Returns:
+    dictionary: the values, as numbers; whole ones are int.
+  """
+  values = {}
+  for assignment in assignments:
+    key, _, value = assignment.partition("=")
+    try:
+      number = float(value)
+    except ValueError:
+      sys.exit(f"expected KEY=VALUE with a number, got {assignment}")
+
+    values[key] = int(number) if number.is_integer() else number
+
+  return values
+
+def modes(station, args):
+  return station.request("modes")
+
+def get(station, args):
+  return station.request("get", mode=modeKey(args.mode), keys=args.keys)
+
+def set(station, args):
+  return station.request("set", mode=modeKey(args.mode), values=parseValues(args.values))
+
+def pattern(station, args):
+  if args.values:
+    return station.request("pattern", mode=modeKey(args.mode), n=args.n, values=parseValues(args.values))
+
+  return station.request("pattern", mode=modeKey(args.mode), n=args.n)
+
+def export(station, args):
+  patterns = {}
+  for n in range(1, args.count + 1):
+    patterns[f"PTN{n}"] = station.request("pattern", mode=modeKey(args.mode), n=n)
+
+  filename = args.file
+  if len(args.port) > 1:
+    filename = f"{station.port.replace('/', '_')}-{filename}"
+
+  with open(filename, "w") as file:
+    json.dump(patterns, file, indent=2)
+
+  return filename
+
+def load(station, args):
+  with open(args.file) as file:
+    patterns = json.load(file)
+
+  #The keys are PTN1, PTN2, ..., like patterns.json and
+  #PatternStore.importJSON(); other keys are ignored.
+  count = 0
+  for n in range(1, PATTERNS + 1):
+    key = f"PTN{n}"
+    if key in patterns:
+      station.request("pattern", mode=modeKey(args.mode), n=n, values=patterns[key])
+      count += 1
+
+  return count
+
+def run(station, args):
+  return station.request("run", mode=modeKey(args.mode))
+
+def stop(station, args):
+  return station.request("stop", mode=modeKey(args.mode))
+
+def state(station, args):
+  return station.request("state", mode=modeKey(args.mode))
+
+def main():
+  parser = argparse.ArgumentParser(description="Control FCRs over USB serial.")
+  parser.add_argument("--port", action="append", required=True, help="serial port of a station, may be repeated")
+  parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds to wait for a response")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  commands.add_parser("modes", help="list the modes").set_defaults(func=modes)
+
+  getter = commands.add_parser("get", help="read the settings of a mode")
+  getter.add_argument("mode")
+  getter.add_argument("keys", nargs="*")
+  getter.set_defaults(func=get)
+
+  setter = commands.add_parser("set", help="change settings of a mode")
+  setter.add_argument("mode")
+  setter.add_argument("values", nargs="+", metavar="KEY=VALUE")
+  setter.set_defaults(func=set)
+
+  patterns = commands.add_parser("pattern", help="read or change a reballing pattern")
+  patterns.add_argument("mode")
+  patterns.add_argument("n", type=int)
+  patterns.add_argument("values", nargs="*", metavar="KEY=VALUE")
+  patterns.set_defaults(func=pattern)
+
+  exporter = commands.add_parser("export", help="save every pattern to a JSON file")
+  exporter.add_argument("mode")
+  exporter.add_argument("file")
+  exporter.add_argument("--count", type=int, default=PATTERNS, help="number of patterns")
+  exporter.set_defaults(func=export)
+
+  importer = commands.add_parser("import", help="write the patterns of a JSON file")
+  importer.add_argument("mode")
+  importer.add_argument("file")
+  importer.set_defaults(func=load)
+
+  for name, func, help in (("run", run, "start a mode"), ("stop", stop, "stop a mode"), ("state", state, "show PV, SV, rate and remaining time")):
+    command = commands.add_parser(name, help=help)
+    command.add_argument("mode")
+    command.set_defaults(func=func)
+
+  args = parser.parse_args()
+  failed = False
+  for port in args.port:
+    station = None
+    try:
+      station = Station(port, args.timeout)
+      result = args.func(station, args)
+      print(f"{port}: {json.dumps(result)}" if len(args.port) > 1 else json.dumps(result, indent=2))
+    except Exception as e:
+      print(f"{port}: {e}", file=sys.stderr)
+      failed = True
+    finally:
+      if station is not None:
+        station.close()
+
+  sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,176 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Host simulator: runs the unmodified code of src/ under CPython. It puts
+# src/ and the machine stand-in of tools/sim/ on sys.path, adds the
+# MicroPython time and gc functions, and maps the device paths /config/... into
+# a scratch directory so runs never change the files of the repository.
+
+import builtins
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+SIM = os.path.join(ROOT, "tools", "sim")
+TICKS_PERIOD = 1 << 30
+DEVICE_PREFIXES = ("/config/",)
+
+def installTime():
+  """
+    Add ticks_ms, ticks_us, ticks_add, ticks_diff, sleep_ms and sleep_us to
+    the time module when running under CPython. The ticks wrap around at
+    TICKS_PERIOD like on the RP2040.
+  """
+  if hasattr(time, "ticks_ms"):
+    return
+
+  start = time.monotonic_ns()
+  half = TICKS_PERIOD >> 1
+  mask = TICKS_PERIOD - 1
+
+  time.ticks_ms = lambda: ((time.monotonic_ns() - start)//1000000) & mask
+  time.ticks_us = lambda: ((time.monotonic_ns() - start)//1000) & mask
+  time.ticks_add = lambda ticks, delta: (ticks + delta) & mask
+  time.ticks_diff = lambda ticks1, ticks2: ((ticks1 - ticks2 + half) & mask) - half
+  time.sleep_ms = lambda ms: time.sleep(ms/1000.0)
+  time.sleep_us = lambda us: time.sleep(us/1000000.0)
+  sys.modules["utime"] = time
+
+def installGC():
+  """
+    Add mem_alloc to the gc module when running under CPython. It returns
+    the bytes allocated since it was first called, which only grow like on
+    MicroPython between collections: each call adds the peak traced by
+    tracemalloc since the previous call, less the bytes the measurement
+    itself allocates. Allocations smaller than that overhead (a few tens of
+    bytes) may be missed, so only the figures of the device are exact.
+  """
+  if hasattr(gc, "mem_alloc"):
+    return
+
+  if not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+  state = [0, tracemalloc.get_traced_memory()[0], 0]
+
+  def memAlloc():
+    current, peak = tracemalloc.get_traced_memory()
+    state[0] += max(0, peak - state[1] - state[2])
+    state[1] = current
+    tracemalloc.reset_peak()
+    return state[0]
+
+  tracemalloc.reset_peak()
+  overhead = []
+  for i in range(8):
+    before = state[0]
+    memAlloc()
+    overhead.append(state[0] - before)
+
+  state[2] = min(overhead)
+  gc.mem_alloc = memAlloc
+
+class Device:
+  """
+    Implements the filesystem of a simulated device. The files under
+    /config/ are read and written in root/config/, which starts as a copy
+    of src/config/.
+  """
+  def __init__(self, root = None):
+    """
+      Initialize a Device object.
+    Args:
+      root (str, optional): the directory used as the device root. A new
+        temporary directory is used if it's None. Defaults to None.
+    """
+    self._temporary = root is None
+    self.root = tempfile.mkdtemp(prefix="fcr-") if root is None else root
+    config = os.path.join(self.root, "config")
+    if not os.path.isdir(config):
+      shutil.copytree(os.path.join(SRC, "config"), config)
+
+    self._saved = None
+
+  def path(self, path):
+    """
+      Map a device path into the host filesystem.
+    Args:
+      path (str): the path used by the device code.
+
+    Returns:
+      str: the host path.
+    """
+    if isinstance(path, str) and path.startswith(DEVICE_PREFIXES):
+      return os.path.join(self.root, path[1:])
+
+    return path
+
+  def install(self):
+    """
+      Redirect open, os.rename, os.remove and os.stat for device paths.
+    """
+    if self._saved is not None:
+      return
+
+    self._saved = (builtins.open, os.rename, os.remove, os.stat)
+    hostOpen, hostRename, hostRemove, hostStat = self._saved
+    builtins.open = lambda file, *args, **kwargs: hostOpen(self.path(file), *args, **kwargs)
+    os.rename = lambda src, dst: hostRename(self.path(src), self.path(dst))
+    os.remove = lambda path: hostRemove(self.path(path))
+    os.stat = lambda path, *args, **kwargs: hostStat(self.path(path), *args, **kwargs)
+
+  def uninstall(self):
+    """
+      Restore open, os.rename, os.remove and os.stat.
+    """
+    if self._saved is None:
+      return
+
+    builtins.open, os.rename, os.remove, os.stat = self._saved
+    self._saved = None
+
+  def close(self):
+    """
+      Uninstall the device and remove its temporary root.
+    """
+    self.uninstall()
+    if self._temporary:
+      shutil.rmtree(self.root, ignore_errors=True)
+
+def setup(root = None):
+  """
+    Prepare the interpreter to import the code of src/.
+  Args:
+    root (str, optional): the device root. See Device. Defaults to None.
+
+  Returns:
+    Device: the installed device filesystem.
+  """
+  for path in (SIM, SRC):
+    if path not in sys.path:
+      sys.path.insert(0, path)
+
+  installTime()
+  installGC()
+  device = Device(root)
+  device.install()
+  return device
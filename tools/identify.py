@@ -0,0 +1,482 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Identifies a heater from recorded runs. The runs are resampled every
+# --step seconds and two models are fitted to all of them at once, for each
+# dead time d up to --max-dead-time:
+#
+#   first:  x[k+1] = a1*x[k] + b*u[k-d]
+#   second: x[k+1] = a1*x[k] + a2*x[k-1] + b*u[k-d]
+#
+# x being PV - ambient and u the duty of the heater. The first order model
+# is searched over its time constant with the least squares gain, and both
+# are refined by instrumental variables, keeping the fit whose simulated
+# response follows the runs best. Each run gets its own fit, and the pooled
+# fit of every run gives the gain, time constants and dead time of the
+# station, the SIMC tuning of the PID written in the format of pid.json,
+# and the plant of tools/plant.py (the feed-forward: the duty holding SV is
+# (SV - ambient)/gain).
+#
+#   python tools/identify.py runs/*.csv
+#   python tools/identify.py runs/*.csv --output pid.json --plant station.json
+#
+# A run is a CSV file with the header t,PV,duty and an optional ambient
+# column, t in seconds and duty from 0 to 1. The debug output of the modes
+# (t;PV;SV;FACTOR;...) also works, FACTOR being the duty; add --ms for the
+# times in milliseconds of Reballing. Without an ambient column, --ambient
+# is used, or the first PV of the run, so record runs from a cold start.
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import plant
+
+ORDERS = {"first": 1, "second": 2}
+
+# Time constants tried by the first order search.
+TIME_CONSTANTS = 96
+
+# The firmware turns u into the duty 1 - 0.05**(u/(Kp*span)), so its
+# proportional gain near the setpoint is log(20)/span per degree.
+DUTY_SLOPE = np.log(20.0)
+
+class Run:
+  """
+    Implements a recorded run resampled at a fixed step.
+  """
+  def __init__(self, filename = "", step = 1.0, ambient = None, scale = 1.0):
+    """
+      Initialize a Run object.
+    Args:
+      filename (str, optional): the CSV file. Defaults to "".
+      step (float, optional): the sample time in seconds. Defaults to 1.0.
+      ambient (float, optional): the ambient temperature, if the file has
+        no ambient column. The first PV is used if it's None.
+        Defaults to None.
+      scale (float, optional): the seconds of each unit of t.
+        Defaults to 1.0.
+    """
+    self.name = os.path.splitext(os.path.basename(filename))[0]
+    with open(filename) as file:
+      lines = [line.strip() for line in file if line.strip()]
+
+    separator = ";" if ";" in lines[0] else ","
+    header = [name.strip() for name in lines[0].split(separator)]
+    columns = {name.lower(): i for i, name in enumerate(header)}
+    if "duty" not in columns:
+      columns["duty"] = columns.get("factor")
+    for name in ("t", "pv", "duty"):
+      if columns.get(name) is None:
+        raise ValueError(f"{filename}: no {name} column")
+
+    rows = np.array([[float(cell) for cell in line.split(separator)] for line in lines[1:]])
+    if len(rows) < 2:
+      raise ValueError(f"{filename}: too few rows")
+
+    t = scale*rows[:, columns["t"]]
+    PV = rows[:, columns["pv"]]
+    self.time = np.arange(t[0], t[-1], step)
+    self.PV = np.interp(self.time, t, PV)
+    #The duty holds until the next row, like the relay window.
+    self.duty = np.clip(rows[np.searchsorted(t, self.time, side="right") - 1, columns["duty"]], 0.0, 1.0)
+    if "ambient" in columns:
+      self.ambient = np.interp(self.time, t, rows[:, columns["ambient"]])
+    else:
+      self.ambient = np.full(len(self.time), PV[0] if ambient is None else ambient)
+
+def stack(runs):
+  """
+    Put runs of different lengths in arrays.
+  Args:
+    runs (list): the Run objects.
+
+  Returns:
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray): the (R, N) deviations
+      from ambient and duties, padded with their last values, and the (R,)
+      lengths.
+  """
+  lengths = np.array([len(run.time) for run in runs])
+  n = lengths.max()
+  x = np.empty((len(runs), n))
+  u = np.empty((len(runs), n))
+  for i, run in enumerate(runs):
+    x[i] = np.pad(run.PV - run.ambient, (0, n - lengths[i]), mode="edge")
+    u[i] = np.pad(run.duty, (0, n - lengths[i]), mode="edge")
+
+  return x, u, lengths
+
+def solve(ZX, Zy):
+  #A run without heating leaves b undetermined; the ridge keeps it solvable.
+  ridge = 1e-9*np.abs(np.trace(ZX, axis1=-2, axis2=-1))[..., None, None]*np.eye(ZX.shape[-1])
+  return np.linalg.solve(ZX + ridge, Zy[..., None])[..., 0]
+
+def keep(best, error, coefficients, delay, pooledError, pooled, pooledDelay):
+  better = error < best["error"]
+  best["error"] = np.where(better, error, best["error"])
+  best["runs"] = np.where(better[:, None], coefficients, best.get("runs", coefficients))
+  best["runDelay"] = np.where(better, delay, best.get("runDelay", 0))
+  if pooledError < best["pooledError"]:
+    best["pooledError"] = pooledError
+    best["pooled"] = pooled
+    best["pooledDelay"] = pooledDelay
+
+def firstOrder(x, u, lengths, maxDelay = 0, count = TIME_CONSTANTS):
+  """
+    Fit the first order model to every run and to all of them by searching
+    the time constant and the dead time. The gain of each pair is the least
+    squares one, and the simulated response of the model is compared with
+    the measured one, so the fit isn't biased by the noise.
+  Args:
+    x (numpy.ndarray): the (R, N) deviations from ambient.
+    u (numpy.ndarray): the (R, N) duties.
+    lengths (numpy.ndarray): the (R,) lengths.
+    maxDelay (int, optional): the largest dead time in samples.
+      Defaults to 0.
+    count (int, optional): the time constants tried, from 1 sample to 10
+      times the longest run. Defaults to TIME_CONSTANTS.
+
+  Returns:
+    dictionary: see fit().
+  """
+  R, n = x.shape
+  phi = np.exp(-1.0/np.geomspace(1.0, 10.0*n, count))
+  weight = (np.arange(n)[None, :] < lengths[:, None]).astype(float)[:, None, :]
+  #The heater was off before the run.
+  padded = np.pad(u, ((0, 0), (maxDelay, 0)))
+  forced = np.zeros((R, count, n + maxDelay))
+  for j in range(n + maxDelay - 1):
+    forced[:, :, j + 1] = phi*forced[:, :, j] + (1.0 - phi)*padded[:, None, j]
+
+  free = x[:, None, :] - x[:, None, :1]*phi[None, :, None]**np.arange(n)
+  best = {"error": np.full(R, np.inf), "pooledError": np.inf}
+  for delay in range(maxDelay + 1):
+    F = weight*forced[:, :, maxDelay - delay:maxDelay - delay + n]
+    A = (weight*free**2).sum(axis=2)
+    B = (F*free).sum(axis=2)
+    C = np.maximum((F*F).sum(axis=2), 1e-12)
+    error = A - B**2/C
+    choice = error.argmin(axis=1)
+    rows = np.arange(R)
+    gain = B[rows, choice]/C[rows, choice]
+    coefficients = np.stack((phi[choice], (1.0 - phi[choice])*gain), axis=1)
+
+    pooledError = A.sum(axis=0) - B.sum(axis=0)**2/C.sum(axis=0)
+    i = pooledError.argmin()
+    pooled = np.array((phi[i], (1.0 - phi[i])*B[:, i].sum()/C[:, i].sum()))
+    keep(best, error[rows, choice], coefficients, delay, pooledError[i], pooled, delay)
+
+  return best
+
+def fit(x, u, lengths, initial, order = 1, maxDelay = 0, iterations = 0):
+  """
+    Fit a model to every run and to all of them, for each dead time, by
+    instrumental variables: the regressors are the measured responses, and
+    the instruments the responses simulated by the previous fit. Unlike
+    plain least squares, they aren't biased by the noise and the fast
+    dynamics.
+  Args:
+    x (numpy.ndarray): the (R, N) deviations from ambient.
+    u (numpy.ndarray): the (R, N) duties.
+    lengths (numpy.ndarray): the (R,) lengths.
+    initial (dictionary): the result of firstOrder(), the first fit.
+    order (int, optional): 1 or 2. Defaults to 1.
+    maxDelay (int, optional): the largest dead time in samples.
+      Defaults to 0.
+    iterations (int, optional): the refinements. Defaults to 0.
+
+  Returns:
+    dictionary: "runs", the (R, order + 1) coefficients a1, [a2,] b of each
+      run and "runDelay" its dead time, and "pooled" and "pooledDelay" the
+      same for all the runs. The dead time whose simulated response has the
+      least squared error is kept.
+  """
+  R, n = x.shape
+  k = np.arange(order - 1, n - 1)
+  weight = ((k + 1)[None, :] < lengths[:, None]).astype(float)
+  y = x[:, k + 1]
+  padded = np.pad(u, ((0, 0), (maxDelay, 0)))
+  lags = np.zeros(order - 1)
+  start = np.concatenate((initial["runs"][:, :1], np.tile(lags, (R, 1)), initial["runs"][:, 1:]), axis=1)
+  pooledStart = np.concatenate((initial["pooled"][:1], lags, initial["pooled"][1:]))
+
+  def errors(coefficients, delays):
+    #Only stable heaters without oscillation count; the others overflow.
+    with np.errstate(over="ignore", invalid="ignore"):
+      error = (weight*(y - response(coefficients, delays, x, u)[:, k + 1])**2).sum(axis=1)
+    valid = parameters(coefficients, delays, 1.0)["valid"]
+    return np.where(valid, np.nan_to_num(error, nan=np.inf), np.inf)
+
+  def instruments(coefficients, delays, X):
+    simulated = response(coefficients, delays, x, u)
+    return weight[:, :, None]*np.stack([simulated[:, k - j] for j in range(order)] + [X[:, :, order]], axis=-1)
+
+  #The first fit stays if no refinement simulates the runs better.
+  best = {"error": np.full(R, np.inf), "pooledError": np.inf}
+  pooledDelay = np.full(R, initial["pooledDelay"])
+  keep(best, errors(start, initial["runDelay"]), start, initial["runDelay"],
+    errors(np.tile(pooledStart, (R, 1)), pooledDelay).sum(), pooledStart, initial["pooledDelay"])
+
+  for delay in range(maxDelay + 1):
+    delays = np.full(R, delay)
+    X = np.stack([x[:, k - i] for i in range(order)] + [padded[:, k - delay + maxDelay]], axis=-1)
+    theta = start
+    pooled = pooledStart
+    runDelays = initial["runDelay"]
+    pooledDelays = pooledDelay
+    for i in range(iterations):
+      Z = instruments(theta, runDelays, X)
+      theta = solve(np.einsum("rmi,rmj->rij", Z, X), np.einsum("rmi,rm->ri", Z, y))
+      Z = instruments(np.tile(pooled, (R, 1)), pooledDelays, X)
+      pooled = solve(np.einsum("rmi,rmj->ij", Z, X), np.einsum("rmi,rm->i", Z, y))
+      runDelays = delays
+      pooledDelays = delays
+
+    keep(best, errors(theta, delays), theta, delay, errors(np.tile(pooled, (R, 1)), delays).sum(), pooled, delay)
+
+  return best
+
+def response(coefficients, delay, x, u):
+  """
+    Simulate the model of each run from its first samples and its duties.
+  Args:
+    coefficients (numpy.ndarray): the (R, order + 1) coefficients.
+    delay (numpy.ndarray): the (R,) dead times in samples.
+    x (numpy.ndarray): the (R, N) measured deviations from ambient.
+    u (numpy.ndarray): the (R, N) duties.
+
+  Returns:
+    numpy.ndarray: the (R, N) simulated deviations.
+  """
+  order = coefficients.shape[1] - 1
+  rows = np.arange(len(x))
+  padded = np.pad(u, ((0, 0), (delay.max(), 0)))
+  simulated = x.copy()
+  #An unstable fit overflows; its error becomes inf or nan.
+  with np.errstate(over="ignore", invalid="ignore"):
+    for k in range(order - 1, x.shape[1] - 1):
+      value = coefficients[:, order]*padded[rows, k - delay + delay.max()]
+      for i in range(order):
+        value = value + coefficients[:, i]*simulated[:, k - i]
+      simulated[:, k + 1] = value
+
+  return simulated
+
+def quality(simulated, x, lengths):
+  """
+    Measure how well the simulated runs follow the measured ones.
+  Args:
+    simulated (numpy.ndarray): the (R, N) simulated deviations.
+    x (numpy.ndarray): the (R, N) measured deviations.
+    lengths (numpy.ndarray): the (R,) lengths.
+
+  Returns:
+    (numpy.ndarray, numpy.ndarray): the RMS error in degrees and the fit in
+      percent, 100 for a perfect model and 0 for one no better than the
+      mean of the run.
+  """
+  mask = np.arange(x.shape[1])[None, :] < lengths[:, None]
+  mean = (x*mask).sum(axis=1)/lengths
+  error = np.sqrt((((simulated - x)*mask)**2).sum(axis=1))
+  spread = np.sqrt((((x - mean[:, None])*mask)**2).sum(axis=1))
+  return error/np.sqrt(lengths), 100.0*(1.0 - error/np.maximum(spread, 1e-9))
+
+def parameters(coefficients, delay, step):
+  """
+    Convert the coefficients to continuous time.
+  Args:
+    coefficients (numpy.ndarray): the (R, order + 1) coefficients.
+    delay (numpy.ndarray): the (R,) dead times in samples.
+    step (float): the sample time in seconds.
+
+  Returns:
+    dictionary: (R,) arrays "gain" (degrees at full duty), "tau" and
+      "tau2" (the time constants in seconds, tau2 0 for the first order),
+      "deadTime" and "valid", False where the model is not a stable
+      non-oscillating heater.
+  """
+  order = coefficients.shape[1] - 1
+  b = coefficients[:, -1]
+  with np.errstate(divide="ignore", invalid="ignore"):
+    if order == 1:
+      poles = coefficients[:, :1]
+    else:
+      a1 = coefficients[:, 0]
+      a2 = coefficients[:, 1]
+      root = np.sqrt(np.maximum(a1**2 + 4*a2, 0.0))
+      poles = np.stack(((a1 + root)/2, (a1 - root)/2), axis=1)
+      poles = np.where((a1**2 + 4*a2 >= 0.0)[:, None], poles, np.nan)
+
+    #A pole at 0 is a second time constant of 0, as in the first fit.
+    valid = ((poles >= 0.0) & (poles < 1.0)).all(axis=1) & (poles.max(axis=1) > 0.0)
+    taus = np.where(valid[:, None], np.where(poles > 0.0, -step/np.log(np.clip(poles, 1e-12, 1.0 - 1e-12)), 0.0), np.nan)
+    gain = b/(1.0 - coefficients[:, :order].sum(axis=1))
+
+  valid &= np.isfinite(gain) & (gain > 0.0)
+  return {
+    "gain": gain,
+    "tau": taus.max(axis=1),
+    "tau2": taus.min(axis=1) if order == 2 else np.zeros(len(b)),
+    "deadTime": step*np.asarray(delay, dtype=float),
+    "valid": valid
+  }
+
+def simc(model, tauc = None):
+  """
+    Tune a PID with the SIMC rules of Skogestad.
+  Args:
+    model (dictionary): the "gain", "tau", "tau2" and "deadTime" of a run.
+    tauc (float, optional): the closed loop time constant in seconds. The
+      dead time is used if it's None. Defaults to None.
+
+  Returns:
+    (float, float, float): the proportional gain (duty per degree), and the
+      integral and derivative times in seconds, in the parallel form.
+  """
+  theta = model["deadTime"]
+  if tauc is None:
+    tauc = max(theta, 1.0)
+
+  Kc = model["tau"]/(model["gain"]*(tauc + theta))
+  Ti = min(model["tau"], 4.0*(tauc + theta))
+  Td = model["tau2"]
+  #From the series form of the second order rule.
+  return Kc*(1.0 + Td/Ti), Ti + Td, Ti*Td/(Ti + Td)
+
+def snap(value, info):
+  value = min(max(value, info["min"]), info["max"])
+  return round(round((value - info["min"])/info["step"])*info["step"] + info["min"], 6)
+
+def gains(config, Ti, Td, theta):
+  """
+    Express integral and derivative times with the gains of the firmware.
+    Its u is divided by Kp, so Kp only sets the scale of Ki and Kd, and it
+    is kept.
+  Args:
+    config (dictionary): the pid.json.
+    Ti (float): the integral time in seconds.
+    Td (float): the derivative time in seconds.
+    theta (float): the dead time in seconds.
+
+  Returns:
+    (dictionary, list): the pid.json with Ki, Kd and ap replaced, and the
+      names of the values clipped to their menu limits. The actuation
+      period is half the dead time.
+  """
+  result = dict(config)
+  info = config["info"]
+  wanted = {"Ki": config["Kp"]/Ti, "Kd": config["Kp"]*Td, "ap": theta/2}
+  clipped = []
+  for key, value in wanted.items():
+    result[key] = snap(value, info[key])
+    if not info[key]["min"] <= value <= info[key]["max"]:
+      clipped.append(key)
+
+  return result, clipped
+
+def table(name, model, rms, score):
+  if not model["valid"]:
+    return f"{name:12s} no stable model"
+
+  tau2 = f"{model['tau2']:7.1f}" if model["tau2"] > 0 else f"{'-':>7s}"
+  return f"{name:12s} {model['gain']:7.1f} {model['tau']:7.1f} {tau2} {model['deadTime']:6.1f} {rms:6.2f} {score:6.1f}%"
+
+def main():
+  parser = argparse.ArgumentParser(description="Fit heater models to recorded runs and derive PID values.")
+  parser.add_argument("runs", nargs="+", help="CSV files of the runs")
+  parser.add_argument("--step", type=float, default=1.0, help="sample time of the fit in seconds")
+  parser.add_argument("--max-dead-time", type=float, default=60.0, help="largest dead time tried in seconds")
+  parser.add_argument("--iterations", type=int, default=3, help="refinements by instrumental variables")
+  parser.add_argument("--ambient", type=float, help="ambient temperature of runs without an ambient column")
+  parser.add_argument("--ms", action="store_true", help="t is in milliseconds")
+  parser.add_argument("--model", choices=("best",) + tuple(ORDERS), default="best", help="model used for the tuning")
+  parser.add_argument("--tauc", type=float, help="closed loop time constant in seconds, the dead time by default")
+  parser.add_argument("--config", default=os.path.join(plant.CONFIG, "pid.json"), help="pid.json with the current values")
+  parser.add_argument("--output", help="write the tuned pid.json to this file")
+  parser.add_argument("--plant", help="write the first order plant for tools/plant.py to this file")
+  args = parser.parse_args()
+
+  runs = [Run(filename, args.step, args.ambient, 0.001 if args.ms else 1.0) for filename in args.runs]
+  x, u, lengths = stack(runs)
+  maxDelay = int(round(args.max_dead_time/args.step))
+  initial = firstOrder(x, u, lengths, maxDelay)
+  pooled = {}
+  for kind, order in ORDERS.items():
+    result = fit(x, u, lengths, initial, order, maxDelay, args.iterations)
+    models = parameters(result["runs"], result["runDelay"], args.step)
+    rms, score = quality(response(result["runs"], result["runDelay"], x, u), x, lengths)
+
+    n = len(runs)
+    coefficients = np.repeat(result["pooled"][None], n, axis=0)
+    delay = np.full(n, result["pooledDelay"])
+    pooledModel = {key: value[0] for key, value in parameters(coefficients[:1], delay[:1], args.step).items()}
+    pooledRms, pooledScore = quality(response(coefficients, delay, x, u), x, lengths)
+    pooledModel["rms"] = float(np.sqrt((pooledRms**2*lengths).sum()/lengths.sum()))
+    pooledModel["score"] = float(pooledScore.mean())
+    pooled[kind] = pooledModel
+
+    terms = " + ".join(f"a{i + 1}*x[k{'-' + str(i) if i else ''}]" for i in range(order))
+    print(f"{kind} order: x[k+1] = {terms} + b*u[k-d]")
+    print(f"{'run':12s} {'gain':>7s} {'tau':>7s} {'tau2':>7s} {'dead':>6s} {'rms':>6s} {'fit':>7s}")
+    for i, run in enumerate(runs):
+      model = {key: value[i] for key, value in models.items()}
+      print(table(run.name, model, rms[i], score[i]))
+    print(table("pooled", pooledModel, pooledModel["rms"], pooledModel["score"]))
+    print()
+
+  kind = args.model
+  if kind == "best":
+    valid = [name for name in ORDERS if pooled[name]["valid"]]
+    kind = min(valid, key=lambda name: pooled[name]["rms"]) if valid else "first"
+
+  model = pooled[kind]
+  if not model["valid"]:
+    sys.exit(f"the pooled {kind} order model is not a stable heater; record runs with more heating")
+
+  ambient = float(np.mean(np.concatenate([run.ambient for run in runs])))
+  Kc, Ti, Td = simc(model, args.tauc)
+  config, clipped = gains(plant.loadJSON(args.config), Ti, Td, model["deadTime"])
+  print(f"{kind} order model: SIMC Kc={Kc:.4f}/C Ti={Ti:.1f}s Td={Td:.1f}s")
+  print(f"The firmware's proportional gain matches Kc for steps of {DUTY_SLOPE/Kc:.0f} C.")
+  print(f"Feed-forward: the duty holding SV is (SV - {ambient:.1f})/{model['gain']:.1f}.")
+  for key in clipped:
+    print(f"{key} is limited by its menu range in {args.config}.")
+
+  #Skogestad's half rule folds the second time constant into the first and the dead time.
+  station = {
+    "gain": round(float(model["gain"]), 1),
+    "tau": round(float(model["tau"] + model["tau2"]/2), 1),
+    "deadTime": round(float(model["deadTime"] + model["tau2"]/2), 1),
+    "ambient": round(ambient, 1)
+  }
+  if args.plant is not None:
+    with open(args.plant, "w") as file:
+      file.write(json.dumps(station, indent=2) + "\n")
+    print(f"Written {args.plant}")
+
+  text = json.dumps(config, indent=2)
+  if args.output is None:
+    print(text)
+  else:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+    print(f"Written {args.output}")
+
+if __name__ == "__main__":
+  main()
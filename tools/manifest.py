@@ -0,0 +1,8 @@
+# Freezes the FCR packages into a MicroPython firmware image. main.py and
+# config/ stay on the filesystem so they can still be edited on the device.
+#
+#   python tools/build.py firmware --micropython ~/micropython
+
+include("$(PORT_DIR)/boards/manifest.py")
+package("mode", base_path="../src")
+package("utils", base_path="../src")
@@ -0,0 +1,170 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Checks how a pid.json and a pattern behave on stations that differ from
+# the simulated plant. Every run draws the plant parameters of
+# tools/plant.py from distributions, the runs are simulated in batches on
+# --workers processes, and the distributions of overshoot, tracking error
+# and time to reach the last limit are reported with the failure rate.
+#
+#   python tools/montecarlo.py --pattern 1 --runs 5000
+#   python tools/montecarlo.py --SV 180 --distributions stations.json
+#
+# The distributions file maps each plant parameter to one of
+#   {"normal": [mean, sd]}, {"uniform": [low, high]},
+#   {"lognormal": [median, sigma]} or a fixed number;
+# missing parameters use DISTRIBUTIONS. The exit status is 1 if the failure
+# rate is above --max-failures, so the check can gate a deployment.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+import numpy as np
+
+import plant
+
+DISTRIBUTIONS = {
+  "gain": {"normal": [350.0, 35.0]},
+  "tau": {"lognormal": [300.0, 0.2]},
+  "deadTime": {"uniform": [4.0, 14.0]},
+  "ambient": {"uniform": [15.0, 35.0]},
+  "noise": {"uniform": [0.0, 0.5]},
+  "latency": {"uniform": [0.0, 0.5]}
+}
+
+PERCENTILES = (5, 50, 95)
+
+def draw(rng, distribution, n):
+  """
+    Draw the values of a plant parameter.
+  Args:
+    rng (numpy.random.Generator): the random generator.
+    distribution (dictionary or float): the distribution, or a fixed value.
+    n (int): the number of values.
+
+  Returns:
+    numpy.ndarray: the values.
+  """
+  if not isinstance(distribution, dict):
+    return np.full(n, float(distribution))
+
+  (kind, (a, b)), = distribution.items()
+  if kind == "normal":
+    values = rng.normal(a, b, n)
+  elif kind == "uniform":
+    values = rng.uniform(a, b, n)
+  elif kind == "lognormal":
+    values = a*rng.lognormal(0.0, b, n)
+  else:
+    raise ValueError(f"unknown distribution {kind}")
+
+  return np.maximum(values, 0.0)
+
+def evaluate(task):
+  """
+    Simulate a batch of stations. It runs in a worker process.
+  Args:
+    task (tuple): the gains, the pattern (or the setpoint and duration of a
+      Preheater run), the plant parameters and the seed.
+
+  Returns:
+    dictionary: the metrics of plant.simulate().
+  """
+  gains, pattern, setpoint, parameters, seed = task
+  n = len(parameters["gain"])
+  if pattern is None:
+    profile = plant.Setpoint(np.full(n, setpoint[0]), np.full(n, setpoint[1]))
+  else:
+    profile = plant.Profile(np.repeat(pattern[None], n, axis=0), parameters["ambient"])
+
+  return plant.simulate(gains, profile, parameters, *plant.rateGains(), seed=seed)
+
+def summary(name, values, unit = ""):
+  finite = values[np.isfinite(values)]
+  if len(finite) == 0:
+    return f"{name:10s} never"
+
+  text = " ".join(f"p{p}={np.percentile(finite, p):.1f}{unit}" for p in PERCENTILES)
+  return f"{name:10s} {text} max={finite.max():.1f}{unit}"
+
+def main():
+  parser = argparse.ArgumentParser(description="Monte Carlo check of PID settings over varied plants.")
+  parser.add_argument("--config", default=os.path.join(plant.CONFIG, "pid.json"), help="pid.json with the gains")
+  parser.add_argument("--patterns", default=os.path.join(plant.CONFIG, "patterns.json"), help="patterns.json")
+  parser.add_argument("--pattern", type=int, default=1, help="pattern number")
+  parser.add_argument("--SV", type=float, help="simulate a Preheater run at this setpoint instead of a pattern")
+  parser.add_argument("--duration", type=float, default=300.0, help="duration of the Preheater run in seconds")
+  parser.add_argument("--distributions", help="JSON file of the plant distributions")
+  parser.add_argument("--runs", type=int, default=2000)
+  parser.add_argument("--batch", type=int, default=250, help="runs simulated together")
+  parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--max-overshoot", type=float, default=5.0, help="a run above the last limit by more fails")
+  parser.add_argument("--max-rms", type=float, default=10.0, help="a run with a larger tracking error fails")
+  parser.add_argument("--max-failures", type=float, default=0.01, help="the largest failure rate accepted")
+  parser.add_argument("--output", help="write the parameters and metrics of every run to this JSON file")
+  args = parser.parse_args()
+
+  config = plant.loadJSON(args.config)
+  gains = {key: float(config[key]) for key in ("Kp", "Ki", "Kd", "ap")}
+  gains["eventDriven"] = config.get("eventDriven", False)
+  distributions = dict(DISTRIBUTIONS)
+  if args.distributions is not None:
+    distributions.update(plant.loadJSON(args.distributions))
+
+  pattern = None
+  setpoint = None
+  if args.SV is None:
+    pattern = plant.patternArray(plant.loadJSON(args.patterns)[f"PTN{args.pattern}"])
+  else:
+    setpoint = (args.SV, args.duration)
+
+  rng = np.random.default_rng(args.seed)
+  parameters = {key: draw(rng, distributions[key], args.runs) for key in plant.PLANT}
+  tasks = []
+  for i, first in enumerate(range(0, args.runs, args.batch)):
+    batch = {key: values[first:first + args.batch] for key, values in parameters.items()}
+    tasks.append((gains, pattern, setpoint, batch, args.seed + i))
+
+  with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+    results = list(executor.map(evaluate, tasks))
+
+  metrics = {key: np.concatenate([result[key] for result in results]) for key in ("rms", "overshoot", "reach")}
+  failed = (metrics["overshoot"] > args.max_overshoot) | (metrics["rms"] > args.max_rms) | np.isinf(metrics["reach"])
+  rate = failed.mean()
+
+  print(f"{args.runs} runs of Kp={gains['Kp']} Ki={gains['Ki']} Kd={gains['Kd']} ap={gains['ap']}")
+  print(summary("overshoot", metrics["overshoot"], "C"))
+  print(summary("rms", metrics["rms"], "C"))
+  print(summary("reach", metrics["reach"], "s"))
+  print(f"{'unreached':10s} {np.isinf(metrics['reach']).mean():.1%}")
+  print(f"{'failures':10s} {rate:.1%} (accepted {args.max_failures:.1%})")
+
+  if args.output is not None:
+    runs = {key: values.tolist() for key, values in parameters.items()}
+    for key, values in metrics.items():
+      runs[key] = [value if np.isfinite(value) else None for value in values.tolist()]
+    runs["failed"] = failed.tolist()
+    with open(args.output, "w") as file:
+      json.dump(runs, file)
+
+  sys.exit(1 if rate > args.max_failures else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,239 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Searches PID gains or pattern values on the simulated plant of
+# tools/plant.py. Each round simulates --candidates sets in batches of
+# --batch on --workers processes; the first round samples the whole range
+# of the menu, the next ones sample around the best tenth of the previous
+# round (cross-entropy search). The current values are always a candidate.
+#
+#   python tools/optimize.py pid --pattern 1 --output pid.json
+#   python tools/optimize.py pid --SV 180 --duration 300
+#   python tools/optimize.py pattern --pattern 1 --vary r,d --output patterns.json
+#
+# Scores are tracking error (RMS of PV - SV), overshoot and the time to
+# reach the final limit; see plant.score(). Use --plant with the JSON of a
+# measured plant, otherwise plant.PLANT is used.
+
+import argparse
+import concurrent.futures
+import json
+import os
+
+import numpy as np
+
+import plant
+
+ELITE = 0.1
+MIN_SPREAD = 0.02
+
+def evaluate(task):
+  """
+    Score a batch of candidates. It runs in a worker process.
+  Args:
+    task (tuple): the gains, the patterns (or the setpoint and duration of
+      a Preheater run), the plant and the seed.
+
+  Returns:
+    numpy.ndarray: the scores.
+  """
+  gains, patterns, setpoint, parameters, seed = task
+  n = len(gains["Kp"])
+  if patterns is None:
+    profile = plant.Setpoint(np.full(n, setpoint[0]), np.full(n, setpoint[1]))
+  else:
+    profile = plant.Profile(patterns, np.full(n, parameters["ambient"]))
+
+  metrics = plant.simulate(gains, profile, parameters, *plant.rateGains(), seed=seed)
+  return plant.score(metrics)
+
+class Space:
+  """
+    Implements the searched values: each one is sampled in [0, 1] and
+    mapped to its menu limits, rounded to its step.
+  """
+  def __init__(self, keys, info, current):
+    """
+      Initialize a Space object.
+    Args:
+      keys (list): the names of the values.
+      info (dictionary): the "min", "max" and "step" of each name.
+      current (dictionary): the current values.
+    """
+    self.keys = keys
+    self.low = np.array([info[key]["min"] for key in keys], dtype=float)
+    self.high = np.array([info[key]["max"] for key in keys], dtype=float)
+    self.step = np.array([info[key]["step"] for key in keys], dtype=float)
+    self.current = self.normalize(np.array([current[key] for key in keys], dtype=float))
+
+  def normalize(self, values):
+    return (values - self.low)/(self.high - self.low)
+
+  def values(self, points):
+    values = self.low + np.clip(points, 0.0, 1.0)*(self.high - self.low)
+    values = np.round((values - self.low)/self.step)*self.step + self.low
+    return np.round(np.clip(values, self.low, self.high), 6)
+
+def search(space, build, args):
+  """
+    Run the rounds of the search.
+  Args:
+    space (Space): the searched values.
+    build (function): makes the tasks of evaluate() from the (N, K) values.
+    args (Namespace): the options.
+
+  Returns:
+    (numpy.ndarray, float): the best values and their score.
+  """
+  rng = np.random.default_rng(args.seed)
+  best = None
+  bestScore = np.inf
+  mean = None
+  spread = None
+  with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+    for round in range(args.rounds):
+      if mean is None:
+        points = rng.random((args.candidates, len(space.keys)))
+      else:
+        points = mean + spread*rng.standard_normal((args.candidates, len(space.keys)))
+      points[0] = space.current if best is None else space.normalize(best)
+
+      values = space.values(points)
+      batches = [values[i:i + args.batch] for i in range(0, len(values), args.batch)]
+      scores = np.concatenate(list(executor.map(evaluate, build(batches))))
+
+      order = np.argsort(scores)
+      if best is None or scores[order[0]] < bestScore:
+        bestScore = scores[order[0]]
+        best = values[order[0]]
+
+      elite = space.normalize(values[order[:max(2, int(ELITE*len(values)))]])
+      mean = elite.mean(axis=0)
+      spread = np.maximum(elite.std(axis=0), MIN_SPREAD)
+      print(f"round {round + 1}: best {bestScore:.3f} {dict(zip(space.keys, best.tolist()))}")
+
+  return best, bestScore
+
+def optimizePID(args, parameters):
+  config = plant.loadJSON(args.config)
+  keys = ["Kp", "Ki", "Kd", "ap"]
+  space = Space(keys, config["info"], config)
+
+  patterns = None
+  setpoint = None
+  if args.SV is None:
+    patterns = plant.patternArray(plant.loadJSON(args.patterns)[f"PTN{args.pattern}"])
+  else:
+    setpoint = (args.SV, args.duration)
+
+  def build(batches):
+    tasks = []
+    for i, values in enumerate(batches):
+      gains = {key: values[:, j] for j, key in enumerate(keys)}
+      gains["eventDriven"] = config.get("eventDriven", False)
+      batchPatterns = None if patterns is None else np.repeat(patterns[None], len(values), axis=0)
+      tasks.append((gains, batchPatterns, setpoint, parameters, args.seed + i))
+    return tasks
+
+  best, bestScore = search(space, build, args)
+  for key, value in zip(keys, best.tolist()):
+    config[key] = round(value, 3)
+
+  return config
+
+def optimizePattern(args, parameters):
+  patterns = plant.loadJSON(args.patterns)
+  name = f"PTN{args.pattern}"
+  pattern = patterns[name]
+  gains = plant.loadJSON(args.config)
+  info = plant.loadJSON(args.mode)["info"]
+
+  keys = []
+  limits = {}
+  for i in range(1, plant.NUMBER_OF_LEVELS + 1):
+    if pattern[f"r{i}"] == 0.0:
+      break
+
+    for kind in args.vary.split(","):
+      key = f"{kind}{i}"
+      keys.append(key)
+      limits[key] = dict(info[kind])
+      if kind == "r":
+        #A rate of 0 ends the pattern, so the search keeps rising ramps.
+        limits[key]["min"] = limits[key]["step"]
+
+  space = Space(keys, limits, pattern)
+  base = plant.patternArray(pattern)
+  column = {"r": 0, "L": 1, "d": 2}
+
+  def build(batches):
+    tasks = []
+    for i, values in enumerate(batches):
+      batchPatterns = np.repeat(base[None], len(values), axis=0)
+      for j, key in enumerate(keys):
+        batchPatterns[:, int(key[1:]) - 1, column[key[0]]] = values[:, j]
+      batchGains = {key: np.full(len(values), float(gains[key])) for key in ("Kp", "Ki", "Kd", "ap")}
+      batchGains["eventDriven"] = gains.get("eventDriven", False)
+      tasks.append((batchGains, batchPatterns, None, parameters, args.seed + i))
+    return tasks
+
+  best, bestScore = search(space, build, args)
+  for key, value in zip(keys, best.tolist()):
+    if key[0] == "r":
+      pattern[key] = round(value, 2)
+    elif key[0] == "L":
+      pattern[key] = round(value, 1)
+    else:
+      pattern[key] = int(value)
+
+  patterns[name] = pattern
+  return patterns
+
+def main():
+  parser = argparse.ArgumentParser(description="Optimize PID gains or a pattern on the simulated plant.")
+  parser.add_argument("target", choices=("pid", "pattern"))
+  parser.add_argument("--plant", help="JSON file of the plant parameters")
+  parser.add_argument("--config", default=os.path.join(plant.CONFIG, "pid.json"), help="pid.json with the current gains")
+  parser.add_argument("--mode", default=os.path.join(plant.CONFIG, "reballing.json"), help="reballing.json with the pattern limits")
+  parser.add_argument("--patterns", default=os.path.join(plant.CONFIG, "patterns.json"), help="patterns.json")
+  parser.add_argument("--pattern", type=int, default=1, help="pattern number")
+  parser.add_argument("--SV", type=float, help="simulate a Preheater run at this setpoint instead of a pattern")
+  parser.add_argument("--duration", type=float, default=300.0, help="duration of the Preheater run in seconds")
+  parser.add_argument("--vary", default="r,d", help="pattern values searched: any of r, L and d")
+  parser.add_argument("--candidates", type=int, default=2000, help="candidates per round")
+  parser.add_argument("--rounds", type=int, default=3)
+  parser.add_argument("--batch", type=int, default=250, help="candidates simulated together")
+  parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--output", help="write the result to this file")
+  args = parser.parse_args()
+
+  parameters = plant.loadPlant(args.plant)
+  if args.target == "pid":
+    result = optimizePID(args, parameters)
+  else:
+    result = optimizePattern(args, parameters)
+
+  text = json.dumps(result, indent=2)
+  if args.output is None:
+    print(text)
+  else:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+    print(f"Written {args.output}")
+
+if __name__ == "__main__":
+  main()
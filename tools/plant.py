@@ -0,0 +1,317 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Batched simulation of the heater, the probe and the control of the
+# Preheater and Reballing modes with NumPy. Every array holds one value per
+# candidate, so a single pass of the loop below advances thousands of runs,
+# each with its own PID gains, pattern and plant.
+#
+# The plant is first order plus dead time: the board approaches
+# ambient + gain*duty with the time constant tau, and the heater acts
+# deadTime + latency seconds after the relay. The probe converts every
+# 0.22 s, rounds to 0.25 C and tracks value and rate with the alpha-beta
+# gains of the last rate filter in config/probes.json. The control follows
+# the firmware: PID, the actuation factor 1 - 0.05**(u/(Kp*(L - start))),
+# the first window fully on, the event driven updates and the Levels
+# profile.
+
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+CONFIG = os.path.join(SRC, "config")
+
+if SRC not in sys.path:
+  sys.path.insert(0, SRC)
+
+from utils.filters import Pipeline
+
+CONVERSION = 0.22
+STEP = CONVERSION/2
+QUANTUM = 0.25
+TOLERANCE = 2.0
+NUMBER_OF_LEVELS = 5
+
+# A bottom heater of a small IR station; replace it with a measured plant.
+PLANT = {
+  "gain": 350.0,
+  "tau": 300.0,
+  "deadTime": 8.0,
+  "ambient": 25.0,
+  "noise": 0.0,
+  "latency": 0.0
+}
+
+def loadJSON(filename):
+  with open(filename) as file:
+    return json.load(file)
+
+def loadPlant(filename = None):
+  """
+    Read a plant description, missing keys taking the values of PLANT.
+  Args:
+    filename (str, optional): the JSON file. PLANT is used if it's None.
+      Defaults to None.
+
+  Returns:
+    dictionary: the plant.
+  """
+  plant = dict(PLANT)
+  if filename is not None:
+    plant.update(loadJSON(filename))
+
+  return plant
+
+def rateGains(probe = "bottom", filename = os.path.join(CONFIG, "probes.json")):
+  """
+    Get the gains of the filter giving the rate of a probe.
+  Args:
+    probe (str, optional): the probe name. Defaults to "bottom".
+    filename (str, optional): the probes file. Defaults to config/probes.json.
+
+  Returns:
+    (float, float): the alpha and beta gains, (1.0, 1.0) if the probe has
+      no rate filter.
+  """
+  pipeline = Pipeline.fromConfig(loadJSON(filename)[probe])
+  for f in pipeline._filters:
+    if f.hasRate():
+      return f._alpha, f._beta
+
+  return 1.0, 1.0
+
+def patternArray(pattern):
+  """
+    Convert a pattern dictionary to an array.
+  Args:
+    pattern (dictionary): the keys r1, L1, d1, ..., r5, L5, d5.
+
+  Returns:
+    numpy.ndarray: the (5, 3) array of r, L and d of each level.
+  """
+  levels = np.zeros((NUMBER_OF_LEVELS, 3))
+  for i in range(NUMBER_OF_LEVELS):
+    levels[i] = (pattern[f"r{i + 1}"], pattern[f"L{i + 1}"], pattern[f"d{i + 1}"])
+
+  return levels
+
+class Profile:
+  """
+    Implements Levels for a batch of patterns: the setpoint of every
+    candidate at a time t.
+  """
+  def __init__(self, patterns, start):
+    """
+      Initialize a Profile object.
+    Args:
+      patterns (numpy.ndarray): the (N, 5, 3) array of r, L and d. A level
+        with r = 0 ends the pattern, like in Reballing.run().
+      start (numpy.ndarray): the (N,) first setpoints.
+    """
+    r = patterns[:, :, 0]
+    L = patterns[:, :, 1]
+    d = patterns[:, :, 2]
+    used = np.cumprod(r != 0.0, axis=1).astype(bool)
+    self.count = used.sum(axis=1)
+    if (self.count == 0).any():
+      raise ValueError("every pattern needs a level")
+
+    safe = np.where(used, r, 1.0)
+    first = np.concatenate((start[:, None], L[:, :-1]), axis=1)
+    self.start = first
+    self.rampEnd = np.cumsum(np.where(used, (L - first)/safe + d, 0.0), axis=1) - np.where(used, d, 0.0)
+    self.end = self.rampEnd + np.where(used, d, 0.0)
+    #A ramp going away from its limit never ends.
+    self.valid = (~used | ((L - first)/safe >= 0.0)).all(axis=1)
+    self.previous = np.concatenate((np.zeros((len(r), 1)), self.end[:, :-1]), axis=1)
+    self.r = r
+    self.L = L
+    self._rows = np.arange(len(r))
+    last = self.count - 1
+    self.duration = np.where(self.valid, self.end[self._rows, last], STEP)
+    self.limit = self.L[self._rows, last]
+
+  def value(self, t = 0.0):
+    """
+      Get the setpoint of every candidate.
+    Args:
+      t (float, optional): the time since the start. Defaults to 0.0.
+
+    Returns:
+      (numpy.ndarray, numpy.ndarray, numpy.ndarray): the setpoints, and the
+        start and limit of the current levels.
+    """
+    level = np.minimum((self.end < t).sum(axis=1), self.count - 1)
+    rows = self._rows
+    L = self.L[rows, level]
+    start = self.start[rows, level]
+    ramp = start + self.r[rows, level]*(t - self.previous[rows, level])
+    SV = np.where(t <= self.rampEnd[rows, level], ramp, L)
+    return SV, start, L
+
+class Setpoint:
+  """
+    Implements the fixed setpoint of the Preheater with the interface of
+    Profile.
+  """
+  def __init__(self, SV, duration):
+    """
+      Initialize a Setpoint object.
+    Args:
+      SV (numpy.ndarray): the (N,) setpoints.
+      duration (numpy.ndarray): the (N,) run times in seconds.
+    """
+    self.SV = SV
+    self.limit = SV
+    self.duration = duration
+    self.valid = np.ones(len(SV), dtype=bool)
+    self.first = None
+
+  def value(self, t = 0.0):
+    return self.SV, self.first, self.SV
+
+def simulate(gains, profile, plant, alpha = 1.0, beta = 1.0, seed = 0):
+  """
+    Simulate a batch of runs.
+  Args:
+    gains (dictionary): "Kp", "Ki", "Kd" and "ap", each a number or an
+      (N,) array, and optionally "eventDriven" as in pid.json.
+    profile (Profile or Setpoint): the setpoints.
+    plant (dictionary): the plant parameters, each a number or an (N,)
+      array. See PLANT.
+    alpha (float, optional): the value gain of the probe. Defaults to 1.0.
+    beta (float, optional): the rate gain of the probe. Defaults to 1.0.
+    seed (int, optional): the seed of the sensor noise. Defaults to 0.
+
+  Returns:
+    dictionary: (N,) arrays "rms", the root mean square of PV - SV,
+      "overshoot", the largest temperature above the final limit, "reach",
+      the time the final limit was first reached (inf if never),
+      "duration", the run time, and "valid", False for patterns that cannot
+      run.
+  """
+  n = len(profile.duration)
+  Kp = np.broadcast_to(np.asarray(gains["Kp"], dtype=float), (n,))
+  Ki = np.broadcast_to(np.asarray(gains["Ki"], dtype=float), (n,))
+  Kd = np.broadcast_to(np.asarray(gains["Kd"], dtype=float), (n,))
+  ap = np.broadcast_to(np.asarray(gains["ap"], dtype=float), (n,))
+  eventDriven = gains.get("eventDriven", False)
+  parameters = {key: np.broadcast_to(np.asarray(plant[key], dtype=float), (n,)) for key in PLANT}
+  rng = np.random.default_rng(seed)
+  rows = np.arange(n)
+
+  ambient = parameters["ambient"]
+  T = ambient.copy()
+  PV = np.round(T/QUANTUM)*QUANTUM
+  rate = np.zeros(n)
+  if isinstance(profile, Setpoint):
+    profile.first = PV.copy()
+
+  delay = np.round((parameters["deadTime"] + parameters["latency"])/STEP).astype(int)
+  history = np.zeros((int(delay.max()) + 1, n), dtype=bool)
+
+  lastui = np.zeros(n)
+  lastSV = PV.copy()
+  lastFactor = np.ones(n)
+  nextTick = ap.copy()
+  windowStart = np.zeros(n)
+  windowEnd = ap.copy()
+  running = np.ones(n, dtype=bool)
+  squares = np.zeros(n)
+  peak = T.copy()
+  reach = np.full(n, np.inf)
+  duration = profile.duration
+  steps = int(np.ceil(duration.max()/STEP)) + 1
+
+  with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+    for k in range(steps):
+      t = k*STEP
+      if k%2 == 0:
+        reading = T + parameters["noise"]*rng.standard_normal(n)
+        reading = np.round(reading/QUANTUM)*QUANTUM
+        predicted = PV + rate*CONVERSION
+        residual = reading - predicted
+        PV = predicted + alpha*residual
+        rate = rate + beta*residual/CONVERSION
+
+      SV, start, L = profile.value(t)
+      tick = running & (t >= nextTick - 1e-9)
+      if eventDriven:
+        #The tick opens a window with the latest output, and every
+        #conversion resizes the window while it's on.
+        windowEnd = np.where(tick, nextTick + lastFactor*ap, windowEnd)
+        windowStart = np.where(tick, nextTick, windowStart)
+        update = running & (k%2 == 0)
+        dt = CONVERSION
+      else:
+        update = tick
+        dt = ap
+
+      if update.any():
+        error = SV - PV
+        ui = lastui + Ki*error*dt
+        u = Kp*error + ui + Kd*((SV - lastSV)/dt - rate)
+        factor = 1.0 - 0.05**(u/(Kp*(L - start)))
+        factor = np.nan_to_num(np.clip(factor, 0.0, 1.0))
+        lastui = np.where(update, ui, lastui)
+        lastSV = np.where(update, SV, lastSV)
+        lastFactor = np.where(update, factor, lastFactor)
+        if eventDriven:
+          windowEnd = np.where(update & (t < windowEnd), windowStart + factor*ap, windowEnd)
+        else:
+          windowEnd = np.where(tick, nextTick + factor*ap, windowEnd)
+
+      nextTick = np.where(tick, nextTick + ap, nextTick)
+
+      relay = running & (t < windowEnd)
+      history[k%len(history)] = relay
+      heat = history[(k - delay)%len(history), rows]
+      T = T + STEP*(parameters["gain"]*heat - (T - ambient))/parameters["tau"]
+
+      squares += np.where(running, (PV - SV)**2, 0.0)
+      peak = np.maximum(peak, T)
+      reach = np.where(np.isinf(reach) & (T >= profile.limit - TOLERANCE), t, reach)
+      running &= t <= duration
+
+  return {
+    "rms": np.sqrt(squares*STEP/duration),
+    "overshoot": np.maximum(peak - profile.limit, 0.0),
+    "reach": reach,
+    "duration": duration,
+    "valid": profile.valid
+  }
+
+def score(metrics, overshoot = 4.0, time = 1.0):
+  """
+    Combine the metrics of simulate() into one figure, lower is better.
+  Args:
+    metrics (dictionary): the metrics.
+    overshoot (float, optional): the weight of each degree of overshoot.
+      Defaults to 4.0.
+    time (float, optional): the weight of each minute to reach the final
+      limit. Defaults to 1.0.
+
+  Returns:
+    numpy.ndarray: the scores. A run that never reaches its limit counts
+      twice its duration; an invalid pattern scores inf.
+  """
+  reach = np.where(np.isinf(metrics["reach"]), 2.0*metrics["duration"], metrics["reach"])
+  scores = metrics["rms"] + overshoot*metrics["overshoot"] + time*reach/60.0
+  return np.where(metrics["valid"], scores, np.inf)
@@ -0,0 +1,375 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Regression suite of the control. Every mode of hardware.json runs in a
+# replay.Harness against each scenario below, with the probes reading a
+# simulated heater driven by the relays. The relay changes, the run time
+# and the menu values after the run (the gains found by Tuning) are
+# compared with the golden traces in tools/golden/, and the time and the
+# heap allocations of each pass of the control loop with their budgets.
+#
+#   python tools/regression.py                 run every case
+#   python tools/regression.py reballing-cold  run some cases
+#   python tools/regression.py --update        write the golden traces
+#
+# The exit status is 1 if any case fails. The time budgets depend on the
+# computer; --no-timing skips them. Only update the golden traces after
+# checking that a change of behavior is wanted.
+
+import argparse
+import concurrent.futures
+import gc
+import json
+import os
+import sys
+import time
+
+import replay
+from utils import clock
+
+GOLDEN = os.path.join(replay.TOOLS, "golden")
+
+# Transitions may move by TIME_TOLERANCE ms and the run time by
+# DURATION_TOLERANCE ms; values may differ by VALUE_TOLERANCE (relative).
+TIME_TOLERANCE = 50
+DURATION_TOLERANCE = 250
+VALUE_TOLERANCE = 1e-6
+
+# Headroom of the budgets written by --update over the measured costs.
+TIME_HEADROOM = 3.0
+BYTES_HEADROOM = 1.5
+
+# The heaters: the board approaches ambient + gain*duty with the time
+# constant tau (seconds), deadTime seconds after the relay.
+ZONES = {
+  "bottom": {"gain": 350.0, "tau": 300.0, "deadTime": 8.0},
+  "top": {"gain": 300.0, "tau": 200.0, "deadTime": 5.0}
+}
+AMBIENT = 25.0
+# The fan of a mode (hardware.json "fan") makes the board cool FAN_FACTOR
+# times faster while it runs.
+FAN_FACTOR = 3.0
+
+SCENARIOS = {
+  # From room temperature.
+  "cold": {},
+  # From a board still hot from the previous job.
+  "warm": {"initial": 120.0},
+  # The thermocouple reports an open input for 0.5 s, fewer readings than
+  # Probe.MAX_ERRORS, so the mode rides through on the last value.
+  "dropout": {"dropout": (60000, 60500)},
+  # The thermocouple is open from 60 s on: the probe faults and the mode stops.
+  "fault": {"dropout": (60000, 10000000)},
+  # The control loop stops for 3 s, with the relays as they were.
+  "stall": {"stall": (100000, 3000)},
+  # The PID updated on every conversion (pid.json "eventDriven").
+  "events": {"pid": {"eventDriven": True}},
+  # The pattern ends with a cool-down to 60 C at 0.5 C/s, with the optional
+  # fan on GP13.
+  "cooldown": {
+    "settings": {"c": 0.5, "e": 60.0},
+    "hardware": {"zones": {"fan": {"relay": 13}}, "modes": {"Reballing": {"fan": "fan"}}},
+    "modes": ("Reballing",)
+  },
+  # The pattern waits for the board (reballing.json "adaptive").
+  "adaptive": {"reballing": {"adaptive": True}, "modes": ("Reballing",)}
+}
+
+class HeaterSensor:
+  """
+    Implements the interface of MAX6675 over a simulated heater. The
+    temperature follows the relay of the zone through a first order lag
+    with dead time, and a conversion is ready every 220 ms.
+  """
+  PERIOD = 220
+
+  def __init__(self, zone, initial = AMBIENT, dropout = None, fan = None):
+    """
+      Initialize a HeaterSensor object.
+    Args:
+      zone (Zone): the zone, whose relay drives the heater.
+      initial (float, optional): the first temperature. Defaults to AMBIENT.
+      dropout (tuple, optional): the start and end, in milliseconds from
+        now, of the readings with the error bit set.
+        Defaults to None.
+      fan (Zone, optional): the zone of the fan. Defaults to None.
+    """
+    self._zone = zone
+    self._fan = fan
+    self._plant = ZONES[zone.name]
+    self._temperature = initial
+    self._dropout = dropout
+    self._heat = []
+    self._start = clock.ticks_ms()
+    self._last = self._start
+    self._value = 0.0
+    self._error = 0
+    self._sequence = 0
+    self._timestamp = self._last
+
+  def advance(self, ms = 0):
+    """
+      Integrate the heater over ms milliseconds.
+    Args:
+      ms (int, optional): the time step. Defaults to 0.
+    """
+    self._heat.append(self._zone.relay.value())
+    delay = round(1000*self._plant["deadTime"]/ms)
+    heat = self._heat.pop(0) if len(self._heat) > delay else 0
+    target = AMBIENT + self._plant["gain"]*heat
+    tau = self._plant["tau"]
+    if self._fan is not None and self._fan.relay.value() and target < self._temperature:
+      tau /= FAN_FACTOR
+    self._temperature += (ms/1000.0)*(target - self._temperature)/tau
+
+  def refresh(self):
+    pass
+
+  def ready(self):
+    return clock.ticks_diff(clock.ticks_ms(), self._last) > HeaterSensor.PERIOD
+
+  def read(self):
+    if self.ready():
+      now = clock.ticks_ms()
+      self._last = now
+      self._timestamp = now
+      self._sequence += 1
+      elapsed = clock.ticks_diff(now, self._start)
+      if self._dropout is not None and self._dropout[0] <= elapsed < self._dropout[1]:
+        self._value = 0.0
+        self._error = 1
+      else:
+        self._value = round(4*self._temperature)/4
+        self._error = 0
+
+    return self._value
+
+  def error(self):
+    return self._error
+
+  def sequence(self):
+    return self._sequence
+
+  def timestamp(self):
+    return self._timestamp
+
+def caseName(mode, scenario):
+  return f"{mode.lower().replace(' ', '-')}-{scenario}"
+
+def cases():
+  """
+    Get every case.
+  Returns:
+    dictionary: the (mode, scenario) of each case name.
+  """
+  with open(os.path.join(replay.TOOLS, "..", "src", "config", "hardware.json")) as file:
+    modes = [item["name"] for item in json.load(file)["modes"]]
+
+  return {caseName(mode, scenario): (mode, scenario) for mode in modes for scenario, options in SCENARIOS.items() if mode in options.get("modes", modes)}
+
+def percentile(values, p):
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(p*len(ordered)))]
+
+def run(case):
+  """
+    Run a case in a fresh interpreter.
+  Args:
+    case (tuple): the mode and the scenario.
+
+  Returns:
+    dictionary: the result of Harness.finish() with the "cost" of the
+      passes: the mean and the 99th percentile of their time in
+      microseconds, and the mean and maximum bytes they allocated.
+  """
+  mode, scenario = case
+  options = SCENARIOS[scenario]
+  harness = replay.Harness(mode, hardware=options.get("hardware"))
+  if "pid" in options:
+    from utils.config import ConfigStore
+    ConfigStore.shared("/config/pid.json").data().update(options["pid"])
+  if "reballing" in options:
+    from utils.config import ConfigStore
+    ConfigStore.shared("/config/reballing.json").data().update(options["reballing"])
+
+  fan = None
+  for info in harness.hardware.modes():
+    if info["name"] == mode and "fan" in info:
+      fan = harness.hardware.zone(info["fan"])
+
+  sensors = []
+  for zone in harness.hardware.zones():
+    if zone.probe is not None and zone.relay is not None:
+      sensor = HeaterSensor(zone, options.get("initial", AMBIENT), options.get("dropout"), fan)
+      harness.setSensor(zone.name, sensor)
+      sensors.append(sensor)
+
+  harness.begin(options.get("settings"))
+  stall = options.get("stall")
+  times = []
+  allocations = []
+  while True:
+    allocated = gc.mem_alloc()
+    started = time.perf_counter_ns()
+    running = harness.step()
+    times.append((time.perf_counter_ns() - started)/1000.0)
+    allocations.append(gc.mem_alloc() - allocated)
+    if not running:
+      break
+
+    passes = 1
+    if stall is not None and harness.elapsed() == stall[0]:
+      passes += stall[1]//harness.period
+
+    for i in range(passes):
+      for sensor in sensors:
+        sensor.advance(harness.period)
+      harness.advance()
+
+  result = harness.finish()
+  del result["updates"]
+  result["cost"] = {
+    "stepUs": sum(times)/len(times),
+    "p99Us": percentile(times, 0.99),
+    "stepBytes": sum(allocations)/len(allocations),
+    "maxBytes": max(allocations)
+  }
+  return result
+
+def compare(result, golden, timing = True):
+  """
+    Compare a result with its golden trace.
+  Args:
+    result (dictionary): the result of run().
+    golden (dictionary): the golden trace.
+    timing (bool, optional): check the time budgets. Defaults to True.
+
+  Returns:
+    list: the failures, empty if the case passed.
+  """
+  failures = []
+  if abs(result["duration"] - golden["duration"]) > DURATION_TOLERANCE:
+    failures.append(f"duration {golden['duration']} -> {result['duration']} ms")
+
+  relays = result["relays"]
+  expected = golden["relays"]
+  if len(relays) != len(expected):
+    failures.append(f"{len(expected)} relay changes -> {len(relays)}")
+
+  for new, old in zip(relays, expected):
+    if new[1:] != old[1:] or abs(new[0] - old[0]) > TIME_TOLERANCE:
+      failures.append(f"relay change {old} -> {new}")
+      break
+
+  for key, value in golden["values"].items():
+    if abs(result["values"].get(key, 0) - value) > VALUE_TOLERANCE*max(1.0, abs(value)):
+      failures.append(f"{key} {value} -> {result['values'].get(key)}")
+
+  cost = result["cost"]
+  budget = golden["budget"]
+  if cost["stepBytes"] > budget["stepBytes"]:
+    failures.append(f"allocates {cost['stepBytes']:.0f} bytes per pass, budget {budget['stepBytes']}")
+
+  if timing:
+    if cost["stepUs"] > budget["stepUs"]:
+      failures.append(f"takes {cost['stepUs']:.0f} us per pass, budget {budget['stepUs']}")
+    if cost["p99Us"] > budget["p99Us"]:
+      failures.append(f"takes {cost['p99Us']:.0f} us at p99, budget {budget['p99Us']}")
+
+  return failures
+
+def golden(result, previous = None):
+  """
+    Make the golden trace of a result. The budgets of previous are kept.
+  Args:
+    result (dictionary): the result of run().
+    previous (dictionary, optional): the golden trace replaced.
+      Defaults to None.
+
+  Returns:
+    dictionary: the golden trace.
+  """
+  cost = result["cost"]
+  if previous is None:
+    budget = {
+      "stepUs": round(TIME_HEADROOM*cost["stepUs"]),
+      "p99Us": round(TIME_HEADROOM*cost["p99Us"]),
+      "stepBytes": round(BYTES_HEADROOM*cost["stepBytes"])
+    }
+  else:
+    budget = previous["budget"]
+
+  return {
+    "mode": result["mode"],
+    "duration": result["duration"],
+    "values": result["values"],
+    "budget": budget,
+    "relays": result["relays"]
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description="Compare the control with its golden traces.")
+  parser.add_argument("cases", nargs="*", help="case names, every case by default")
+  parser.add_argument("--update", action="store_true", help="write the golden traces")
+  parser.add_argument("--budgets", action="store_true", help="with --update, also measure new budgets")
+  parser.add_argument("--no-timing", action="store_true", help="skip the time budgets")
+  parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+  args = parser.parse_args()
+
+  available = cases()
+  names = args.cases or list(available)
+  for name in names:
+    if name not in available:
+      sys.exit(f"unknown case {name}, use one of {', '.join(available)}")
+
+  failed = False
+  os.makedirs(GOLDEN, exist_ok=True)
+  with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, max_tasks_per_child=1) as executor:
+    results = executor.map(run, [available[name] for name in names])
+    for name, result in zip(names, results):
+      filename = os.path.join(GOLDEN, name + ".json")
+      previous = None
+      if os.path.exists(filename):
+        with open(filename) as file:
+          previous = json.load(file)
+
+      cost = result["cost"]
+      summary = f"{cost['stepUs']:.0f} us/pass, p99 {cost['p99Us']:.0f} us, {cost['stepBytes']:.0f} B/pass"
+      if args.update:
+        with open(filename, "w") as file:
+          json.dump(golden(result, None if args.budgets else previous), file, indent=1)
+          file.write("\n")
+        print(f"{name}: written ({summary})")
+        continue
+
+      if previous is None:
+        failed = True
+        print(f"{name}: FAIL no golden trace, run with --update")
+        continue
+
+      failures = compare(result, previous, not args.no_timing)
+      if failures:
+        failed = True
+        print(f"{name}: FAIL ({summary})")
+        for failure in failures:
+          print(f"  {failure}")
+      else:
+        print(f"{name}: ok ({summary})")
+
+  sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,424 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Replays recorded thermocouple readings through the unmodified modes of
+# src/ on the host. The time is a utils.clock.VirtualClock, the probes of the
+# recorded zones read the recording, and the Controller runs the mode pass
+# by pass like on the second core. The relay changes and every PID update
+# (PV, SV, dt and output) are captured.
+#
+#   python tools/replay.py --mode Reballing runs/*.csv --output replayed/
+#   python tools/replay.py --mode Preheater --set SV=150 run.csv
+#   python tools/replay.py --mode Reballing runs/*.csv --baseline replayed/
+#
+# A recording is a CSV file: a header "t,<zone>,..." and one row per
+# conversion, t in milliseconds from the start and the temperature of each
+# zone in degrees Celsius. An empty cell means no conversion of that zone,
+# and "E" a reading with the thermocouple error bit set. Each recording runs
+# in its own process, so thousands of them take seconds. With --baseline,
+# the result of each recording is compared with the one written before in
+# that directory, and the exit status is 1 if any differs.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(TOOLS), "src")
+
+if SRC not in sys.path:
+  sys.path.insert(0, SRC)
+
+from utils import clock
+
+class Recording:
+  """
+    Implements the readings of a recorded run.
+  """
+  def __init__(self, filename = ""):
+    """
+      Initialize a Recording object.
+    Args:
+      filename (str, optional): the CSV file. Defaults to "".
+    """
+    self.name = os.path.splitext(os.path.basename(filename))[0]
+    self.zones = {}
+    with open(filename) as file:
+      header = file.readline().strip().split(",")
+      if header[0] != "t":
+        raise ValueError(f"{filename}: the first column must be t")
+
+      for zone in header[1:]:
+        self.zones[zone] = []
+
+      self.end = 0
+      for line in file:
+        cells = line.strip().split(",")
+        if len(cells) < 2:
+          continue
+
+        t = int(float(cells[0]))
+        self.end = t
+        for zone, cell in zip(header[1:], cells[1:]):
+          if cell == "":
+            continue
+
+          if cell == "E":
+            self.zones[zone].append((t, 0.0, 1))
+          else:
+            self.zones[zone].append((t, float(cell), 0))
+
+class ReplaySensor:
+  """
+    Implements the interface of MAX6675 over the readings of a zone of a
+    Recording. A reading becomes available once the clock passes its time.
+  """
+  def __init__(self, readings, start = 0):
+    """
+      Initialize a ReplaySensor object.
+    Args:
+      readings (list): the (t, temperature, error) tuples.
+      start (int): the clock.ticks_ms() of t = 0.
+    """
+    self._readings = readings
+    self._start = start
+    self._index = -1
+    self._value = 0.0
+    self._error = 0
+    self._sequence = 0
+    self._timestamp = start
+
+  def refresh(self):
+    pass
+
+  def ready(self):
+    next = self._index + 1
+    return next < len(self._readings) and clock.ticks_diff(clock.ticks_ms(), self._start) >= self._readings[next][0]
+
+  def read(self):
+    if self.ready():
+      elapsed = clock.ticks_diff(clock.ticks_ms(), self._start)
+      while self._index + 1 < len(self._readings) and self._readings[self._index + 1][0] <= elapsed:
+        self._index += 1
+
+      t, self._value, self._error = self._readings[self._index]
+      self._timestamp = clock.ticks_add(self._start, t)
+      self._sequence += 1
+
+    return self._value
+
+  def error(self):
+    return self._error
+
+  def sequence(self):
+    return self._sequence
+
+  def timestamp(self):
+    return self._timestamp
+
+class Harness:
+  """
+    Implements a mode of hardware.json running on the host: a
+    utils.clock.VirtualClock, the Controller stepped by the caller, and the relay
+    changes and PID updates of the mode recorded. It needs a fresh
+    interpreter, since the modes share the hardware and the settings of the
+    process.
+  """
+  def __init__(self, mode = "", period = 10, start = 0, hardware = None):
+    """
+      Initialize a Harness object.
+    Args:
+      mode (str, optional): the name of the mode in hardware.json.
+        Defaults to "".
+      period (int, optional): the period of the control loop in
+        milliseconds. Defaults to 10.
+      start (int, optional): the virtual time of the start in
+        microseconds. Defaults to 0.
+      hardware (dictionary, optional): the zones added to hardware.json
+        and the keys added to its modes, by name, like
+        {"zones": {"fan": {"relay": 13}}, "modes": {"Reballing": {"fan": "fan"}}}.
+        Defaults to None.
+    """
+    if TOOLS not in sys.path:
+      sys.path.insert(0, TOOLS)
+
+    import host
+    self._device = host.setup()
+    self.clock = clock.VirtualClock(start)
+    clock.use(self.clock)
+
+    from utils.config import ConfigStore
+    from utils.zones import HardwareMap
+
+    data = ConfigStore.shared("/config/hardware.json").data()
+    if hardware is not None:
+      data["zones"].update(hardware.get("zones", {}))
+      for info in data["modes"]:
+        info.update(hardware.get("modes", {}).get(info["name"], {}))
+
+    self.hardware = HardwareMap.shared()
+    self._zones = data["zones"]
+    self._probes = ConfigStore.shared("/config/probes.json").data()
+    self._mode = mode
+    self.period = period
+    self._start = clock.ticks_ms()
+    self.model = None
+    self.relays = []
+    self.updates = []
+
+  def elapsed(self):
+    """
+      Get the time since the start.
+    Returns:
+      int: the milliseconds.
+    """
+    return clock.ticks_diff(clock.ticks_ms(), self._start)
+
+  def startTime(self):
+    """
+      Get the start.
+    Returns:
+      int: the clock.ticks_ms() of the start.
+    """
+    return self._start
+
+  def setSensor(self, zone = "", sensor = None):
+    """
+      Replace the MAX6675 of a zone, keeping its filters. It must be called
+      before begin().
+    Args:
+      zone (str, optional): the zone name. Defaults to "".
+      sensor (object, optional): an object with the interface of MAX6675.
+        Defaults to None.
+    """
+    from utils.probe import Probe
+    self.hardware.zone(zone).probe = Probe(sensor, self._probes[self._zones[zone].get("probe", zone)])
+
+  def begin(self, settings = None):
+    """
+      Create and set up the mode, and ask the Controller to run it.
+    Args:
+      settings (dictionary, optional): menu values set before the run.
+        Defaults to None.
+    """
+    from utils.controller import Controller
+    from utils.acquisition import Acquisition
+    from utils.pid import PID
+    from mode.preheater import Preheater
+    from mode.reballing import Reballing
+    from mode.tuning import Tuning
+
+    info = None
+    for item in self.hardware.modes():
+      if item["name"] == self._mode:
+        info = item
+
+    if info is None:
+      raise ValueError(f"unknown mode {self._mode}")
+
+    classes = {"Preheater": Preheater, "Reballing": Reballing, "Tuning": Tuning}
+    model = classes[info["type"]](info["name"], info["config"], info["sensor"], info["heaters"])
+    model.setup()
+    for key, value in (settings or {}).items():
+      model.assign(key, value)
+
+    levels = {}
+    def changed(pin, level):
+      name = levels[pin][0]
+      if level != levels[pin][1]:
+        levels[pin] = (name, level)
+        self.relays.append([self.elapsed(), name, level])
+
+    for zone in model.zones():
+      if zone.relay is not None:
+        levels[zone.relay] = (zone.name, zone.relay.value())
+        zone.relay.listen(changed)
+
+    for attribute in vars(model).values():
+      if isinstance(attribute, PID):
+        control = attribute.control
+        def recorded(process, setpoint, dt = 0.0001, rate = None, control = control):
+          u = control(process, setpoint, dt, rate)
+          self.updates.append([self.elapsed(), process, setpoint, dt, u])
+          return u
+        attribute.control = recorded
+
+    self.model = model
+    self.controller = Controller(self.period, acquisition=Acquisition(self.hardware.zones()))
+    self.controller.run(model)
+
+  def step(self):
+    """
+      Run one pass of the control loop.
+    Returns:
+      bool: It's True while the mode runs. Otherwise False.
+    """
+    self.controller.step()
+    return self.model.isRunning()
+
+  def advance(self):
+    """
+      Move the clock one period forward.
+    """
+    self.clock.advance(1000*self.period)
+
+  def finish(self):
+    """
+      Stop the mode.
+    Returns:
+      dictionary: the mode, the "relays" changes as [t, zone, level], the
+        PID "updates" as [t, PV, SV, dt, u], the "duration" and the menu
+        "values" after the run, like the gains found by Tuning; t in
+        milliseconds from the start.
+    """
+    duration = self.elapsed()
+    self.controller.stop(self.model)
+    self.controller.step()
+    values = {label: self.model.getValue(label) for label in self.model.parameters()}
+    self._device.close()
+    return {
+      "mode": self._mode,
+      "relays": self.relays,
+      "updates": self.updates,
+      "duration": duration,
+      "values": values
+    }
+
+def replay(filename, mode = "", settings = None, period = 10, start = 0):
+  """
+    Replay a recording in a Harness.
+  Args:
+    filename (str): the CSV file.
+    mode (str, optional): the name of the mode in hardware.json.
+      Defaults to "".
+    settings (dictionary, optional): menu values set before the run.
+      Defaults to None.
+    period (int, optional): the period of the control loop in
+      milliseconds. Defaults to 10.
+    start (int, optional): the virtual time of the start in microseconds.
+      Defaults to 0.
+
+  Returns:
+    dictionary: the result of Harness.finish(), the "recording" name, the
+      "settings" and how the run "ended" ("mode" or "recording").
+  """
+  recording = Recording(filename)
+  harness = Harness(mode, period, start)
+  for zone in recording.zones:
+    harness.setSensor(zone, ReplaySensor(recording.zones[zone], harness.startTime()))
+
+  harness.begin(settings)
+  ended = "recording"
+  while harness.elapsed() <= recording.end:
+    if not harness.step():
+      ended = "mode"
+      break
+
+    harness.advance()
+
+  result = harness.finish()
+  result["recording"] = recording.name
+  result["settings"] = settings or {}
+  result["ended"] = ended
+  return result
+
+def task(arguments):
+  filename, args = arguments
+  return replay(filename, args["mode"], args["settings"], args["period"], args["start"])
+
+def differences(result, baseline):
+  """
+    Compare the result of a replay with an earlier one.
+  Args:
+    result (dictionary): the new result.
+    baseline (dictionary): the earlier result.
+
+  Returns:
+    str: the first difference, "" if there is none.
+  """
+  for key in ("relays", "updates"):
+    for new, old in zip(result[key], baseline[key]):
+      if new != old:
+        return f"{key} differ at t={min(new[0], old[0])} ms: {old} -> {new}"
+
+    if len(result[key]) != len(baseline[key]):
+      return f"{len(baseline[key])} {key} -> {len(result[key])}"
+
+  if result["duration"] != baseline["duration"]:
+    return f"duration {baseline['duration']} -> {result['duration']} ms"
+
+  if result["values"] != baseline["values"]:
+    return f"values {baseline['values']} -> {result['values']}"
+
+  return ""
+
+def parseSettings(assignments):
+  settings = {}
+  for assignment in assignments:
+    key, _, value = assignment.partition("=")
+    settings[key] = float(value) if "." in value else int(value)
+
+  return settings
+
+def main():
+  parser = argparse.ArgumentParser(description="Replay recorded runs through the modes.")
+  parser.add_argument("recordings", nargs="+", help="CSV files")
+  parser.add_argument("--mode", required=True, help="mode name in hardware.json")
+  parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="menu value set before the run")
+  parser.add_argument("--period", type=int, default=10, help="period of the control loop in milliseconds")
+  parser.add_argument("--start", type=int, default=0, help="virtual time of the start in microseconds")
+  parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+  parser.add_argument("--output", help="directory for the results")
+  parser.add_argument("--baseline", help="directory of earlier results to compare with")
+  args = parser.parse_args()
+
+  options = {"mode": args.mode, "settings": parseSettings(args.set), "period": args.period, "start": args.start}
+  tasks = [(filename, options) for filename in args.recordings]
+  if args.output is not None:
+    os.makedirs(args.output, exist_ok=True)
+
+  failed = False
+  with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, max_tasks_per_child=1) as executor:
+    for filename, result in zip(args.recordings, executor.map(task, tasks)):
+      seconds = result["duration"]/1000.0
+      on = {}
+      for i, (t, zone, level) in enumerate(result["relays"]):
+        if level:
+          following = [change[0] for change in result["relays"][i + 1:] if change[1] == zone]
+          on[zone] = on.get(zone, 0) + (following[0] if following else result["duration"]) - t
+      duty = " ".join(f"{zone}={100.0*ms/result['duration']:.1f}%" for zone, ms in on.items()) if result["duration"] > 0 else ""
+      line = f"{result['recording']}: {seconds:.1f}s ended by {result['ended']}, {len(result['updates'])} updates, {len(result['relays'])} relay changes {duty}"
+
+      if args.baseline is not None:
+        with open(os.path.join(args.baseline, result["recording"] + ".json")) as file:
+          difference = differences(result, json.load(file))
+        if difference:
+          failed = True
+          line += f"\n  {difference}"
+        else:
+          line += ", same as baseline"
+
+      print(line)
+      if args.output is not None:
+        with open(os.path.join(args.output, result["recording"] + ".json"), "w") as file:
+          json.dump(result, file)
+
+  sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+  main()
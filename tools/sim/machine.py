@@ -0,0 +1,192 @@
+"""
+ * Copyright (c) 2025 Luiz C. M. de Aquino <aquino.luizclaudio@gmail.com>
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms and conditions of the GNU General Public License,
+ * version 2, as published by the Free Software Foundation.
+ *
+ * This program is distributed in the hope it will be useful, but WITHOUT
+ * ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+ * FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+ * more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Host stand-in for the MicroPython machine module. It provides the
+# classes used by the FCR with the same call signatures and no hardware.
+
+class Pin:
+  """
+    Implements a GPIO pin. Output levels are kept, and the level of an
+    input can be set by the simulation with drive().
+  """
+  IN = 0
+  OUT = 1
+  PULL_UP = 1
+  PULL_DOWN = 2
+
+  _pins = {}
+
+  def __init__(self, id, mode = -1, pull = None, value = None):
+    self._id = id
+    self._mode = mode
+    self._value = 0 if value is None else value
+    self._listeners = []
+    Pin._pins[id] = self
+
+  @staticmethod
+  def get(id):
+    """
+      Get the last Pin object created for a GPIO number.
+    Args:
+      id (int): the GPIO number.
+
+    Returns:
+      Pin: the pin or None.
+    """
+    return Pin._pins.get(id)
+
+  @staticmethod
+  def reset():
+    """
+      Forget every pin created so far.
+    """
+    Pin._pins = {}
+
+  def id(self):
+    return self._id
+
+  def listen(self, callback):
+    """
+      Call callback(pin, value) every time the output level is set.
+    Args:
+      callback (function): the function to be called.
+    """
+    self._listeners.append(callback)
+
+  def drive(self, value = 0):
+    """
+      Set the level seen by value() on an input pin.
+    Args:
+      value (int, optional): the level. Defaults to 0.
+    """
+    self._value = value
+
+  def value(self, value = None):
+    if value is None:
+      return self._value
+
+    self._value = 1 if value else 0
+    for callback in self._listeners:
+      callback(self, self._value)
+
+  def high(self):
+    self.value(1)
+
+  def low(self):
+    self.value(0)
+
+  def on(self):
+    self.value(1)
+
+  def off(self):
+    self.value(0)
+
+  def __call__(self, value = None):
+    return self.value(value)
+
+class ADC:
+  """
+    Implements an ADC channel that returns the level set with drive().
+  """
+  def __init__(self, channel):
+    self._channel = channel
+    self._value = 65535
+
+  def drive(self, value = 65535):
+    self._value = value
+
+  def read_u16(self):
+    return self._value
+
+class I2C:
+  """
+    Implements an I2C bus that accepts and counts every transfer.
+  """
+  def __init__(self, id, sda = None, scl = None, freq = 400000):
+    self._id = id
+    self.writes = 0
+
+  def writeto(self, addr, buf, stop = True):
+    self.writes += 1
+    return len(buf)
+
+  def readfrom(self, addr, nbytes, stop = True):
+    return bytes(nbytes)
+
+def freq(hz = None):
+  return 125000000
+
+def unique_id():
+  return b"HOSTSIM!"
+
+class Timer:
+  """
+    Implements a timer whose callback is called by the simulation with
+    fire(), instead of by a clock.
+  """
+  ONE_SHOT = 0
+  PERIODIC = 1
+
+  _timers = []
+
+  def __init__(self, id = -1, **kwargs):
+    self._id = id
+    self.period = 0
+    self.mode = Timer.PERIODIC
+    self._callback = None
+    if kwargs:
+      self.init(**kwargs)
+
+  @staticmethod
+  def all():
+    """
+      Get the timers running.
+    Returns:
+      list: the Timer objects.
+    """
+    return list(Timer._timers)
+
+  def init(self, mode = 1, period = -1, callback = None, freq = -1):
+    self.mode = mode
+    self.period = period if freq <= 0 else round(1000/freq)
+    self._callback = callback
+    if self not in Timer._timers:
+      Timer._timers.append(self)
+
+  def deinit(self):
+    if self in Timer._timers:
+      Timer._timers.remove(self)
+
+  def fire(self):
+    """
+      Call the callback as if the period had elapsed.
+    """
+    if self._callback is not None:
+      self._callback(self)
+
+    if self.mode == Timer.ONE_SHOT:
+      self.deinit()
+
+class WDT:
+  """
+    Implements a watchdog that counts the feeds and never resets.
+  """
+  def __init__(self, id = 0, timeout = 5000):
+    self.timeout = timeout
+    self.feeds = 0
+
+  def feed(self):
+    self.feeds += 1